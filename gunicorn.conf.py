@@ -0,0 +1,75 @@
+"""Gunicorn settings for Proshield Reports.
+
+Gunicorn loads ./gunicorn.conf.py automatically, so the Render start command
+stays `gunicorn wsgi:app` (run from the repository root). Every setting can
+be overridden with the environment variable named next to it.
+
+- gthread workers: uploads (image compression), bcrypt logins and Excel
+  exports no longer block a whole worker, and other threads keep serving.
+- preload_app: the app, and with DATABASE_URL the migration check, runs once
+  in the master. Workers are forked from it and share its code pages.
+  gc.freeze() before each fork keeps the collector from touching (and so
+  copying) those shared pages.
+- post_fork: pooled DB connections opened in the master are dropped in each
+  child (database.dispose_engines), so workers never share a socket.
+- Keep DB_POOL_SIZE >= threads so every thread can hold a connection.
+"""
+
+import gc
+import multiprocessing
+import os
+import sys
+
+
+def _int_env(name, default):
+    return int(os.environ.get(name, default))
+
+
+_cpus = multiprocessing.cpu_count()
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '5000')}"
+
+# WEB_CONCURRENCY is also what Render sets from the instance size
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+workers = _int_env('WEB_CONCURRENCY', min(_cpus * 2 + 1, 8))
+threads = _int_env('GUNICORN_THREADS', 4)
+
+preload_app = os.environ.get('GUNICORN_PRELOAD', 'true').lower() == 'true'
+
+# Multi-photo uploads over field connections and month-end exports are slow
+timeout = _int_env('GUNICORN_TIMEOUT', 120)
+graceful_timeout = _int_env('GUNICORN_GRACEFUL_TIMEOUT', 30)
+keepalive = _int_env('GUNICORN_KEEPALIVE', 5)
+
+# Recycle workers now and then to bound memory growth (cheap with preload)
+max_requests = _int_env('GUNICORN_MAX_REQUESTS', 1000)
+max_requests_jitter = _int_env('GUNICORN_MAX_REQUESTS_JITTER', 100)
+
+# Heartbeat files on tmpfs rather than a possibly slow disk
+if os.path.isdir('/dev/shm'):
+    worker_tmp_dir = '/dev/shm'
+
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG', '-')
+errorlog = '-'
+loglevel = os.environ.get('GUNICORN_LOG_LEVEL', 'info')
+
+
+def on_starting(server):
+    # Per-worker metric snapshots from the previous run (see metrics.py)
+    metrics_dir = os.environ.get('METRICS_DIR')
+    if metrics_dir and os.path.isdir(metrics_dir):
+        for name in os.listdir(metrics_dir):
+            if name.endswith('.json'):
+                os.remove(os.path.join(metrics_dir, name))
+
+
+def pre_fork(server, worker):
+    # Move everything allocated so far to the permanent generation
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    database = sys.modules.get('database')
+    if database is not None:
+        database.dispose_engines()
+    server.log.info('Worker %s ready (%s threads)', worker.pid, threads)
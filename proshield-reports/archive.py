@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+Proshield Reports - Archival of old reports and inventory transactions
+
+Reports (with their product lines) and inventory transactions older than
+Config.ARCHIVE_AFTER_DAYS are moved into the `reports_archive` and
+`inventory_transactions_archive` tables so the hot tables stay small.
+
+Inventory balances live on InventoryItem and are never touched here. Queries
+whose date range reaches before the archive watermark (see
+`range_includes_archive`) union the archive back in, and the stats endpoints
+add `archived_report_rollup()` to their counts.
+
+Usage:
+    python archive.py                      # archive using ARCHIVE_AFTER_DAYS
+    python archive.py --before 2024-01-01  # explicit cutoff
+    python archive.py --dry-run
+"""
+
+import json
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, insert, literal, select, union_all
+
+from config import Config
+from models import (
+    db, Report, ReportProduct, ReportImage, ReportDocument, ReportInstallationType, InventoryTransaction,
+    ArchivedReport, ArchivedInventoryTransaction
+)
+
+_REPORT_COLUMNS = [
+    'id', 'user_id', 'report_type', 'customer_name', 'recipient_name', 'company_project',
+    'address', 'status', 'timestamp', 'notes', 'installation_type', 'installation_types',
+    'protections_count', 'installation_team', 'additional_worker_name'
+]
+
+_TRANSACTION_COLUMNS = [
+    'id', 'product_id', 'change_type', 'quantity', 'unit', 'report_id', 'user_id',
+    'notes', 'created_at'
+]
+
+
+def archive_cutoff(now=None):
+    """Return the configured archive horizon, or None when archival is disabled."""
+    if Config.ARCHIVE_AFTER_DAYS <= 0:
+        return None
+    return (now or datetime.utcnow()) - timedelta(days=Config.ARCHIVE_AFTER_DAYS)
+
+
+def archived_until():
+    """Newest report timestamp in the archive (None when the archive is empty)."""
+    return db.session.query(func.max(ArchivedReport.timestamp)).scalar()
+
+
+def range_includes_archive(date_from, include_archived=False):
+    """True when a query starting at `date_from` must also read the archive.
+
+    Unbounded queries stay on the hot tables unless the caller asks for the
+    archive explicitly; bounded queries only union when they reach back past
+    the newest archived row.
+    """
+    watermark = archived_until()
+    if watermark is None:
+        return False
+    if include_archived:
+        return True
+    return date_from is not None and date_from <= watermark
+
+
+def paginate_with_archive(hot_query, archive_query, page, per_page):
+    """Paginate Report + ArchivedReport rows ordered by timestamp desc.
+
+    Returns (items, total). Only ids are sorted in the union; the page rows are
+    then loaded from their own table.
+    """
+    hot = hot_query.order_by(None).with_entities(
+        Report.id.label('id'), Report.timestamp.label('timestamp'), literal(False).label('archived')
+    )
+    cold = archive_query.order_by(None).with_entities(
+        ArchivedReport.id.label('id'), ArchivedReport.timestamp.label('timestamp'), literal(True).label('archived')
+    )
+    combined = union_all(hot.statement, cold.statement).subquery()
+
+    total = db.session.execute(select(func.count()).select_from(combined)).scalar()
+    rows = db.session.execute(
+        select(combined.c.id, combined.c.archived)
+        .order_by(combined.c.timestamp.desc(), combined.c.id.desc())
+        .limit(per_page)
+        .offset((page - 1) * per_page)
+    ).all()
+
+    hot_ids = [r.id for r in rows if not r.archived]
+    cold_ids = [r.id for r in rows if r.archived]
+    hot_rows = {r.id: r for r in Report.query.filter(Report.id.in_(hot_ids)).all()} if hot_ids else {}
+    cold_rows = {r.id: r for r in ArchivedReport.query.filter(ArchivedReport.id.in_(cold_ids)).all()} if cold_ids else {}
+
+    items = [cold_rows[r.id] if r.archived else hot_rows[r.id] for r in rows]
+    return items, total
+
+
+def archived_report_rollup(user_id=None):
+    """Archived report counts grouped by (user_id, report_type, status)."""
+    query = db.session.query(
+        ArchivedReport.user_id, ArchivedReport.report_type, ArchivedReport.status, func.count()
+    )
+    if user_id is not None:
+        query = query.filter(ArchivedReport.user_id == user_id)
+    return query.group_by(ArchivedReport.user_id, ArchivedReport.report_type, ArchivedReport.status).all()
+
+
+def _snapshot(report_id, products, images, documents):
+    return ArchivedReport(
+        products_json=json.dumps([p.to_dict() for p in products.get(report_id, [])], ensure_ascii=False),
+        images_json=json.dumps([i.to_dict() for i in images.get(report_id, [])], ensure_ascii=False),
+        documents_json=json.dumps([d.to_dict() for d in documents.get(report_id, [])], ensure_ascii=False),
+    )
+
+
+def _group_by_report(rows):
+    grouped = {}
+    for row in rows:
+        grouped.setdefault(row.report_id, []).append(row)
+    return grouped
+
+
+def _archive_report_batch(report_ids):
+    reports = Report.query.filter(Report.id.in_(report_ids)).all()
+    products = _group_by_report(ReportProduct.query.filter(ReportProduct.report_id.in_(report_ids)).all())
+    images = _group_by_report(ReportImage.query.filter(ReportImage.report_id.in_(report_ids)).all())
+    documents = _group_by_report(ReportDocument.query.filter(ReportDocument.report_id.in_(report_ids)).all())
+
+    for report in reports:
+        archived = _snapshot(report.id, products, images, documents)
+        for column in _REPORT_COLUMNS:
+            setattr(archived, column, getattr(report, column))
+        db.session.add(archived)
+
+    # Ledger rows of an archived report follow it, whatever their own date,
+    # so the FK from inventory_transactions to reports never dangles.
+    _move_transactions(InventoryTransaction.report_id.in_(report_ids))
+
+    for model in (ReportProduct, ReportImage, ReportDocument, ReportInstallationType):
+        model.query.filter(model.report_id.in_(report_ids)).delete(synchronize_session=False)
+    Report.query.filter(Report.id.in_(report_ids)).delete(synchronize_session=False)
+
+
+def _move_transactions(condition):
+    source = select(*[getattr(InventoryTransaction, c) for c in _TRANSACTION_COLUMNS]).where(condition)
+    db.session.execute(insert(ArchivedInventoryTransaction).from_select(_TRANSACTION_COLUMNS, source))
+    InventoryTransaction.query.filter(condition).delete(synchronize_session=False)
+
+
+def archive_old_records(cutoff=None, batch_size=None, dry_run=False):
+    """Move reports and ledger rows older than `cutoff` into the archive tables.
+
+    Works in batches, committing after each one, so a large first run does not
+    hold a long write lock. Returns a dict of moved row counts.
+    """
+    cutoff = cutoff or archive_cutoff()
+    if cutoff is None:
+        return {'reports': 0, 'transactions': 0}
+    batch_size = batch_size or Config.ARCHIVE_BATCH_SIZE
+
+    # Archived rows keep their ids; the hot tables use AUTOINCREMENT on SQLite
+    # (migration 10), so those ids are never handed out again
+    candidates = Report.query.filter(Report.timestamp < cutoff)
+    old_transactions = InventoryTransaction.query.filter(InventoryTransaction.created_at < cutoff)
+
+    if dry_run:
+        return {'reports': candidates.count(), 'transactions': old_transactions.count()}
+
+    moved_reports = 0
+    while True:
+        report_ids = [
+            row.id for row in candidates.with_entities(Report.id).order_by(Report.id).limit(batch_size).all()
+        ]
+        if not report_ids:
+            break
+        _archive_report_batch(report_ids)
+        db.session.commit()
+        moved_reports += len(report_ids)
+
+    moved_transactions = 0
+    while True:
+        tx_ids = [
+            row.id for row in old_transactions.with_entities(InventoryTransaction.id)
+            .order_by(InventoryTransaction.id).limit(batch_size).all()
+        ]
+        if not tx_ids:
+            break
+        _move_transactions(InventoryTransaction.id.in_(tx_ids))
+        db.session.commit()
+        moved_transactions += len(tx_ids)
+
+    return {'reports': moved_reports, 'transactions': moved_transactions}
+
+
+def main():
+    import argparse
+    import os
+    import sys
+
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    from app import app
+    import migrations
+
+    parser = argparse.ArgumentParser(description='Archive old reports and inventory transactions')
+    parser.add_argument('--before', help='Cutoff date (YYYY-MM-DD); defaults to ARCHIVE_AFTER_DAYS ago')
+    parser.add_argument('--batch-size', type=int, default=None)
+    parser.add_argument('--dry-run', action='store_true', help='Only count rows that would be moved')
+    args = parser.parse_args()
+
+    cutoff = datetime.fromisoformat(args.before) if args.before else None
+
+    with app.app_context():
+        migrations.upgrade()
+        result = archive_old_records(cutoff=cutoff, batch_size=args.batch_size, dry_run=args.dry_run)
+
+    verb = 'Would archive' if args.dry_run else 'Archived'
+    print(f"[OK] {verb} {result['reports']} reports and {result['transactions']} inventory transactions")
+
+
+if __name__ == '__main__':
+    main()
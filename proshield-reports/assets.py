@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Proshield Reports - Static asset fingerprinting
+
+`python assets.py` hashes the files under static/ and writes:
+
+    static/asset-manifest.json    read by the app for `asset_url()`
+    static/js/asset-manifest.js   imported by the service worker
+
+Templates link assets as `{{ asset_url('css/style.css') }}`, which renders
+`/static/css/style.css?v=<content hash>`. The service worker precaches the
+PRECACHE subset under those hashed URLs and keeps entries across versions,
+so a deploy only downloads the files whose hash changed.
+
+Run it after editing anything in static/ (run.py does it on start). If
+the manifest is missing or stale the app still works: hashes are computed
+at startup and the service worker falls back to the network.
+"""
+
+import hashlib
+import json
+import os
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+MANIFEST_JSON = os.path.join(STATIC_DIR, 'asset-manifest.json')
+MANIFEST_JS = os.path.join(STATIC_DIR, 'js', 'asset-manifest.js')
+
+# Served from other URLs (/sw.js) or generated by this script
+EXCLUDED = {'js/sw.js', 'js/asset-manifest.js', 'asset-manifest.json', 'images/.gitkeep'}
+
+# Needed to render the app shell offline
+PRECACHE = [
+    'css/style.css',
+    'js/app.js',
+    'js/offline-queue.js',
+    'images/icon-192.png',
+    'images/icon-512.png',
+    'images/proshield-icon.png',
+]
+
+_manifest = None
+
+
+def _file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(65536), b''):
+            digest.update(chunk)
+    return digest.hexdigest()[:12]
+
+
+def compute_manifest(static_dir=STATIC_DIR):
+    """Hash every static asset; returns {'assets': {path: hash}, 'precache': [...]}."""
+    assets = {}
+    for root, _, files in os.walk(static_dir):
+        for name in files:
+            full = os.path.join(root, name)
+            rel = os.path.relpath(full, static_dir).replace(os.sep, '/')
+            if rel not in EXCLUDED:
+                assets[rel] = _file_hash(full)
+    return {
+        'assets': dict(sorted(assets.items())),
+        'precache': [p for p in PRECACHE if p in assets],
+    }
+
+
+def load_manifest():
+    """The built manifest if present, otherwise hashes computed now (cached per process)."""
+    global _manifest
+    if _manifest is None:
+        try:
+            with open(MANIFEST_JSON, encoding='utf-8') as f:
+                _manifest = json.load(f)
+        except (OSError, ValueError):
+            _manifest = compute_manifest()
+    return _manifest
+
+
+def asset_url(path):
+    """`/static/<path>?v=<hash>`; unknown paths are returned unversioned."""
+    digest = load_manifest()['assets'].get(path)
+    return f'/static/{path}?v={digest}' if digest else f'/static/{path}'
+
+
+def asset_hash(path):
+    """Content hash of a static asset ('' when unknown)."""
+    return load_manifest()['assets'].get(path, '')
+
+
+def build():
+    manifest = compute_manifest()
+    with open(MANIFEST_JSON, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+        f.write('\n')
+    with open(MANIFEST_JS, 'w', encoding='utf-8') as f:
+        f.write('// Generated by assets.py - do not edit\n')
+        f.write(f'self.ASSET_MANIFEST = {json.dumps(manifest, indent=2)};\n')
+    return manifest
+
+
+def main():
+    manifest = build()
+    print(f"[OK] Fingerprinted {len(manifest['assets'])} assets ({len(manifest['precache'])} precached)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,433 @@
+#!/usr/bin/env python3
+"""
+Proshield Reports - Synthetic data generator
+
+Fills the configured database (DATABASE_URL, or the local SQLite file) with
+production-scale data for load and performance testing:
+
+    - installers with skewed activity (a few do most of the reports)
+    - construction companies with Zipf-distributed volume, each with a few
+      projects on a fixed Hebrew street address in a population-weighted city
+    - deliveries / installations over the last --days days, on working days
+      and hours, with product lines, installation types and notes
+    - an inventory transaction per product line (as POST /api/reports does)
+      plus occasional restock adjustments, and matching inventory totals
+    - report images pointing at placeholder JPEGs under UPLOAD_FOLDER
+      (hard links to one small file; --no-files writes the rows only)
+
+Rows go in with Core (not ORM) bulk inserts, i.e. one executemany per table and
+batch, --batch reports per transaction, and get
+change_seq values from the delta-sync counter so /api/reports/changes stays
+consistent. The same --seed produces the same data (dates are relative to
+today). Works on SQLite and
+PostgreSQL. It only adds rows and never deletes existing data.
+
+Usage:
+    python benchmarks/generate_data.py --reports 10000
+    python benchmarks/generate_data.py --users 100 --reports 1000000 --seed 7
+    DATABASE_URL=postgresql://... python benchmarks/generate_data.py --reports 2000000 --products 5
+    python benchmarks/generate_data.py --reports 50000 --images 0 --json
+"""
+
+import argparse
+import io
+import json
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from itertools import accumulate
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import func, insert, text  # noqa: E402
+
+import catalog  # noqa: E402
+import passwords  # noqa: E402
+import report_changes  # noqa: E402
+import report_summary  # noqa: E402
+from models import (  # noqa: E402
+    db, PRODUCTS, CompanyProject, InventoryItem, InventoryTransaction, Report, ReportImage, ReportInstallationType,
+    ReportProduct, User
+)
+
+FIRST_NAMES = [
+    'דוד', 'משה', 'יוסף', 'אברהם', 'יעקב', 'מיכאל', 'דניאל', 'אריאל', 'איתי', 'עומר',
+    'נועם', 'יונתן', 'אורי', 'אליהו', 'שמעון', 'חיים', 'מוחמד', 'אחמד', 'יוסי', 'רוני',
+    'שרה', 'רחל', 'מיכל', 'נועה', 'תמר', 'יעל', 'אורית', 'שירה', 'מאיה', 'רותם',
+]
+LAST_NAMES = [
+    'כהן', 'לוי', 'מזרחי', 'פרץ', 'ביטון', 'דהן', 'אברהם', 'פרידמן', 'אגבאריה', 'מלכה',
+    'אזולאי', 'כץ', 'יוסף', 'דוד', 'עמר', 'אוחיון', 'חדד', 'גבאי', 'בן דוד', 'שפירא',
+    'חסון', 'סויסה', 'אלון', 'שטרן', 'גולן', 'ברק', 'נחום', 'טל', 'רוזנברג', 'חורי',
+]
+
+# (city, relative weight ~ population)
+CITIES = [
+    ('ירושלים', 98), ('תל אביב', 47), ('חיפה', 29), ('ראשון לציון', 26), ('פתח תקווה', 26),
+    ('אשדוד', 23), ('נתניה', 23), ('באר שבע', 21), ('בני ברק', 21), ('חולון', 20),
+    ('רמת גן', 17), ('אשקלון', 15), ('רחובות', 15), ('בת ים', 13), ('בית שמש', 13),
+    ('כפר סבא', 10), ('הרצליה', 10), ('חדרה', 10), ('מודיעין', 10), ('נצרת', 8),
+    ('רעננה', 8), ('לוד', 8), ('רמלה', 8), ('ראש העין', 7), ('קריית גת', 6),
+    ('נהריה', 6), ('אילת', 5), ('עפולה', 5), ('הוד השרון', 6), ('גבעתיים', 6),
+]
+STREETS = [
+    'הרצל', 'ויצמן', "ז'בוטינסקי", 'בן גוריון', 'רוטשילד', 'אחד העם', 'ביאליק', 'סוקולוב',
+    'העצמאות', 'הנביאים', 'הרב קוק', 'דרך השלום', 'יפו', 'אלנבי', 'בן יהודה', 'המלך דוד',
+    'הגפן', 'הזית', 'התמר', 'האלון', 'הברוש', 'האורנים', 'הדקל', 'הרימון', 'התאנה',
+    'שדרות ירושלים', 'שדרות הנשיא', 'דרך הים', 'החשמונאים', 'המכבים', 'קרן היסוד',
+    'ארלוזורוב', 'טרומפלדור', 'הפלמ"ח', 'גולדה מאיר', 'רבין', 'בגין', 'אבא הלל', 'נורדאו',
+]
+COMPANY_KINDS = ['בנייה בע"מ', 'הנדסה ובנייה', 'יזמות', 'קבלנות', 'נדל"ן', 'בונים', 'פרויקטים']
+PROJECT_NAMES = [
+    'מגדלי', 'פארק', 'גני', 'נווה', 'רמת', 'מתחם', 'קריית', 'בתי', 'אחוזת', 'פסגת',
+]
+PROJECT_SUFFIXES = ['הים', 'הפארק', 'השרון', 'הזהב', 'העיר', 'האגם', 'הגבעה', 'הדר', 'אביב', 'הבוטיק']
+INSTALLATION_TYPES = [
+    'הגנת מדרגות', 'הגנת פרקט', 'הגנת ריצוף', 'הגנת מטבח', 'הגנת חלונות', 'הגנה לדלת כניסה',
+    'הגנה לדלת פנים', 'הגנה לריצוף חוץ', 'הגנה לנגרויות', 'הגנת מעלית', 'הגנת פרופילי חלון', 'הגנת מעקות',
+]
+NOTES = [
+    'נמסר לאחראי האתר', 'חסר חומר, להשלים בביקור הבא', 'לתאם מעלית מראש', 'הלקוח ביקש להחליף דגם',
+    'עבודה בקומה גבוהה', 'הותקן בכל הדירות בקומה', 'לחזור לאחר צביעה', 'אין חניה באתר',
+    'השלמה לדוח קודם', 'נמסר לשומר בכניסה',
+]
+# Rolls are reported in meters, the rest in units
+UNIT_PRODUCTS = ('לוח PP', 'סרט דבק', 'זווית פינה')
+
+# Tape and the common rolls appear on most reports
+PRODUCT_WEIGHTS = [6 if 'Original' in p or p == 'סרט דבק' else 2 if p.startswith('Floorliner') else 1 for p in PRODUCTS]
+
+# A real (tiny) JPEG, so image tools and the gallery can open the placeholders
+_PLACEHOLDER_SIZE = (8, 8)
+
+
+def _zipf_weights(n, s=1.1):
+    return [1 / (rank ** s) for rank in range(1, n + 1)]
+
+
+class Generator:
+    def __init__(self, seed, days):
+        self.rng = random.Random(seed)
+        self.end = datetime.now().replace(microsecond=0)
+        self.days = days
+        self.cities = [city for city, _ in CITIES]
+        self.city_cum_weights = list(accumulate(weight for _, weight in CITIES))
+        self.product_cum_weights = list(accumulate(PRODUCT_WEIGHTS))
+
+    def person_name(self):
+        return f'{self.rng.choice(FIRST_NAMES)} {self.rng.choice(LAST_NAMES)}'
+
+    def address(self):
+        city = self.rng.choices(self.cities, cum_weights=self.city_cum_weights)[0]
+        # House numbers: most streets are short
+        number = min(int(self.rng.expovariate(1 / 25)) + 1, 250)
+        return f'רחוב {self.rng.choice(STREETS)} {number}, {city}'
+
+    def companies(self, count):
+        names = set()
+        while len(names) < count:
+            names.add(f'{self.rng.choice(LAST_NAMES)} {self.rng.choice(COMPANY_KINDS)}')
+            if len(names) >= len(LAST_NAMES) * len(COMPANY_KINDS):
+                break
+        companies = sorted(names)
+        self.rng.shuffle(companies)
+        return companies
+
+    def projects(self, companies, per_company):
+        projects = []
+        for company in companies:
+            for _ in range(self.rng.randint(1, per_company * 2 - 1)):
+                name = f'{company} - {self.rng.choice(PROJECT_NAMES)} {self.rng.choice(PROJECT_SUFFIXES)}'
+                projects.append({'company': company, 'name': name, 'address': self.address()})
+        return projects
+
+    def timestamp(self):
+        # Sunday-Thursday full days, short Fridays, no Saturdays; 07:00-17:00
+        while True:
+            day = self.end - timedelta(days=self.rng.randrange(self.days))
+            weekday = day.weekday()  # Monday=0 .. Sunday=6
+            if weekday == 5 or (weekday == 4 and self.rng.random() < 0.7):
+                continue
+            hour = 7 + min(int(self.rng.triangular(0, 10, 3)), 9)
+            return day.replace(hour=hour, minute=self.rng.randrange(60), second=self.rng.randrange(60))
+
+    def product_lines(self, mean):
+        count = max(1, min(len(PRODUCTS), int(self.rng.expovariate(1 / mean)) + 1))
+        names = []  # a list, not a set, so the order (and the data) follows the seed
+        while len(names) < count:
+            name = self.rng.choices(PRODUCTS, cum_weights=self.product_cum_weights)[0]
+            if name not in names:
+                names.append(name)
+        lines = []
+        for name in names:
+            if name.startswith(UNIT_PRODUCTS):
+                lines.append((name, float(self.rng.randint(1, 40)), 'unit'))
+            else:
+                lines.append((name, round(self.rng.uniform(5, 250), 1), 'meter'))
+        return lines
+
+    def image_count(self, mean):
+        whole, fraction = divmod(mean, 1)
+        return int(whole) + (1 if self.rng.random() < fraction else 0)
+
+    def filename(self):
+        return f'{self.rng.getrandbits(128):032x}.jpg'
+
+
+def _placeholder_jpeg():
+    from PIL import Image
+
+    out = io.BytesIO()
+    Image.new('RGB', _PLACEHOLDER_SIZE, (200, 200, 200)).save(out, 'JPEG')
+    return out.getvalue()
+
+
+def _write_placeholder(upload_folder, relative_path, source):
+    path = os.path.join(upload_folder, relative_path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    try:
+        os.link(source, path)
+    except OSError:
+        with open(source, 'rb') as src, open(path, 'wb') as dst:
+            dst.write(src.read())
+
+
+def _create_users(gen, count, password_hash):
+    existing = {name for (name,) in db.session.query(User.username)}
+    rows = []
+    n = 0
+    while len(rows) < count:
+        n += 1
+        username = f'installer{n:04d}'
+        if username in existing:
+            continue
+        rows.append({
+            'username': username,
+            'password_hash': password_hash,
+            'role': 'user',
+            'full_name': gen.person_name(),
+            'created_at': gen.end - timedelta(days=gen.days),
+            'is_active': True,
+        })
+    if rows:
+        db.session.execute(insert(User.__table__), rows)
+    db.session.commit()
+    usernames = [r['username'] for r in rows] or sorted(u for u in existing if u.startswith('installer'))
+    return [uid for (uid,) in db.session.query(User.id).filter(User.username.in_(usernames))]
+
+
+def _create_company_projects(projects):
+    existing = {name for (name,) in db.session.query(CompanyProject.name)}
+    rows = [
+        {'name': p['name'], 'is_active': True, 'created_at': datetime.utcnow()}
+        for p in {p['name']: p for p in projects}.values()
+        if p['name'] not in existing
+    ]
+    if rows:
+        db.session.execute(insert(CompanyProject.__table__), rows)
+    db.session.commit()
+
+
+def generate(args, upload_folder, log):
+    gen = Generator(args.seed, args.days)
+    started = time.perf_counter()
+
+    log(f'[*] Users: {args.users}')
+    user_ids = _create_users(gen, args.users, passwords.hash_password('password123'))
+    user_cum_weights = list(accumulate(gen.rng.lognormvariate(0, 1) for _ in user_ids))
+    admin_id = db.session.query(User.id).filter(User.role == 'admin').order_by(User.id).limit(1).scalar()
+
+    companies = gen.companies(args.companies)
+    projects = gen.projects(companies, 3)
+    _create_company_projects(projects)
+    company_weights = dict(zip(companies, _zipf_weights(len(companies))))
+    project_cum_weights = list(accumulate(company_weights[p['company']] for p in projects))
+    log(f'[*] Companies: {len(companies)}, projects: {len(projects)}')
+
+    placeholder = None
+    if args.images and not args.no_files:
+        os.makedirs(upload_folder, exist_ok=True)
+        placeholder = os.path.join(upload_folder, '.placeholder.jpg')
+        with open(placeholder, 'wb') as f:
+            f.write(_placeholder_jpeg())
+
+    product_ids = {name: catalog.product_id(name) for name in PRODUCTS}
+    next_id = (db.session.query(func.max(Report.id)).scalar() or 0) + 1
+    counts = {'reports': 0, 'report_products': 0, 'report_images': 0, 'inventory_transactions': 0}
+    inventory = {}  # (product_id, unit) -> net change
+
+    remaining = args.reports
+    while remaining > 0:
+        batch = min(args.batch, remaining)
+        first_seq = report_changes.reserve_change_seqs(db.session, batch)
+        reports, lines, images, transactions, type_rows = [], [], [], [], []
+
+        for offset in range(batch):
+            report_id = next_id + offset
+            user_id = gen.rng.choices(user_ids, cum_weights=user_cum_weights)[0]
+            timestamp = gen.timestamp()
+            report_type = 'delivery' if gen.rng.random() < 0.55 else 'installation'
+            if gen.rng.random() < 0.8:
+                project = gen.rng.choices(projects, cum_weights=project_cum_weights)[0]
+                customer, company_project, address = project['company'], project['name'], project['address']
+            else:
+                customer, company_project, address = gen.person_name(), None, gen.address()
+
+            row = {
+                'id': report_id,
+                'user_id': user_id,
+                'report_type': report_type,
+                'customer_name': customer,
+                'recipient_name': gen.person_name() if report_type == 'delivery' else None,
+                'company_project': company_project,
+                'address': address,
+                'status': 'completed' if gen.rng.random() < 0.85 else 'return_required',
+                'timestamp': timestamp,
+                'notes': gen.rng.choice(NOTES) if gen.rng.random() < 0.3 else None,
+                'installation_type': None,
+                'installation_types': None,
+                'protections_count': None,
+                'installation_team': None,
+                'additional_worker_name': None,
+                'synced': True,
+                'updated_at': timestamp,
+                'change_seq': first_seq + offset,
+                'document_count': 0,
+                'thumbnail_path': None,
+            }
+            if report_type == 'installation':
+                types = gen.rng.sample(INSTALLATION_TYPES, gen.rng.choice((1, 1, 1, 2, 2, 3)))
+                team = 'solo' if gen.rng.random() < 0.6 else 'with_worker'
+                row.update({
+                    'installation_type': ', '.join(types),
+                    'installation_types': json.dumps(types, ensure_ascii=False),
+                    'protections_count': gen.rng.randint(1, 40),
+                    'installation_team': team,
+                    'additional_worker_name': gen.person_name() if team == 'with_worker' else None,
+                })
+                type_rows.extend(ReportInstallationType.rows(report_id, types))
+            reports.append(row)
+
+            report_lines = []
+            for name, quantity, unit in gen.product_lines(args.products):
+                product_id = product_ids[name]
+                report_lines.append({'report_id': report_id, 'product_id': product_id, 'quantity': quantity, 'quantity_unit': unit})
+                if gen.rng.random() < args.transactions:
+                    transactions.append({
+                        'product_id': product_id, 'change_type': 'report', 'quantity': -quantity, 'unit': unit,
+                        'report_id': report_id, 'user_id': user_id, 'notes': f'Report #{report_id}',
+                        'created_at': timestamp,
+                    })
+                    inventory[(product_id, unit)] = inventory.get((product_id, unit), 0) - quantity
+            if gen.rng.random() < 0.01:
+                name, quantity, unit = gen.product_lines(1)[0]
+                product_id = product_ids[name]
+                quantity *= 50
+                transactions.append({
+                    'product_id': product_id, 'change_type': 'adjustment', 'quantity': quantity, 'unit': unit,
+                    'report_id': None, 'user_id': admin_id, 'notes': 'קבלת סחורה', 'created_at': timestamp,
+                })
+                inventory[(product_id, unit)] = inventory.get((product_id, unit), 0) + quantity
+
+            lines.extend(report_lines)
+            row.update(report_summary.product_totals(report_lines))
+
+            report_images = gen.image_count(args.images)
+            row['image_count'] = report_images
+            for n in range(report_images):
+                path = os.path.join(str(report_id), 'images', gen.filename())
+                if n == 0:
+                    row['thumbnail_path'] = path
+                images.append({
+                    'report_id': report_id,
+                    'image_path': path,
+                    'image_type': 'goods' if report_type == 'delivery' else 'project',
+                    'uploaded_at': timestamp,
+                })
+                if placeholder:
+                    _write_placeholder(upload_folder, path, placeholder)
+
+        db.session.execute(insert(Report.__table__), reports)
+        if lines:
+            db.session.execute(insert(ReportProduct.__table__), lines)
+        if images:
+            db.session.execute(insert(ReportImage.__table__), images)
+        if type_rows:
+            db.session.execute(insert(ReportInstallationType.__table__), type_rows)
+        if transactions:
+            db.session.execute(insert(InventoryTransaction.__table__), transactions)
+        db.session.commit()
+
+        counts['reports'] += len(reports)
+        counts['report_products'] += len(lines)
+        counts['report_images'] += len(images)
+        counts['inventory_transactions'] += len(transactions)
+        next_id += batch
+        remaining -= batch
+        elapsed = time.perf_counter() - started
+        log(f"    {counts['reports']:>10} reports  {counts['report_products']:>11} lines  "
+            f"{counts['reports'] / elapsed:>8.0f} reports/s")
+
+    _apply_inventory(inventory)
+    _fix_sequences()
+    return {'seed': args.seed, **counts, 'seconds': round(time.perf_counter() - started, 1)}
+
+
+def _apply_inventory(inventory):
+    items = {item.product_id: item for item in InventoryItem.query.all()}
+    for (product_id, unit), delta in inventory.items():
+        item = items.get(product_id)
+        if item is None:
+            item = items[product_id] = InventoryItem(product_id=product_id, quantity_unit=0, quantity_meter=0)
+            db.session.add(item)
+        if unit == 'meter':
+            item.quantity_meter = (item.quantity_meter or 0) + delta
+        else:
+            item.quantity_unit = (item.quantity_unit or 0) + delta
+    db.session.commit()
+
+
+def _fix_sequences():
+    # Reports were inserted with explicit ids; move the PostgreSQL sequence past them
+    if db.engine.dialect.name == 'postgresql':
+        db.session.execute(text(
+            "SELECT setval(pg_get_serial_sequence('reports', 'id'), (SELECT MAX(id) FROM reports))"
+        ))
+        db.session.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Fill the database with synthetic production-scale data')
+    parser.add_argument('--users', type=int, default=100, help='Installers to add')
+    parser.add_argument('--reports', type=int, default=10000)
+    parser.add_argument('--products', type=float, default=5, help='Mean product lines per report')
+    parser.add_argument('--transactions', type=float, default=1.0,
+                        help='Share of product lines with an inventory transaction (the app writes one each)')
+    parser.add_argument('--images', type=float, default=0.5, help='Mean images per report')
+    parser.add_argument('--no-files', action='store_true', help='Image rows only, no placeholder files')
+    parser.add_argument('--companies', type=int, default=150, help='Construction companies')
+    parser.add_argument('--days', type=int, default=730, help='Spread reports over this many past days')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--batch', type=int, default=5000, help='Reports per transaction')
+    parser.add_argument('--json', action='store_true', help='Print results as JSON')
+    args = parser.parse_args()
+
+    from app import app
+    import migrations
+
+    with app.app_context():
+        migrations.upgrade()
+        result = generate(args, app.config['UPLOAD_FOLDER'], (lambda *_: None) if args.json else print)
+
+    if args.json:
+        print(json.dumps(result, indent=2))
+        return
+    print(f"[OK] {result['reports']} reports, {result['report_products']} product lines, "
+          f"{result['report_images']} images, {result['inventory_transactions']} inventory transactions "
+          f"in {result['seconds']} s (seed {result['seed']})")
+
+
+if __name__ == '__main__':
+    main()
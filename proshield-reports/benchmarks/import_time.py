@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Proshield Reports - Import time / worker footprint check
+
+Imports the app in a fresh interpreter with `python -X importtime` (what a
+gunicorn worker pays on cold start) and reports:
+
+    - total import time of `app` and the packages it spends it in (self time)
+    - peak RSS of the interpreter after the import
+    - whether modules that should load lazily (Pillow, openpyxl) were pulled in
+
+Usage:
+    python benchmarks/import_time.py
+    python benchmarks/import_time.py --runs 5 --top 15
+    python benchmarks/import_time.py --max-ms 800 --json   # exit 1 on regression
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Only needed by image uploads / Excel exports
+LAZY_MODULES = ('PIL', 'openpyxl')
+
+_PROBE = (
+    "import resource, sys, json; import app; "
+    "print(json.dumps({'rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, "
+    f"'loaded': [m for m in {LAZY_MODULES!r} if m in sys.modules]}}))"
+)
+
+
+def _run_once():
+    env = dict(os.environ)
+    env.pop('DATABASE_URL', None)  # no auto-migration on import
+    env.pop('RENDER', None)
+    env.pop('RENDER_SERVICE_ID', None)
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', _PROBE],
+        cwd=PROJECT_DIR, env=env, capture_output=True, text=True, check=True
+    )
+
+    packages = {}
+    total_us = None
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        self_us, cumulative_us, name = line.split(':', 1)[1].split('|')
+        name = name.strip()  # leading spaces encode the nesting depth
+        top = name.split('.')[0]
+        packages[top] = packages.get(top, 0) + int(self_us)
+        if name == 'app':
+            total_us = int(cumulative_us)
+
+    probe = json.loads(result.stdout.strip().splitlines()[-1])
+    return {'total_us': total_us, 'packages': packages, **probe}
+
+
+def measure(runs=3):
+    samples = [_run_once() for _ in range(runs)]
+    best = min(samples, key=lambda s: s['total_us'])
+    return {
+        'runs': runs,
+        'app_import_ms_median': round(statistics.median(s['total_us'] for s in samples) / 1000, 1),
+        'app_import_ms_best': round(best['total_us'] / 1000, 1),
+        'rss_mb': round(best['rss_kb'] / 1024, 1),
+        'lazy_modules_loaded': best['loaded'],
+        'packages_ms': {
+            name: round(us / 1000, 1)
+            for name, us in sorted(best['packages'].items(), key=lambda kv: kv[1], reverse=True)
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure app import time and footprint')
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--top', type=int, default=10, help='Packages to list')
+    parser.add_argument('--max-ms', type=float, default=None, help='Fail when the median import exceeds this')
+    parser.add_argument('--json', action='store_true', help='Print results as JSON')
+    args = parser.parse_args()
+
+    result = measure(args.runs)
+    result['packages_ms'] = dict(list(result['packages_ms'].items())[:args.top])
+
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        print(f"import app: {result['app_import_ms_median']} ms median, "
+              f"{result['app_import_ms_best']} ms best of {args.runs}; RSS {result['rss_mb']} MB")
+        for name, ms in result['packages_ms'].items():
+            print(f"  {name:<24}{ms:>8} ms")
+        if result['lazy_modules_loaded']:
+            print(f"[!] Loaded at import time: {', '.join(result['lazy_modules_loaded'])}")
+
+    failed = bool(result['lazy_modules_loaded'])
+    if args.max_ms is not None and result['app_import_ms_median'] > args.max_ms:
+        print(f"[!] Import time {result['app_import_ms_median']} ms exceeds {args.max_ms} ms")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,332 @@
+#!/usr/bin/env python3
+"""
+Proshield Reports - Field traffic load test
+
+Replays shift-end traffic against a running instance (gunicorn, run.py,
+staging). Each virtual user is a thread with its own session cookie and
+keep-alive connection. It logs in, then loops until --duration is up, with
+exponential think time between actions:
+
+    installers (--installers)   create_report  multipart POST /api/reports with --photos phone photos
+                                poll_reports   GET /api/reports?page=1
+                                poll_changes   GET /api/reports/changes?since=<cursor>
+                                sync_burst     POST /api/sync with 5-20 queued reports
+    admins (--admins)           export         GET /api/export for the last 30 days
+                                admin_stats    GET /api/stats
+                                reports_page   GET /api/reports?page=<1..50>
+
+Installers log in as <prefix>0001, <prefix>0002, ... with --password, which
+matches the users benchmarks/generate_data.py creates. Prints throughput,
+latency percentiles and error rates per action and overall, and exits 1
+when more than 1% of requests failed.
+
+Usage:
+    python benchmarks/generate_data.py --reports 100000          # once, against the same database
+    gunicorn wsgi:app                                              # from the repository root
+    python benchmarks/load_test.py --url http://localhost:5000 --installers 40 --admins 2 --duration 60
+    python benchmarks/load_test.py --installers 80 --think 0.5 --photos 3 --json > after.json
+"""
+
+import argparse
+import http.client
+import json
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from http.cookies import SimpleCookie
+from urllib.parse import quote, urlsplit
+
+INSTALLER_MIX = [('create_report', 30), ('poll_reports', 45), ('poll_changes', 15), ('sync_burst', 10)]
+ADMIN_MIX = [('export', 25), ('admin_stats', 25), ('reports_page', 50)]
+
+ADDRESSES = ['רחוב הרצל 15, תל אביב', 'שדרות רוטשילד 30, תל אביב', 'רחוב בן יהודה 50, ירושלים',
+             'רחוב ויצמן 100, רמת גן', "רחוב ז'בוטינסקי 80, פתח תקווה", 'שדרות ירושלים 45, אשדוד']
+PRODUCT_LINES = [('סרט דבק', 'unit', 1, 20), ('Allprotect - Original', 'meter', 10, 200),
+                 ('Floorliner - Vapor Shield', 'meter', 10, 150), ('זווית פינה קשיחה', 'unit', 1, 40)]
+
+
+class Session:
+    """One user: a keep-alive HTTP connection plus its cookies."""
+
+    def __init__(self, base_url, timeout):
+        parts = urlsplit(base_url)
+        self.secure = parts.scheme == 'https'
+        self.host = parts.netloc
+        self.prefix = parts.path.rstrip('/')
+        self.timeout = timeout
+        self.cookies = {}
+        self.conn = None
+
+    def _connect(self):
+        cls = http.client.HTTPSConnection if self.secure else http.client.HTTPConnection
+        self.conn = cls(self.host, timeout=self.timeout)
+
+    def request(self, method, path, body=None, headers=None):
+        headers = dict(headers or {})
+        if self.cookies:
+            headers['Cookie'] = '; '.join(f'{k}={v}' for k, v in self.cookies.items())
+        for attempt in (1, 2):
+            if self.conn is None:
+                self._connect()
+            try:
+                self.conn.request(method, self.prefix + path, body=body, headers=headers)
+                response = self.conn.getresponse()
+                data = response.read()
+                break
+            except (http.client.RemoteDisconnected, BrokenPipeError, ConnectionResetError):
+                # Server closed an idle keep-alive connection (max_requests, keepalive timeout)
+                self.conn.close()
+                self.conn = None
+                if attempt == 2:
+                    raise
+        for header in response.msg.get_all('Set-Cookie') or []:
+            for name, morsel in SimpleCookie(header).items():
+                self.cookies[name] = morsel.value
+        if response.getheader('Connection', '').lower() == 'close':
+            self.conn.close()
+            self.conn = None
+        return response.status, data
+
+    def json(self, method, path, payload):
+        return self.request(method, path, json.dumps(payload).encode('utf-8'), {'Content-Type': 'application/json'})
+
+
+def encode_multipart(fields, files):
+    """(body, content type) for a multipart/form-data POST; files are (field, filename, bytes)."""
+    boundary = uuid.uuid4().hex
+    parts = []
+    for name, value in fields.items():
+        parts.append(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode('utf-8')
+        )
+    for name, filename, data in files:
+        parts.append(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"; filename="{filename}"\r\n'
+            f'Content-Type: image/jpeg\r\n\r\n'.encode('utf-8') + data + b'\r\n'
+        )
+    parts.append(f'--{boundary}--\r\n'.encode('utf-8'))
+    return b''.join(parts), f'multipart/form-data; boundary={boundary}'
+
+
+def make_photo(width, height):
+    """A camera-sized JPEG; noise keeps it close to a real photo's file size."""
+    import io
+    from PIL import Image
+
+    noise = Image.effect_noise((width // 4, height // 4), 48).resize((width, height))
+    gradient = Image.linear_gradient('L').resize((width, height))
+    img = Image.merge('RGB', (noise, gradient, noise.transpose(Image.Transpose.FLIP_TOP_BOTTOM)))
+    out = io.BytesIO()
+    img.save(out, 'JPEG', quality=88)
+    return out.getvalue()
+
+
+class Recorder:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples = {}  # action -> list of (ms, ok, status)
+
+    def add(self, action, ms, ok, status):
+        with self.lock:
+            self.samples.setdefault(action, []).append((ms, ok, status))
+
+    def timed(self, action, call):
+        started = time.perf_counter()
+        try:
+            status, data = call()
+            ok = 200 <= status < 300
+        except Exception as e:
+            status, data, ok = type(e).__name__, None, False
+        self.add(action, (time.perf_counter() - started) * 1000, ok, status)
+        return status, data
+
+    def summary(self, duration):
+        def stats(samples):
+            ms = sorted(s[0] for s in samples)
+            errors = [s for s in samples if not s[1]]
+            statuses = {}
+            for _, _, status in errors:
+                statuses[str(status)] = statuses.get(str(status), 0) + 1
+
+            def pct(p):
+                return round(ms[min(len(ms) - 1, int(len(ms) * p / 100))], 1)
+
+            return {
+                'requests': len(samples),
+                'rps': round(len(samples) / duration, 2),
+                'errors': len(errors),
+                'error_rate': round(len(errors) / len(samples), 4),
+                'error_statuses': statuses,
+                'p50_ms': pct(50),
+                'p95_ms': pct(95),
+                'p99_ms': pct(99),
+                'max_ms': round(ms[-1], 1),
+                'mean_ms': round(statistics.fmean(ms), 1),
+            }
+
+        actions = {name: stats(samples) for name, samples in sorted(self.samples.items())}
+        everything = [s for samples in self.samples.values() for s in samples]
+        return {'actions': actions, 'total': stats(everything) if everything else None}
+
+
+class VirtualUser(threading.Thread):
+    def __init__(self, role, username, password, args, shared, recorder, deadline, seed):
+        super().__init__(name=f'{role}-{username}', daemon=True)
+        self.role = role
+        self.username = username
+        self.password = password
+        self.args = args
+        self.shared = shared
+        self.recorder = recorder
+        self.deadline = deadline
+        self.rng = random.Random(seed)
+        self.session = Session(args.url, args.timeout)
+        self.changes_since = 0
+        mix = INSTALLER_MIX if role == 'installer' else ADMIN_MIX
+        self.actions = [name for name, _ in mix]
+        self.weights = [weight for _, weight in mix]
+
+    def run(self):
+        status, _ = self.recorder.timed('login', lambda: self.session.json(
+            'POST', '/login', {'username': self.username, 'password': self.password}
+        ))
+        if status != 200:
+            return
+        while time.monotonic() < self.deadline:
+            action = self.rng.choices(self.actions, self.weights)[0]
+            self.recorder.timed(action, getattr(self, action))
+            time.sleep(min(self.rng.expovariate(1 / self.args.think), self.args.think * 5))
+
+    # -- installer actions --------------------------------------------------
+
+    def _report_fields(self):
+        report_type = 'delivery' if self.rng.random() < 0.55 else 'installation'
+        products = []
+        for name, unit, low, high in self.rng.sample(PRODUCT_LINES, self.rng.randint(1, 3)):
+            products.append({'name': name, 'unit': unit, 'quantity': self.rng.randint(low, high)})
+        fields = {
+            'report_type': report_type,
+            'address': self.rng.choice(ADDRESSES),
+            'status': 'completed' if self.rng.random() < 0.85 else 'return_required',
+            'customer_name': 'לקוח עומס',
+            'report_datetime': datetime.now().strftime('%Y-%m-%dT%H:%M'),
+            'products': json.dumps(products, ensure_ascii=False),
+            'idempotency_key': uuid.uuid4().hex,
+        }
+        if report_type == 'delivery':
+            fields['recipient_name'] = 'מקבל עומס'
+        else:
+            fields.update({
+                'installation_types': json.dumps(['הגנת ריצוף'], ensure_ascii=False),
+                'protections_count': self.rng.randint(1, 30),
+                'installation_team': 'solo',
+            })
+        return fields
+
+    def create_report(self):
+        files = [('images', f'photo{i}.jpg', self.shared['photo']) for i in range(self.args.photos)]
+        body, content_type = encode_multipart(self._report_fields(), files)
+        return self.session.request('POST', '/api/reports', body, {'Content-Type': content_type})
+
+    def poll_reports(self):
+        return self.session.request('GET', '/api/reports?page=1')
+
+    def poll_changes(self):
+        status, data = self.session.request('GET', f'/api/reports/changes?since={self.changes_since}')
+        if status == 200:
+            self.changes_since = json.loads(data).get('next', self.changes_since)
+        return status, data
+
+    def sync_burst(self):
+        reports = []
+        for _ in range(self.rng.randint(5, 20)):
+            fields = self._report_fields()
+            fields['products'] = json.loads(fields['products'])
+            reports.append(fields)
+        return self.session.json('POST', '/api/sync', {'reports': reports})
+
+    # -- admin actions ------------------------------------------------------
+
+    def export(self):
+        date_from = (datetime.now() - timedelta(days=30)).strftime('%Y-%m-%d')
+        return self.session.request('GET', f'/api/export?date_from={quote(date_from)}')
+
+    def admin_stats(self):
+        return self.session.request('GET', '/api/stats')
+
+    def reports_page(self):
+        return self.session.request('GET', f'/api/reports?page={self.rng.randint(1, 50)}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Shift-end load test against a running instance')
+    parser.add_argument('--url', default='http://localhost:5000')
+    parser.add_argument('--installers', type=int, default=30)
+    parser.add_argument('--admins', type=int, default=2)
+    parser.add_argument('--installer-prefix', default='installer')
+    parser.add_argument('--password', default='password123', help='Installer password')
+    parser.add_argument('--admin-user', default='rotem')
+    parser.add_argument('--admin-password', default=os.environ.get('LOAD_TEST_ADMIN_PASSWORD', 'proshield2025'))
+    parser.add_argument('--duration', type=float, default=60, help='Seconds, ramp-up included')
+    parser.add_argument('--ramp', type=float, default=10, help='Seconds over which users start')
+    parser.add_argument('--think', type=float, default=2.0, help='Mean pause between actions (s)')
+    parser.add_argument('--photos', type=int, default=2, help='Photos per created report')
+    parser.add_argument('--photo-size', default='4032x3024', help='WIDTHxHEIGHT of the test photo')
+    parser.add_argument('--timeout', type=float, default=120)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--json', action='store_true', help='Print results as JSON')
+    args = parser.parse_args()
+
+    width, height = (int(v) for v in args.photo_size.lower().split('x'))
+    shared = {'photo': make_photo(width, height) if args.photos else b''}
+
+    recorder = Recorder()
+    started = time.monotonic()
+    deadline = started + args.duration
+    users = [
+        ('installer', f'{args.installer_prefix}{n:04d}', args.password) for n in range(1, args.installers + 1)
+    ] + [('admin', args.admin_user, args.admin_password) for _ in range(args.admins)]
+    random.Random(args.seed).shuffle(users)
+
+    threads = []
+    for i, (role, username, password) in enumerate(users):
+        thread = VirtualUser(role, username, password, args, shared, recorder, deadline, args.seed + i)
+        thread.start()
+        threads.append(thread)
+        if args.ramp and len(users) > 1:
+            time.sleep(args.ramp / len(users))
+    for thread in threads:
+        thread.join(timeout=max(0, deadline - time.monotonic()) + args.timeout)
+
+    elapsed = time.monotonic() - started
+    result = {
+        'url': args.url,
+        'installers': args.installers,
+        'admins': args.admins,
+        'duration_s': round(elapsed, 1),
+        'photo_kb': len(shared['photo']) // 1024,
+        **recorder.summary(elapsed),
+    }
+
+    if args.json:
+        print(json.dumps(result, indent=2, ensure_ascii=False))
+        return
+    print(f"{args.url}: {args.installers} installers + {args.admins} admins for {result['duration_s']} s "
+          f"(photo {result['photo_kb']} KB x {args.photos})")
+    print(f"  {'action':<15}{'req':>7}{'req/s':>8}{'err %':>8}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}  ms")
+    rows = list(result['actions'].items()) + ([('TOTAL', result['total'])] if result['total'] else [])
+    for name, s in rows:
+        print(f"  {name:<15}{s['requests']:>7}{s['rps']:>8}{s['error_rate'] * 100:>8.1f}"
+              f"{s['p50_ms']:>9}{s['p95_ms']:>9}{s['p99_ms']:>9}{s['max_ms']:>9}"
+              + (f"  {s['error_statuses']}" if s['error_statuses'] else ''))
+    if result['total'] is None or result['total']['error_rate'] > 0.01:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Proshield Reports - Login throughput benchmark
+
+Simulates a shift-start rush inside one worker process: `--concurrency`
+threads log in as different users in a loop (like gthread worker threads),
+while a bystander thread keeps requesting a cheap page and records how long
+it waits. Runs against a throwaway SQLite database.
+
+Reports logins/s, login latency and bystander latency percentiles.
+
+Usage:
+    python benchmarks/login_throughput.py
+    python benchmarks/login_throughput.py --rounds 10 --concurrency 16 --duration 10
+    python benchmarks/login_throughput.py --max-concurrency 64   # effectively unbounded
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+
+def _percentile(values, pct):
+    if not values:
+        return None
+    values = sorted(values)
+    return round(values[min(len(values) - 1, int(len(values) * pct / 100))], 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Login throughput under concurrent logins')
+    parser.add_argument('--rounds', type=int, default=12, help='BCRYPT_ROUNDS for the test users')
+    parser.add_argument('--max-concurrency', type=int, default=None, help='BCRYPT_MAX_CONCURRENCY (default: CPU count)')
+    parser.add_argument('--concurrency', type=int, default=8, help='Threads logging in at once')
+    parser.add_argument('--duration', type=float, default=5.0, help='Seconds')
+    parser.add_argument('--json', action='store_true', help='Print results as JSON')
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    os.environ['DATABASE_URL'] = f'sqlite:///{os.path.join(tmp, "bench.db")}'
+    os.environ['UPLOAD_FOLDER'] = os.path.join(tmp, 'uploads')
+    os.environ['BCRYPT_ROUNDS'] = str(args.rounds)
+    os.environ['USER_CACHE_TTL'] = '0'
+    if args.max_concurrency:
+        os.environ['BCRYPT_MAX_CONCURRENCY'] = str(args.max_concurrency)
+
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from config import Config
+    from app import app
+    from models import db, User
+
+    with app.app_context():
+        for n in range(args.concurrency):
+            user = User(username=f'installer{n}', full_name=f'מתקין {n}', role='user')
+            user.set_password('password123')
+            db.session.add(user)
+        db.session.commit()
+
+    deadline = time.monotonic() + args.duration
+    login_ms, bystander_ms, failures = [], [], []
+
+    def login_loop(n):
+        client = app.test_client()
+        while time.monotonic() < deadline:
+            started = time.perf_counter()
+            r = client.post('/login', json={'username': f'installer{n}', 'password': 'password123'})
+            login_ms.append((time.perf_counter() - started) * 1000)
+            if r.status_code != 200:
+                failures.append(r.status_code)
+            client.get('/logout')
+
+    def bystander_loop():
+        client = app.test_client()
+        while time.monotonic() < deadline:
+            started = time.perf_counter()
+            client.get('/manifest.json')
+            bystander_ms.append((time.perf_counter() - started) * 1000)
+            time.sleep(0.01)
+
+    threads = [threading.Thread(target=login_loop, args=(n,)) for n in range(args.concurrency)]
+    threads.append(threading.Thread(target=bystander_loop))
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    result = {
+        'bcrypt_rounds': args.rounds,
+        'bcrypt_max_concurrency': Config.BCRYPT_MAX_CONCURRENCY,
+        'concurrency': args.concurrency,
+        'duration_s': args.duration,
+        'logins': len(login_ms),
+        'logins_per_s': round(len(login_ms) / args.duration, 1),
+        'login_failures': len(failures),
+        'login_p50_ms': _percentile(login_ms, 50),
+        'login_p95_ms': _percentile(login_ms, 95),
+        'bystander_p50_ms': _percentile(bystander_ms, 50),
+        'bystander_p95_ms': _percentile(bystander_ms, 95),
+    }
+
+    if args.json:
+        print(json.dumps(result, indent=2))
+        return
+    print(f"rounds={result['bcrypt_rounds']} max_concurrency={result['bcrypt_max_concurrency']} "
+          f"threads={result['concurrency']} duration={args.duration:g}s")
+    print(f"  logins/s      {result['logins_per_s']} ({result['login_failures']} failed)")
+    print(f"  login ms      p50 {result['login_p50_ms']}  p95 {result['login_p95_ms']}")
+    print(f"  bystander ms  p50 {result['bystander_p50_ms']}  p95 {result['bystander_p95_ms']}")
+
+
+if __name__ == '__main__':
+    main()
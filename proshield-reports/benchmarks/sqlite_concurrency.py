@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Proshield Reports - SQLite concurrency benchmark
+
+Compares the stock SQLite settings with Config.SQLITE_PRAGMAS under the
+load pattern of several gunicorn workers: writer processes insert reports
+(one report + product lines per transaction, like POST /api/reports) while
+reader processes run the dashboard's "latest reports" query.
+
+Reports, per profile: committed writes/s, "database is locked" failures and
+reader latency percentiles.
+
+Usage:
+    python benchmarks/sqlite_concurrency.py
+    python benchmarks/sqlite_concurrency.py --writers 8 --readers 4 --duration 10
+    python benchmarks/sqlite_concurrency.py --profile tuned --json
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, event, func, insert, select  # noqa: E402
+from sqlalchemy.exc import OperationalError  # noqa: E402
+
+from config import Config  # noqa: E402
+from database import apply_sqlite_pragmas  # noqa: E402
+from models import db, User, Report, ReportProduct, Product  # noqa: E402
+
+PROFILES = {
+    'default': None,
+    'tuned': Config.SQLITE_PRAGMAS,
+}
+
+SEED_REPORTS = 2000
+
+
+def _engine(path, pragmas):
+    engine = create_engine(f'sqlite:///{path}')
+    if pragmas:
+        @event.listens_for(engine, 'connect')
+        def _connect(dbapi_connection, connection_record):
+            apply_sqlite_pragmas(dbapi_connection, pragmas)
+    return engine
+
+
+def _report_row(n):
+    return {
+        'user_id': 1, 'report_type': 'installation', 'address': f'רחוב הרצל {n}, תל אביב',
+        'status': 'completed', 'timestamp': datetime.utcnow(), 'customer_name': 'לקוח',
+    }
+
+
+def _setup(path, pragmas):
+    engine = _engine(path, pragmas)
+    db.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(insert(User), [{'id': 1, 'username': 'bench', 'password_hash': 'x', 'role': 'user', 'full_name': 'bench'}])
+        conn.execute(insert(Product), [{'id': 1, 'name': 'סרט דבק'}, {'id': 2, 'name': 'ניילון'}])
+        conn.execute(insert(Report), [_report_row(n) for n in range(SEED_REPORTS)])
+    engine.dispose()
+
+
+def _writer(path, pragmas, deadline, results):
+    engine = _engine(path, pragmas)
+    commits = locked = 0
+    n = 0
+    while time.monotonic() < deadline:
+        n += 1
+        try:
+            with engine.begin() as conn:
+                report_id = conn.execute(insert(Report).values(**_report_row(n))).inserted_primary_key[0]
+                conn.execute(insert(ReportProduct), [
+                    {'report_id': report_id, 'product_id': 1, 'quantity': 3, 'quantity_unit': 'unit'},
+                    {'report_id': report_id, 'product_id': 2, 'quantity': 12.5, 'quantity_unit': 'meter'},
+                ])
+            commits += 1
+        except OperationalError as e:
+            if 'locked' not in str(e):
+                raise
+            locked += 1
+    engine.dispose()
+    results.put(('writer', commits, locked, []))
+
+
+def _reader(path, pragmas, deadline, results):
+    engine = _engine(path, pragmas)
+    latencies = []
+    locked = 0
+    latest = select(Report.id, Report.address, Report.timestamp).order_by(Report.timestamp.desc()).limit(20)
+    while time.monotonic() < deadline:
+        started = time.perf_counter()
+        try:
+            with engine.connect() as conn:
+                conn.execute(latest).all()
+                conn.execute(select(func.count()).select_from(Report)).scalar()
+        except OperationalError as e:
+            if 'locked' not in str(e):
+                raise
+            locked += 1
+            continue
+        latencies.append((time.perf_counter() - started) * 1000)
+    engine.dispose()
+    results.put(('reader', len(latencies), locked, latencies))
+
+
+def _percentile(values, pct):
+    if not values:
+        return None
+    values = sorted(values)
+    return round(values[min(len(values) - 1, int(len(values) * pct / 100))], 2)
+
+
+def run_profile(name, writers, readers, duration):
+    pragmas = PROFILES[name]
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'bench.db')
+        _setup(path, pragmas)
+
+        results = multiprocessing.Queue()
+        deadline = time.monotonic() + duration + 0.5  # let the processes start
+        procs = [multiprocessing.Process(target=_writer, args=(path, pragmas, deadline, results)) for _ in range(writers)]
+        procs += [multiprocessing.Process(target=_reader, args=(path, pragmas, deadline, results)) for _ in range(readers)]
+        for p in procs:
+            p.start()
+        collected = [results.get() for _ in procs]
+        for p in procs:
+            p.join()
+
+    commits = sum(r[1] for r in collected if r[0] == 'writer')
+    latencies = [ms for r in collected if r[0] == 'reader' for ms in r[3]]
+    return {
+        'profile': name,
+        'writers': writers,
+        'readers': readers,
+        'duration_s': duration,
+        'writes_per_s': round(commits / duration, 1),
+        'write_locked_errors': sum(r[2] for r in collected if r[0] == 'writer'),
+        'reads': len(latencies),
+        'read_locked_errors': sum(r[2] for r in collected if r[0] == 'reader'),
+        'read_p50_ms': _percentile(latencies, 50),
+        'read_p95_ms': _percentile(latencies, 95),
+        'read_p99_ms': _percentile(latencies, 99),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='SQLite write throughput / reader latency benchmark')
+    parser.add_argument('--writers', type=int, default=4)
+    parser.add_argument('--readers', type=int, default=2)
+    parser.add_argument('--duration', type=float, default=5.0, help='Seconds per profile')
+    parser.add_argument('--profile', choices=['both', *PROFILES], default='both')
+    parser.add_argument('--json', action='store_true', help='Print results as JSON')
+    args = parser.parse_args()
+
+    names = list(PROFILES) if args.profile == 'both' else [args.profile]
+    results = [run_profile(name, args.writers, args.readers, args.duration) for name in names]
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"{args.writers} writers, {args.readers} readers, {args.duration:g}s per profile")
+    print(f"{'profile':<10}{'writes/s':>10}{'w-locked':>10}{'reads':>8}{'r-locked':>10}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+    for r in results:
+        print(f"{r['profile']:<10}{r['writes_per_s']:>10}{r['write_locked_errors']:>10}{r['reads']:>8}"
+              f"{r['read_locked_errors']:>10}{r['read_p50_ms']!s:>9}{r['read_p95_ms']!s:>9}{r['read_p99_ms']!s:>9}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+"""
+Proshield Reports - Benchmark suite
+
+Builds a synthetic dataset with generate_data.py in a throwaway SQLite
+database (or uses the configured one with --existing) and measures the hot
+paths through the Flask test client:
+
+    reports_list / _filtered / _deep_page / _installer   GET /api/reports
+    reports_stats                                       GET /api/reports/stats
+    admin_stats                                         GET /api/stats
+    bootstrap_dashboard / _admin                        GET /api/bootstrap/dashboard, /admin
+    export_reports                                      GET /api/export (last 90 days)
+    export_inventory                                    GET /api/inventory/export
+    sync_batch                                          POST /api/sync, --sync-batch new reports
+    inventory_changes                                   200 x apply_inventory_change + commit
+    compress_image                                      a 12MP phone photo
+
+For every case: latency (median / p95 / max over --repeat runs after one
+warm-up), SQL statements per run, and peak Python memory of one extra run
+under tracemalloc.
+
+Results are JSON. With --baseline they are compared to a stored run, and the
+exit code is 1 when a case is slower than its baseline by more than
+--tolerance, runs more queries, or peaks higher in memory by more than
+--memory-tolerance. Query counts do not depend on the machine, but latency
+does, so save the baseline on the machine that runs the comparison (CI or the
+deploy host).
+
+Usage:
+    python benchmarks/suite.py --save-baseline benchmarks/baseline.json
+    python benchmarks/suite.py --baseline benchmarks/baseline.json
+    python benchmarks/suite.py --reports 50000 --repeat 10 --only reports_ --json
+    DATABASE_URL=postgresql://... python benchmarks/suite.py --existing
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _sample_photo():
+    """A 4032x3024 JPEG with enough detail that compression does real work."""
+    from PIL import Image
+
+    noise = Image.effect_noise((1008, 756), 64).resize((4032, 3024))
+    gradient = Image.linear_gradient('L').resize((4032, 3024))
+    img = Image.merge('RGB', (noise, gradient, noise.transpose(Image.Transpose.FLIP_LEFT_RIGHT)))
+    out = io.BytesIO()
+    img.save(out, 'JPEG', quality=92)
+    return out.getvalue()
+
+
+def _percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+class QueryCounter:
+    def __init__(self, engine):
+        from sqlalchemy import event
+
+        self.count = 0
+        event.listen(engine, 'before_cursor_execute', self._before)
+
+    def _before(self, *args):
+        self.count += 1
+
+
+def build_cases(app, args):
+    """name -> zero-argument callable running one iteration."""
+    from models import db, Report
+    from blueprints.inventory import apply_inventory_change
+    from blueprints.uploads import compress_image
+
+    def login(username, password):
+        client = app.test_client()
+        r = client.post('/login', json={'username': username, 'password': password})
+        if r.status_code != 200:
+            sys.exit(f'[!] Cannot log in as {username}: {r.status_code}')
+        return client
+
+    admin = login(args.admin_user, args.admin_password)
+    installer = login(args.installer_user, 'password123')
+
+    with app.app_context():
+        total = db.session.query(Report).count()
+    deep_page = max(1, int(total / 20 * 0.9))
+    date_from = (datetime.now() - timedelta(days=90)).strftime('%Y-%m-%d')
+    photo = _sample_photo()
+    sync_counter = iter(range(10 ** 9))
+
+    def get(client, url):
+        def run():
+            r = client.get(url)
+            if r.status_code != 200:
+                raise RuntimeError(f'{url}: {r.status_code}')
+        return run
+
+    def sync_batch():
+        n = next(sync_counter)
+        payload = {'reports': [{
+            'idempotency_key': f'bench-{os.getpid()}-{n}-{i}',
+            'report_type': 'delivery',
+            'address': 'רחוב הרצל 1, תל אביב',
+            'status': 'completed',
+            'customer_name': 'לקוח בדיקה',
+            'report_datetime': datetime.now().isoformat(timespec='minutes'),
+            'products': [{'name': 'סרט דבק', 'quantity': 2, 'unit': 'unit'},
+                         {'name': 'Allprotect - Original', 'quantity': 30, 'unit': 'meter'}],
+        } for i in range(args.sync_batch)]}
+        r = installer.post('/api/sync', json=payload)
+        if r.status_code != 200:
+            raise RuntimeError(f'/api/sync: {r.status_code}')
+
+    def inventory_changes():
+        with app.app_context():
+            for i in range(200):
+                apply_inventory_change('סרט דבק', 1 if i % 2 else -1, 'unit', 'adjustment', notes='benchmark')
+            db.session.commit()
+
+    def compress():
+        with app.app_context():
+            compress_image(photo)
+
+    return {
+        'reports_list': get(admin, '/api/reports?page=1'),
+        'reports_list_filtered': get(admin, '/api/reports?type=installation&status=completed&search=הרצל&page=1'),
+        'reports_list_deep_page': get(admin, f'/api/reports?page={deep_page}'),
+        'reports_list_installer': get(installer, '/api/reports?page=1'),
+        'reports_stats': get(admin, '/api/reports/stats'),
+        'admin_stats': get(admin, '/api/stats'),
+        'bootstrap_dashboard': get(admin, '/api/bootstrap/dashboard?page=1'),
+        'bootstrap_admin': get(admin, '/api/bootstrap/admin'),
+        'export_reports': get(admin, f'/api/export?date_from={date_from}'),
+        'export_inventory': get(admin, '/api/inventory/export'),
+        'sync_batch': sync_batch,
+        'inventory_changes': inventory_changes,
+        'compress_image': compress,
+    }
+
+
+def measure(run, repeat, counter):
+    run()  # warm-up: caches, lazy imports, SQLite page cache
+
+    timings = []
+    for _ in range(repeat):
+        counter.count = 0
+        started = time.perf_counter()
+        run()
+        timings.append((time.perf_counter() - started) * 1000)
+    queries = counter.count
+
+    tracemalloc.start()
+    run()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'p50_ms': round(statistics.median(timings), 2),
+        'p95_ms': round(_percentile(timings, 95), 2),
+        'max_ms': round(max(timings), 2),
+        'queries': queries,
+        'peak_kb': round(peak / 1024),
+    }
+
+
+def compare(results, baseline, tolerance, memory_tolerance):
+    """Regressions of `results` against a baseline run, as readable strings."""
+    regressions = []
+    for name, current in results.items():
+        base = baseline.get('results', {}).get(name)
+        if not base:
+            continue
+        if current['p50_ms'] > base['p50_ms'] * (1 + tolerance):
+            regressions.append(f"{name}: p50 {current['p50_ms']} ms vs {base['p50_ms']} ms")
+        if current['queries'] > base['queries']:
+            regressions.append(f"{name}: {current['queries']} queries vs {base['queries']}")
+        if current['peak_kb'] > base['peak_kb'] * (1 + memory_tolerance):
+            regressions.append(f"{name}: peak {current['peak_kb']} KB vs {base['peak_kb']} KB")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Latency / query count / memory benchmarks of the hot paths')
+    parser.add_argument('--reports', type=int, default=5000, help='Synthetic dataset size')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--existing', action='store_true',
+                        help='Benchmark the configured database as-is instead of a fresh synthetic one')
+    parser.add_argument('--admin-user', default='rotem')
+    parser.add_argument('--admin-password', default='proshield2025')
+    parser.add_argument('--installer-user', default='installer0001')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--sync-batch', type=int, default=100, help='Reports per /api/sync call')
+    parser.add_argument('--only', default=None, help='Run cases whose name starts with this')
+    parser.add_argument('--baseline', default=None, help='Compare against this results file')
+    parser.add_argument('--save-baseline', default=None, help='Write the results to this file')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='Allowed p50 slowdown (0.25 = 25%%)')
+    parser.add_argument('--memory-tolerance', type=float, default=0.25, help='Allowed peak memory growth')
+    parser.add_argument('--json', action='store_true', help='Print results as JSON')
+    args = parser.parse_args()
+
+    if not args.existing:
+        tmp = tempfile.mkdtemp()
+        os.environ['DATABASE_URL'] = f'sqlite:///{os.path.join(tmp, "bench.db")}'
+        os.environ['UPLOAD_FOLDER'] = os.path.join(tmp, 'uploads')
+    os.environ.setdefault('BCRYPT_ROUNDS', '4')
+    # Keep the diagnostics out of the measurements
+    os.environ['SLOW_QUERY_MS'] = '0'
+    os.environ['PROFILE_DIR'] = ''
+    os.environ['TRACE_LOG'] = ''
+
+    sys.path.insert(0, PROJECT_DIR)
+    # Migration / setup output must not end up in the JSON on stdout
+    with contextlib.redirect_stdout(sys.stderr):
+        from app import app
+        from models import db
+
+        if not args.existing:
+            import generate_data
+
+            options = SimpleNamespace(
+                seed=args.seed, days=730, users=20, companies=150, reports=args.reports,
+                products=5, transactions=1.0, images=0, no_files=True, batch=5000,
+            )
+            with app.app_context():
+                generate_data.generate(options, app.config['UPLOAD_FOLDER'], lambda *_: None)
+
+        cases = build_cases(app, args)
+    with app.app_context():
+        counter = QueryCounter(db.engine)
+        dialect = db.engine.dialect.name
+
+    results = {}
+    for name, run in cases.items():
+        if args.only and not name.startswith(args.only):
+            continue
+        results[name] = measure(run, args.repeat, counter)
+        if not args.json:
+            r = results[name]
+            print(f"  {name:<26}{r['p50_ms']:>10} ms p50{r['p95_ms']:>10} ms p95"
+                  f"{r['queries']:>7} queries{r['peak_kb']:>9} KB peak", flush=True)
+
+    output = {
+        'meta': {
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'database': dialect,
+            'reports': args.reports if not args.existing else None,
+            'seed': args.seed,
+            'repeat': args.repeat,
+        },
+        'results': results,
+    }
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            regressions = compare(results, json.load(f), args.tolerance, args.memory_tolerance)
+        output['regressions'] = regressions
+
+    if args.save_baseline:
+        with open(args.save_baseline, 'w', encoding='utf-8') as f:
+            json.dump(output, f, indent=2, ensure_ascii=False)
+            f.write('\n')
+
+    if args.json:
+        print(json.dumps(output, indent=2, ensure_ascii=False))
+    else:
+        for line in regressions:
+            print(f'[!] {line}')
+        if args.baseline and not regressions:
+            print(f'[OK] No regressions against {args.baseline}')
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
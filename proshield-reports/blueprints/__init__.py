@@ -0,0 +1,8 @@
+"""Route blueprints, registered by app.create_app()."""
+
+
+def register_blueprints(app):
+    from blueprints import admin, auth, bootstrap, export, inventory, reports, uploads
+
+    for module in (auth, reports, inventory, admin, bootstrap, export, uploads):
+        app.register_blueprint(module.bp)
@@ -0,0 +1,337 @@
+"""Admin pages: users, company/project list, product catalog, statistics."""
+
+import hmac
+
+from flask import Blueprint, Response, current_app, render_template, jsonify, redirect, url_for, flash, request, send_file, abort
+from flask_login import login_required, current_user
+
+from sqlalchemy.exc import IntegrityError
+
+from models import db, User, CompanyProject, Product
+import archive
+import catalog
+import database
+import metrics
+import profiling
+import slow_queries
+import suggestions
+import tracing
+from blueprints.auth import invalidate_user
+from blueprints.reports import report_rollup
+
+bp = Blueprint('admin', __name__)
+
+
+@bp.route('/admin')
+@login_required
+def admin_dashboard():
+    if not current_user.is_admin():
+        flash('אין לך הרשאה לגשת לעמוד זה', 'error')
+        return redirect(url_for('reports.dashboard'))
+    return render_template('admin.html')
+
+
+@bp.route('/api/users', methods=['GET'])
+@login_required
+def get_users():
+    """Get all users (admin only)"""
+    if not current_user.is_admin():
+        return jsonify({'success': False, 'error': 'אין הרשאה'}), 403
+
+    return jsonify({'users': users_list(User.query.all())})
+
+
+def users_list(users):
+    return [{
+        'id': u.id,
+        'username': u.username,
+        'full_name': u.full_name,
+        'role': u.role,
+        'is_active': u.is_active
+    } for u in users]
+
+@bp.route('/api/users', methods=['POST'])
+@login_required
+def create_user():
+    """Create new user (admin only)"""
+    if not current_user.is_admin():
+        return jsonify({'success': False, 'error': 'אין הרשאה'}), 403
+
+    data = request.get_json()
+    username = data.get('username', '').strip()
+    password = data.get('password', '')
+    full_name = data.get('full_name', '').strip()
+    role = data.get('role', 'user')
+
+    if not all([username, password, full_name]):
+        return jsonify({'success': False, 'error': 'יש למלא את כל השדות'}), 400
+
+    if User.query.filter_by(username=username).first():
+        return jsonify({'success': False, 'error': 'שם משתמש כבר קיים'}), 400
+
+    user = User(username=username, full_name=full_name, role=role)
+    user.set_password(password)
+    db.session.add(user)
+    db.session.commit()
+
+    return jsonify({'success': True, 'message': 'המשתמש נוצר בהצלחה'})
+
+@bp.route('/api/users/<int:user_id>', methods=['PUT'])
+@login_required
+def update_user(user_id):
+    """Update user details (admin only)"""
+    if not current_user.is_admin():
+        return jsonify({'success': False, 'error': 'אין הרשאה'}), 403
+
+    data = request.get_json() or {}
+    full_name = (data.get('full_name') or '').strip()
+    role = (data.get('role') or 'user').strip()
+    is_active = data.get('is_active')
+
+    if role not in ['user', 'admin']:
+        return jsonify({'success': False, 'error': 'תפקיד לא תקין'}), 400
+
+    user = User.query.get_or_404(user_id)
+
+    if user.id == current_user.id and role != 'admin':
+        return jsonify({'success': False, 'error': 'לא ניתן להסיר הרשאת מנהל מעצמך'}), 400
+
+    if full_name:
+        user.full_name = full_name
+    user.role = role
+
+    if is_active is not None:
+        user.is_active = bool(is_active)
+
+    db.session.commit()
+    invalidate_user(user_id)
+    return jsonify({'success': True, 'message': 'המשתמש עודכן בהצלחה'})
+
+@bp.route('/api/users/<int:user_id>', methods=['DELETE'])
+@login_required
+def delete_user(user_id):
+    """Delete user (admin only)"""
+    if not current_user.is_admin():
+        return jsonify({'success': False, 'error': 'אין הרשאה'}), 403
+
+    if user_id == current_user.id:
+        return jsonify({'success': False, 'error': 'לא ניתן למחוק את עצמך'}), 400
+
+    user = User.query.get_or_404(user_id)
+    db.session.delete(user)
+    db.session.commit()
+    invalidate_user(user_id)
+
+    return jsonify({'success': True, 'message': 'המשתמש נמחק בהצלחה'})
+
+
+@bp.route('/api/company-projects', methods=['GET'])
+@login_required
+def get_company_projects():
+    """Get company/project names"""
+    include_inactive = request.args.get('include_inactive') == 'true'
+    return jsonify({
+        'projects': company_projects(include_inactive and current_user.is_admin())
+    })
+
+
+def company_projects(include_inactive=False):
+    query = CompanyProject.query
+    if not include_inactive:
+        query = query.filter(CompanyProject.is_active == True)  # noqa: E712
+
+    return [p.to_dict() for p in query.order_by(CompanyProject.name.asc()).all()]
+
+
+@bp.route('/api/company-projects', methods=['POST'])
+@login_required
+def create_company_project():
+    """Create company/project (admin only)"""
+    if not current_user.is_admin():
+        return jsonify({'success': False, 'error': 'אין הרשאה'}), 403
+
+    data = request.get_json() or {}
+    name = (data.get('name') or '').strip()
+    if not name:
+        return jsonify({'success': False, 'error': 'יש להזין שם'}), 400
+
+    existing = CompanyProject.query.filter_by(name=name).first()
+    if existing:
+        existing.is_active = True
+        db.session.commit()
+        suggestions.invalidate()
+        return jsonify({'success': True, 'project': existing.to_dict()})
+
+    project = CompanyProject(name=name, is_active=True)
+    db.session.add(project)
+    db.session.commit()
+    suggestions.invalidate()
+
+    return jsonify({'success': True, 'project': project.to_dict()})
+
+
+@bp.route('/api/company-projects/<int:project_id>', methods=['DELETE'])
+@login_required
+def delete_company_project(project_id):
+    """Delete company/project (admin only)"""
+    if not current_user.is_admin():
+        return jsonify({'success': False, 'error': 'אין הרשאה'}), 403
+
+    project = CompanyProject.query.get_or_404(project_id)
+    db.session.delete(project)
+    db.session.commit()
+    suggestions.invalidate()
+
+    return jsonify({'success': True, 'message': 'הפריט נמחק בהצלחה'})
+
+
+@bp.route('/api/products', methods=['GET'])
+@login_required
+def get_products():
+    """Product catalog in display order (admin only)"""
+    if not current_user.is_admin():
+        return jsonify({'success': False, 'error': 'אין הרשאה'}), 403
+
+    products = Product.query.order_by(Product.sort_order.asc(), Product.id.asc()).all()
+    return jsonify({'success': True, 'products': [p.to_dict() for p in products]})
+
+
+@bp.route('/api/products/<int:product_id>', methods=['PUT'])
+@login_required
+def update_product(product_id):
+    """Rename a product or show/hide it in forms (admin only).
+
+    Reports and inventory reference the product by id, so a rename is one row.
+    """
+    if not current_user.is_admin():
+        return jsonify({'success': False, 'error': 'אין הרשאה'}), 403
+
+    product = Product.query.get_or_404(product_id)
+    data = request.get_json() or {}
+    name = (data.get('name') or '').strip()
+    try:
+        if name and name != product.name:
+            catalog.rename(product.id, name)
+        if 'is_active' in data:
+            catalog.set_active(product.id, bool(data['is_active']))
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify({'success': False, 'error': 'קיים כבר מוצר בשם זה'}), 400
+
+    db.session.refresh(product)
+    return jsonify({'success': True, 'product': product.to_dict()})
+
+
+@bp.route('/api/stats')
+@login_required
+@database.replica_reads
+def get_stats():
+    """Get statistics (admin only)"""
+    if not current_user.is_admin():
+        return jsonify({'success': False, 'error': 'אין הרשאה'}), 403
+
+    return jsonify(admin_stats(User.query.all()))
+
+
+def admin_stats(users):
+    """Report totals by status and type, and per user (archived reports included)."""
+    stats = {
+        'total_reports': 0,
+        'completed_reports': 0,
+        'pending_reports': 0,
+        'delivery_reports': 0,
+        'installation_reports': 0,
+    }
+    per_user = {}
+    # One grouped query per table instead of a count per figure and per user
+    for user_id, report_type, status, count in report_rollup() + archive.archived_report_rollup():
+        stats['total_reports'] += count
+        if status == 'completed':
+            stats['completed_reports'] += count
+        elif status == 'return_required':
+            stats['pending_reports'] += count
+        if report_type == 'delivery':
+            stats['delivery_reports'] += count
+        elif report_type == 'installation':
+            stats['installation_reports'] += count
+        per_user[user_id] = per_user.get(user_id, 0) + count
+
+    stats['reports_per_user'] = [
+        {'user_id': user.id, 'full_name': user.full_name, 'count': per_user.get(user.id, 0)}
+        for user in users
+    ]
+    return stats
+
+
+@bp.route('/api/admin/pool-stats')
+@login_required
+def get_pool_stats():
+    """Database connection pool usage of the worker serving this request (admin only)"""
+    if not current_user.is_admin():
+        return jsonify({'success': False, 'error': 'אין הרשאה'}), 403
+
+    return jsonify({'success': True, 'pool': database.pool_stats()})
+
+
+@bp.route('/api/admin/slow-queries')
+@login_required
+def get_slow_queries():
+    """Slowest statements from the slow-query log, grouped by normalized SQL (admin only)"""
+    if not current_user.is_admin():
+        return jsonify({'success': False, 'error': 'אין הרשאה'}), 403
+
+    limit = min(request.args.get('limit', 20, type=int), 100)
+    return jsonify({
+        'success': True,
+        'threshold_ms': current_app.config['SLOW_QUERY_MS'],
+        'queries': slow_queries.worst_offenders(limit),
+    })
+
+
+@bp.route('/api/admin/profiles')
+@login_required
+def get_profiles():
+    """Request profiles captured with ?_profile=1, newest first (admin only)"""
+    if not current_user.is_admin():
+        return jsonify({'success': False, 'error': 'אין הרשאה'}), 403
+
+    return jsonify({'success': True, 'profiles': profiling.list_profiles()})
+
+
+@bp.route('/api/admin/traces/stages')
+@login_required
+def get_trace_stages():
+    """Per-stage latency percentiles of report submission by type and attachment count (admin only)"""
+    if not current_user.is_admin():
+        return jsonify({'success': False, 'error': 'אין הרשאה'}), 403
+
+    return jsonify({'success': True, 'groups': tracing.stage_percentiles()})
+
+
+@bp.route('/admin/profiles/<name>')
+@login_required
+def download_profile(name):
+    """Download a profile as collapsed stacks (flamegraph.pl / speedscope)"""
+    if not current_user.is_admin():
+        abort(403)
+
+    path = profiling.profile_path(name)
+    if path is None:
+        abort(404)
+    return send_file(path, mimetype='text/plain', as_attachment=True, download_name=name + '.collapsed')
+
+
+@bp.route('/metrics')
+def prometheus_metrics():
+    """Prometheus scrape endpoint: admins, METRICS_TOKEN bearer or METRICS_ALLOW_IPS"""
+    token = current_app.config['METRICS_TOKEN']
+    allowed = (
+        (current_user.is_authenticated and current_user.is_admin())
+        or (token and hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'))
+        or request.remote_addr in current_app.config['METRICS_ALLOW_IPS']
+    )
+    if not allowed:
+        return jsonify({'success': False, 'error': 'אין הרשאה'}), 403
+
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
@@ -0,0 +1,118 @@
+"""Login, logout and the user's own settings."""
+
+import time
+
+from flask import Blueprint, current_app, render_template, request, jsonify, redirect, url_for, flash
+from flask_login import LoginManager, login_user, logout_user, login_required, current_user
+
+from models import db, User
+
+bp = Blueprint('auth', __name__)
+
+login_manager = LoginManager()
+login_manager.login_view = 'auth.login'
+login_manager.login_message = 'יש להתחבר כדי לגשת לעמוד זה'
+
+
+# Per-worker cache of detached User rows: user_id -> (expires_at, user).
+# Saves the SELECT Flask-Login would otherwise run on every authenticated
+# request (image fetches, service worker revalidation). Edits through the API
+# invalidate this worker's entry; other workers pick changes up within
+# USER_CACHE_TTL seconds.
+_user_cache = {}
+_USER_CACHE_MAX = 1024
+
+
+def invalidate_user(user_id):
+    _user_cache.pop(int(user_id), None)
+
+
+@login_manager.user_loader
+def load_user(user_id):
+    user_id = int(user_id)
+    ttl = current_app.config['USER_CACHE_TTL']
+    cached = _user_cache.get(user_id)
+    if cached and cached[0] > time.monotonic():
+        # Re-attach a copy without hitting the database
+        return db.session.merge(cached[1], load=False)
+
+    user = db.session.get(User, user_id)
+    if user is None or ttl <= 0:
+        return user
+    if len(_user_cache) >= _USER_CACHE_MAX:
+        _user_cache.clear()
+    db.session.expunge(user)
+    _user_cache[user_id] = (time.monotonic() + ttl, user)
+    return db.session.merge(user, load=False)
+
+
+@bp.route('/')
+def index():
+    if current_user.is_authenticated:
+        return redirect(url_for('reports.dashboard'))
+    return redirect(url_for('auth.login'))
+
+
+@bp.route('/login', methods=['GET', 'POST'])
+def login():
+    if current_user.is_authenticated:
+        return redirect(url_for('reports.dashboard'))
+
+    if request.method == 'POST':
+        data = request.get_json() if request.is_json else request.form
+        username = data.get('username', '').strip()
+        password = data.get('password', '')
+
+        user = User.query.filter_by(username=username).first()
+
+        if user and user.check_password(password) and user.is_active:
+            if user.password_needs_rehash():
+                # BCRYPT_ROUNDS changed since this hash was made
+                user.set_password(password)
+                db.session.commit()
+                invalidate_user(user.id)
+            login_user(user, remember=True)
+            if request.is_json:
+                return jsonify({'success': True, 'redirect': url_for('reports.dashboard')})
+            return redirect(url_for('reports.dashboard'))
+
+        error_msg = 'שם משתמש או סיסמה שגויים'
+        if request.is_json:
+            return jsonify({'success': False, 'error': error_msg}), 401
+        flash(error_msg, 'error')
+
+    return render_template('login.html')
+
+
+@bp.route('/logout')
+@login_required
+def logout():
+    logout_user()
+    return redirect(url_for('auth.login'))
+
+
+@bp.route('/settings')
+@login_required
+def settings():
+    return render_template('settings.html')
+
+
+@bp.route('/api/user/password', methods=['POST'])
+@login_required
+def change_password():
+    """Change user password"""
+    data = request.get_json()
+    current_password = data.get('current_password')
+    new_password = data.get('new_password')
+
+    if not current_user.check_password(current_password):
+        return jsonify({'success': False, 'error': 'הסיסמה הנוכחית שגויה'}), 400
+
+    if len(new_password) < 6:
+        return jsonify({'success': False, 'error': 'הסיסמה החדשה חייבת להכיל לפחות 6 תווים'}), 400
+
+    current_user.set_password(new_password)
+    db.session.commit()
+    invalidate_user(current_user.id)
+
+    return jsonify({'success': True, 'message': 'הסיסמה שונתה בהצלחה'})
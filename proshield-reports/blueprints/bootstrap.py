@@ -0,0 +1,82 @@
+"""Bootstrap endpoints: everything a screen needs for its first render in one request.
+
+Each response carries an ETag (hash of the body) and `Cache-Control: private,
+no-cache`, so the browser revalidates on every visit and an unchanged screen
+costs a 304 without a body. The payload pieces are the same helpers the
+per-resource endpoints use, and a query one piece needs is shared with the
+others instead of being repeated.
+"""
+
+from flask import Blueprint, jsonify, request
+from flask_login import login_required, current_user
+
+from models import User, Report
+import database
+from blueprints.admin import admin_stats, company_projects, users_list
+from blueprints.inventory import inventory_items
+from blueprints.reports import report_rollup, reports_page, reports_stats
+
+bp = Blueprint('bootstrap', __name__)
+
+# Query arguments that do not change which reports the dashboard lists
+_PAGING_ARGS = {'page', 'per_page'}
+
+
+def _conditional(payload):
+    response = jsonify(payload)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    response.add_etag()
+    return response.make_conditional(request)
+
+
+@bp.route('/api/bootstrap/dashboard')
+@login_required
+@database.replica_reads
+def dashboard():
+    """Dashboard tiles and the first page of reports (page/per_page and the /api/reports filters apply)."""
+    rollup = report_rollup(None if current_user.is_admin() else current_user.id)
+    # Unfiltered, the list holds exactly the hot reports counted by the rollup
+    total = sum(row[-1] for row in rollup) if request.args.keys() <= _PAGING_ARGS else None
+
+    return _conditional({
+        'success': True,
+        'stats': reports_stats(rollup),
+        'reports': reports_page(total),
+    })
+
+
+@bp.route('/api/bootstrap/admin')
+@login_required
+def admin():
+    """Statistics, users, company/projects and inventory for the admin page (admin only)"""
+    if not current_user.is_admin():
+        return jsonify({'success': False, 'error': 'אין הרשאה'}), 403
+
+    users = User.query.all()
+    return _conditional({
+        'success': True,
+        'stats': admin_stats(users),
+        'users': users_list(users),
+        'projects': company_projects(),
+        'inventory': inventory_items(),
+    })
+
+
+@bp.route('/api/bootstrap/new-report')
+@login_required
+def new_report():
+    """All active company/projects for the report form, and the report itself with ?report_id= (edit mode)"""
+    payload = {
+        'success': True,
+        'company_projects': company_projects(),
+        'report': None,
+    }
+
+    report_id = request.args.get('report_id', type=int)
+    if report_id is not None:
+        report = Report.query.get_or_404(report_id)
+        if not current_user.is_admin() and report.user_id != current_user.id:
+            return jsonify({'success': False, 'error': 'אין הרשאה'}), 403
+        payload['report'] = report.to_dict()
+
+    return _conditional(payload)
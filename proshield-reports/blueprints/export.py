@@ -0,0 +1,407 @@
+"""Excel exports (openpyxl is imported on first use)."""
+
+from datetime import datetime
+
+from flask import Blueprint, request, jsonify
+from flask_login import login_required, current_user
+
+from models import Report, ArchivedReport, InventoryItem, InventoryTransaction, ArchivedInventoryTransaction, Product
+import archive
+import database
+import metrics
+from blueprints.reports import _includes_archive, filter_attributes
+
+bp = Blueprint('export', __name__)
+
+
+def _export_inventory_to_excel(items, transactions):
+    from openpyxl import Workbook
+    from io import BytesIO
+    from flask import send_file
+
+    wb = Workbook()
+    ws_items = wb.active
+    ws_items.title = "מלאי"
+
+    ws_items.append(['מוצר', 'כמות יחידה', 'כמות מטר', 'עודכן לאחרונה'])
+    for item in items:
+        ws_items.append([
+            item.product_name,
+            item.quantity_unit or 0,
+            item.quantity_meter or 0,
+            item.updated_at.strftime('%d/%m/%Y %H:%M') if item.updated_at else ''
+        ])
+
+    ws_tx = wb.create_sheet(title="תנועות מלאי")
+    ws_tx.append(['מוצר', 'סוג שינוי', 'כמות', 'יחידה', 'דוח', 'משתמש', 'הערה', 'תאריך'])
+    for tx in transactions:
+        ws_tx.append([
+            tx.product_name,
+            tx.change_type,
+            tx.quantity,
+            'יח׳' if tx.unit == 'unit' else 'מ׳',
+            tx.report_id or '',
+            tx.user_id or '',
+            tx.notes or '',
+            tx.created_at.strftime('%d/%m/%Y %H:%M') if tx.created_at else ''
+        ])
+
+    output = BytesIO()
+    wb.save(output)
+    metrics.inc('export_bytes_total', output.tell(), kind='inventory')
+    output.seek(0)
+
+    return send_file(
+        output,
+        mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+        as_attachment=True,
+        download_name=f'inventory_{datetime.now().strftime("%Y%m%d_%H%M%S")}.xlsx'
+    )
+
+
+@bp.route('/api/inventory/export')
+@login_required
+@database.replica_reads
+def export_inventory():
+    """Export inventory and transactions (admin only)"""
+    if not current_user.is_admin():
+        return jsonify({'success': False, 'error': 'אין הרשאה'}), 403
+
+    items = InventoryItem.query.join(Product).order_by(Product.name.asc()).all()
+    transactions = InventoryTransaction.query.order_by(InventoryTransaction.created_at.desc()).all()
+    if request.args.get('include_archived') == 'true':
+        transactions += ArchivedInventoryTransaction.query.all()
+        transactions.sort(key=lambda tx: tx.created_at or datetime.min, reverse=True)
+    with metrics.timer('export_seconds', kind='inventory'):
+        return _export_inventory_to_excel(items, transactions)
+
+
+def _export_reports_to_excel(reports, filename_prefix):
+    from openpyxl import Workbook
+    from openpyxl.styles import Font, Alignment, PatternFill, Border, Side
+    from io import BytesIO
+    from flask import send_file
+    from collections import defaultdict
+
+    wb = Workbook()
+
+    # ---- Sheet 1: Detailed Reports ----
+    ws = wb.active
+    ws.title = "דוחות מפורטים"
+    ws.sheet_view.rightToLeft = True
+
+    # Styles
+    header_font = Font(name='Arial', bold=True, size=11, color='FFFFFF')
+    header_fill = PatternFill(start_color='2563EB', end_color='2563EB', fill_type='solid')
+    header_alignment = Alignment(horizontal='center', vertical='center', wrap_text=True)
+    cell_alignment = Alignment(horizontal='right', vertical='center', wrap_text=True)
+    number_alignment = Alignment(horizontal='center', vertical='center')
+    thin_border = Border(
+        left=Side(style='thin'),
+        right=Side(style='thin'),
+        top=Side(style='thin'),
+        bottom=Side(style='thin')
+    )
+    bold_font = Font(name='Arial', bold=True, size=11)
+    title_font = Font(name='Arial', bold=True, size=14)
+    subtitle_font = Font(name='Arial', bold=True, size=11, color='555555')
+
+    # Title row
+    ws.merge_cells('A1:K1')
+    title_cell = ws['A1']
+    title_cell.value = 'דוח עבודה מפורט'
+    title_cell.font = title_font
+    title_cell.alignment = Alignment(horizontal='center', vertical='center')
+
+    # Subtitle with user name and date range
+    ws.merge_cells('A2:K2')
+    subtitle_cell = ws['A2']
+    user_name = reports[0].author.full_name if reports and reports[0].author else ''
+    if reports:
+        dates = [r.timestamp for r in reports if r.timestamp]
+        if dates:
+            min_date = min(dates).strftime('%d/%m/%Y')
+            max_date = max(dates).strftime('%d/%m/%Y')
+            subtitle_cell.value = f'עובד: {user_name} | תקופה: {min_date} - {max_date} | סה"כ דיווחים: {len(reports)}'
+        else:
+            subtitle_cell.value = f'עובד: {user_name} | סה"כ דיווחים: {len(reports)}'
+    subtitle_cell.font = subtitle_font
+    subtitle_cell.alignment = Alignment(horizontal='center', vertical='center')
+
+    # Headers (row 4)
+    headers = [
+        'תאריך',
+        'שעה',
+        'סוג דוח',
+        'שם לקוח',
+        'חברת בניה/פרויקט',
+        'כתובת',
+        'מוצר',
+        'כמות',
+        'יחידת מידה',
+        'סטטוס',
+        'הערות'
+    ]
+
+    for col_idx, header in enumerate(headers, 1):
+        cell = ws.cell(row=4, column=col_idx, value=header)
+        cell.font = header_font
+        cell.fill = header_fill
+        cell.alignment = header_alignment
+        cell.border = thin_border
+
+    # Data rows - one row per product
+    row_num = 5
+    total_meter = defaultdict(float)
+    total_unit = defaultdict(float)
+
+    # Sort reports by date
+    sorted_reports = sorted(reports, key=lambda r: r.timestamp or datetime.min)
+
+    for report in sorted_reports:
+        products_list = list(report.products)
+        if not products_list:
+            # Report with no products - still show one row
+            for col_idx, val in enumerate([
+                report.timestamp.strftime('%d/%m/%Y') if report.timestamp else '',
+                report.timestamp.strftime('%H:%M') if report.timestamp else '',
+                'אספקה' if report.report_type == 'delivery' else 'התקנה',
+                report.customer_name or '',
+                report.company_project or '',
+                report.address or '',
+                '',
+                '',
+                '',
+                'הושלם' if report.status == 'completed' else 'נדרש חזרה',
+                report.notes or ''
+            ], 1):
+                cell = ws.cell(row=row_num, column=col_idx, value=val)
+                cell.alignment = cell_alignment if col_idx not in [8] else number_alignment
+                cell.border = thin_border
+            row_num += 1
+        else:
+            for p_idx, product in enumerate(products_list):
+                unit_label = 'מטר' if product.quantity_unit == 'meter' else 'יחידה'
+
+                # Track totals
+                if product.quantity_unit == 'meter':
+                    total_meter[product.product_name] += product.quantity
+                else:
+                    total_unit[product.product_name] += product.quantity
+
+                row_data = [
+                    report.timestamp.strftime('%d/%m/%Y') if report.timestamp else '',
+                    report.timestamp.strftime('%H:%M') if report.timestamp else '',
+                    'אספקה' if report.report_type == 'delivery' else 'התקנה',
+                    report.customer_name or '',
+                    report.company_project or '',
+                    report.address or '',
+                    product.product_name,
+                    product.quantity,
+                    unit_label,
+                    'הושלם' if report.status == 'completed' else 'נדרש חזרה',
+                    report.notes or '' if p_idx == 0 else ''
+                ]
+
+                for col_idx, val in enumerate(row_data, 1):
+                    cell = ws.cell(row=row_num, column=col_idx, value=val)
+                    cell.alignment = cell_alignment if col_idx not in [8] else number_alignment
+                    cell.border = thin_border
+
+                row_num += 1
+
+    # ---- Summary section ----
+    row_num += 1
+    ws.merge_cells(start_row=row_num, start_column=1, end_row=row_num, end_column=9)
+    summary_title = ws.cell(row=row_num, column=1, value='סיכום כמויות')
+    summary_title.font = Font(name='Arial', bold=True, size=12)
+    summary_title.alignment = Alignment(horizontal='center', vertical='center')
+    summary_title.fill = PatternFill(start_color='F59E0B', end_color='F59E0B', fill_type='solid')
+    summary_title.font = Font(name='Arial', bold=True, size=12, color='FFFFFF')
+
+    row_num += 1
+    # Summary headers
+    for col_idx, header in enumerate(['מוצר', 'סה"כ מטר', 'סה"כ יחידות'], 1):
+        cell = ws.cell(row=row_num, column=col_idx, value=header)
+        cell.font = bold_font
+        cell.alignment = header_alignment
+        cell.border = thin_border
+        cell.fill = PatternFill(start_color='FEF3C7', end_color='FEF3C7', fill_type='solid')
+
+    row_num += 1
+    all_products = set(list(total_meter.keys()) + list(total_unit.keys()))
+    grand_total_meter = 0
+    grand_total_unit = 0
+
+    for product_name in sorted(all_products):
+        meters = total_meter.get(product_name, 0)
+        units = total_unit.get(product_name, 0)
+        grand_total_meter += meters
+        grand_total_unit += units
+
+        cell_name = ws.cell(row=row_num, column=1, value=product_name)
+        cell_name.alignment = cell_alignment
+        cell_name.border = thin_border
+
+        cell_meter = ws.cell(row=row_num, column=2, value=meters if meters else '')
+        cell_meter.alignment = number_alignment
+        cell_meter.border = thin_border
+
+        cell_units = ws.cell(row=row_num, column=3, value=units if units else '')
+        cell_units.alignment = number_alignment
+        cell_units.border = thin_border
+
+        row_num += 1
+
+    # Grand total row
+    grand_fill = PatternFill(start_color='DBEAFE', end_color='DBEAFE', fill_type='solid')
+    cell_total_label = ws.cell(row=row_num, column=1, value='סה"כ כללי')
+    cell_total_label.font = bold_font
+    cell_total_label.alignment = cell_alignment
+    cell_total_label.border = thin_border
+    cell_total_label.fill = grand_fill
+
+    cell_total_meter = ws.cell(row=row_num, column=2, value=grand_total_meter if grand_total_meter else '')
+    cell_total_meter.font = bold_font
+    cell_total_meter.alignment = number_alignment
+    cell_total_meter.border = thin_border
+    cell_total_meter.fill = grand_fill
+
+    cell_total_unit = ws.cell(row=row_num, column=3, value=grand_total_unit if grand_total_unit else '')
+    cell_total_unit.font = bold_font
+    cell_total_unit.alignment = number_alignment
+    cell_total_unit.border = thin_border
+    cell_total_unit.fill = grand_fill
+
+    # Column widths
+    col_widths = [14, 8, 10, 18, 22, 28, 28, 10, 12, 12, 20]
+    for i, width in enumerate(col_widths, 1):
+        ws.column_dimensions[chr(64 + i)].width = width
+
+    # ---- Sheet 2: Daily Summary ----
+    ws2 = wb.create_sheet(title="סיכום יומי")
+    ws2.sheet_view.rightToLeft = True
+
+    ws2.merge_cells('A1:E1')
+    ws2['A1'].value = 'סיכום יומי'
+    ws2['A1'].font = title_font
+    ws2['A1'].alignment = Alignment(horizontal='center', vertical='center')
+
+    daily_headers = ['תאריך', 'מספר דיווחים', 'אספקה', 'התקנה', 'פירוט']
+    for col_idx, header in enumerate(daily_headers, 1):
+        cell = ws2.cell(row=3, column=col_idx, value=header)
+        cell.font = header_font
+        cell.fill = header_fill
+        cell.alignment = header_alignment
+        cell.border = thin_border
+
+    # Group by date
+    daily_data = defaultdict(lambda: {'count': 0, 'delivery': 0, 'installation': 0, 'details': []})
+    for report in sorted_reports:
+        if report.timestamp:
+            date_key = report.timestamp.strftime('%d/%m/%Y')
+            daily_data[date_key]['count'] += 1
+            if report.report_type == 'delivery':
+                daily_data[date_key]['delivery'] += 1
+            else:
+                daily_data[date_key]['installation'] += 1
+            daily_data[date_key]['details'].append(
+                f"{report.customer_name or ''} - {report.address or ''}"
+            )
+
+    row_num2 = 4
+    for date_key in sorted(daily_data.keys(), key=lambda d: datetime.strptime(d, '%d/%m/%Y')):
+        data = daily_data[date_key]
+        details_str = ' | '.join(data['details'])
+
+        row_data = [date_key, data['count'], data['delivery'], data['installation'], details_str]
+        for col_idx, val in enumerate(row_data, 1):
+            cell = ws2.cell(row=row_num2, column=col_idx, value=val)
+            cell.alignment = cell_alignment if col_idx == 5 else number_alignment
+            cell.border = thin_border
+        row_num2 += 1
+
+    ws2.column_dimensions['A'].width = 14
+    ws2.column_dimensions['B'].width = 14
+    ws2.column_dimensions['C'].width = 10
+    ws2.column_dimensions['D'].width = 10
+    ws2.column_dimensions['E'].width = 50
+
+    # Save to bytes
+    output = BytesIO()
+    wb.save(output)
+    metrics.inc('export_bytes_total', output.tell(), kind=filename_prefix)
+    output.seek(0)
+
+    return send_file(
+        output,
+        mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+        as_attachment=True,
+        download_name=f'{filename_prefix}_{datetime.now().strftime("%Y%m%d_%H%M%S")}.xlsx'
+    )
+
+
+def _filter_export(query, model, user_id, date_from, date_to, report_type):
+    """Apply export filters to a Report or ArchivedReport query.
+
+    installation_type= / product= / company_project= come from request.args (see filter_attributes).
+    """
+    if user_id:
+        query = query.filter(model.user_id == user_id)
+    if date_from:
+        query = query.filter(model.timestamp >= datetime.fromisoformat(date_from))
+    if date_to:
+        query = query.filter(model.timestamp <= datetime.fromisoformat(date_to + 'T23:59:59'))
+    if report_type:
+        query = query.filter(model.report_type == report_type)
+    return filter_attributes(query, model)
+
+
+@bp.route('/api/export')
+@login_required
+@database.replica_reads
+def export_reports():
+    """Export reports to Excel (admin only)"""
+    if not current_user.is_admin():
+        return jsonify({'success': False, 'error': 'אין הרשאה'}), 403
+
+    # Get filters
+    date_from = request.args.get('date_from')
+    date_to = request.args.get('date_to')
+    report_type = request.args.get('type')
+    user_id = request.args.get('user_id', type=int)
+
+    query = _filter_export(Report.query, Report, user_id, date_from, date_to, report_type)
+    reports = query.order_by(Report.timestamp.desc()).all()
+
+    if _includes_archive():
+        reports += _filter_export(ArchivedReport.query, ArchivedReport, user_id, date_from, date_to, report_type).all()
+
+    with metrics.timer('export_seconds', kind='reports'):
+        return _export_reports_to_excel(reports, 'reports')
+
+
+@bp.route('/api/export/mine')
+@login_required
+@database.replica_reads
+def export_my_reports():
+    """Export current user's reports (monthly by default)"""
+    # Get filters
+    date_from = request.args.get('date_from')
+    date_to = request.args.get('date_to')
+    report_type = request.args.get('type')
+
+    # Default: current month if no dates provided
+    if not date_from and not date_to:
+        now = datetime.utcnow()
+        date_from = f"{now.year}-{now.month:02d}-01"
+        date_to = f"{now.year}-{now.month:02d}-{now.day:02d}"
+
+    query = _filter_export(Report.query, Report, current_user.id, date_from, date_to, report_type)
+    reports = query.order_by(Report.timestamp.desc()).all()
+
+    if archive.range_includes_archive(datetime.fromisoformat(date_from) if date_from else None):
+        reports += _filter_export(ArchivedReport.query, ArchivedReport, current_user.id, date_from, date_to, report_type).all()
+
+    with metrics.timer('export_seconds', kind='my_reports'):
+        return _export_reports_to_excel(reports, 'my_reports')
@@ -0,0 +1,131 @@
+"""Inventory balances and the adjustment ledger."""
+
+from flask import Blueprint, render_template, request, jsonify, redirect, url_for, flash
+from flask_login import login_required, current_user
+
+from models import db, InventoryItem, InventoryTransaction
+import catalog
+
+bp = Blueprint('inventory', __name__)
+
+
+def apply_inventory_change(product_name, quantity, unit, change_type, report_id=None, user_id=None, notes=None):
+    """Apply inventory change and record transaction. Allows negative stock."""
+    if unit not in ['unit', 'meter']:
+        unit = 'unit'
+
+    product_id = catalog.product_id(product_name)
+    item = InventoryItem.query.filter_by(product_id=product_id).first()
+    if not item:
+        item = InventoryItem(product_id=product_id, quantity_unit=0, quantity_meter=0)
+        db.session.add(item)
+        db.session.flush()
+
+    if unit == 'meter':
+        item.quantity_meter = (item.quantity_meter or 0) + float(quantity)
+    else:
+        item.quantity_unit = (item.quantity_unit or 0) + float(quantity)
+
+    tx = InventoryTransaction(
+        product_id=product_id,
+        change_type=change_type,
+        quantity=float(quantity),
+        unit=unit,
+        report_id=report_id,
+        user_id=user_id,
+        notes=notes
+    )
+    db.session.add(tx)
+
+
+@bp.route('/inventory')
+@login_required
+def inventory_page():
+    if not current_user.is_admin():
+        flash('אין לך הרשאה לגשת לעמוד זה', 'error')
+        return redirect(url_for('reports.dashboard'))
+    return render_template('inventory.html')
+
+
+@bp.route('/api/inventory', methods=['GET'])
+@login_required
+def get_inventory():
+    """Get inventory list (admin only)"""
+    if not current_user.is_admin():
+        return jsonify({'success': False, 'error': 'אין הרשאה'}), 403
+
+    return jsonify({'items': inventory_items()})
+
+
+def inventory_items():
+    """Stock of every active product in display order (creates and commits missing items)."""
+    # Ensure inventory items exist for all products
+    products = catalog.active_names()
+    existing_items = {i.product_name: i for i in InventoryItem.query.all()}
+    missing = [product for product in products if product not in existing_items]
+    for product in missing:
+        item = InventoryItem(product_id=catalog.product_id(product), quantity_unit=0, quantity_meter=0)
+        db.session.add(item)
+        existing_items[product] = item
+    if missing:
+        # Committing expires the loaded items; only pay for the reload when needed
+        db.session.commit()
+
+    return [existing_items[p].to_dict() for p in products if p in existing_items]
+
+
+@bp.route('/api/inventory/adjust', methods=['POST'])
+@login_required
+def adjust_inventory():
+    """Adjust inventory (admin only). Allows negative stock."""
+    if not current_user.is_admin():
+        return jsonify({'success': False, 'error': 'אין הרשאה'}), 403
+
+    data = request.get_json() or {}
+    items = data.get('items', [])
+    if not isinstance(items, list):
+        return jsonify({'success': False, 'error': 'נתונים לא תקינים'}), 400
+
+    try:
+        for item in items:
+            product_name = (item.get('product_name') or '').strip()
+            if not product_name:
+                continue
+
+            target_unit = float(item.get('quantity_unit') or 0)
+            target_meter = float(item.get('quantity_meter') or 0)
+
+            inv = InventoryItem.query.filter_by(product_id=catalog.product_id(product_name)).first()
+            if not inv:
+                inv = InventoryItem(product_id=catalog.product_id(product_name), quantity_unit=0, quantity_meter=0)
+                db.session.add(inv)
+                db.session.flush()
+
+            delta_unit = target_unit - (inv.quantity_unit or 0)
+            delta_meter = target_meter - (inv.quantity_meter or 0)
+
+            if delta_unit != 0:
+                apply_inventory_change(
+                    product_name=product_name,
+                    quantity=delta_unit,
+                    unit='unit',
+                    change_type='adjustment',
+                    user_id=current_user.id,
+                    notes='Manual adjustment'
+                )
+
+            if delta_meter != 0:
+                apply_inventory_change(
+                    product_name=product_name,
+                    quantity=delta_meter,
+                    unit='meter',
+                    change_type='adjustment',
+                    user_id=current_user.id,
+                    notes='Manual adjustment'
+                )
+
+        db.session.commit()
+        return jsonify({'success': True})
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'error': str(e)}), 500
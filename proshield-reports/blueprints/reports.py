@@ -0,0 +1,972 @@
+"""Report pages, the reports API and offline sync."""
+
+from datetime import datetime
+import json
+import os
+import uuid
+
+from flask import Blueprint, render_template, request, jsonify, redirect, url_for, flash, abort
+from flask_login import login_required, current_user
+from werkzeug.utils import secure_filename
+from sqlalchemy import false, func, insert, or_, select
+from sqlalchemy.orm import joinedload
+from sqlalchemy.exc import IntegrityError
+
+from config import Config
+from models import (
+    db, User, Report, ReportProduct, ReportImage, ReportDocument, ReportInstallationType, InventoryTransaction,
+    ArchivedReport
+)
+import archive
+import catalog
+import database
+import report_changes
+import report_summary
+import suggestions
+import tracing
+from blueprints.inventory import apply_inventory_change
+from blueprints.uploads import allowed_file, save_file
+
+bp = Blueprint('reports', __name__)
+
+
+@bp.route('/dashboard')
+@login_required
+def dashboard():
+    return render_template('dashboard.html')
+
+
+@bp.route('/report/new')
+@login_required
+def new_report():
+    return render_template('new_report.html', products=catalog.active_names())
+
+
+@bp.route('/report/<int:report_id>')
+@login_required
+def view_report(report_id):
+    # Archived reports (listed with include_archived / old date_from) open read-only
+    report = Report.query.get(report_id) or ArchivedReport.query.get_or_404(report_id)
+
+    # Check access permission
+    if not current_user.is_admin() and report.user_id != current_user.id:
+        flash('אין לך הרשאה לצפות בדוח זה', 'error')
+        return redirect(url_for('reports.dashboard'))
+
+    return render_template('view_report.html', report=report, archived=isinstance(report, ArchivedReport))
+
+
+@bp.route('/report/<int:report_id>/edit')
+@login_required
+def edit_report(report_id):
+    report = Report.query.get(report_id)
+    if report is None:
+        if db.session.query(ArchivedReport.id).filter_by(id=report_id).scalar() is not None:
+            flash('דוח בארכיון אינו ניתן לעריכה', 'error')
+            return redirect(url_for('reports.view_report', report_id=report_id))
+        abort(404)
+
+    if not current_user.is_admin() and report.user_id != current_user.id:
+        flash('אין לך הרשאה לערוך דוח זה', 'error')
+        return redirect(url_for('reports.dashboard'))
+
+    return render_template('new_report.html', products=catalog.active_names(), edit_mode=True, report_id=report.id)
+
+
+def _filter_reports(query, model):
+    """Apply the /api/reports filters from request.args to a Report or ArchivedReport query."""
+    report_type = request.args.get('type')
+    status = request.args.get('status')
+    date_from = request.args.get('date_from')
+    date_to = request.args.get('date_to')
+    search = request.args.get('search')
+    user_search = request.args.get('user_search')
+    user_id = request.args.get('user_id', type=int)
+
+    # Base scope
+    if current_user.is_admin():
+        if user_id:
+            query = query.filter(model.user_id == user_id)
+    else:
+        query = query.filter(model.user_id == current_user.id)
+
+    # Apply filters
+    if report_type:
+        query = query.filter(model.report_type == report_type)
+    if status:
+        query = query.filter(model.status == status)
+    if date_from:
+        query = query.filter(model.timestamp >= datetime.fromisoformat(date_from))
+    if date_to:
+        query = query.filter(model.timestamp <= datetime.fromisoformat(date_to + 'T23:59:59'))
+    if search:
+        query = query.filter(or_(
+            model.address.ilike(f'%{search}%'),
+            model.customer_name.ilike(f'%{search}%'),
+            model.company_project.ilike(f'%{search}%')
+        ))
+
+    if user_search and current_user.is_admin():
+        query = query.join(User, model.user_id == User.id).filter(or_(
+            User.full_name.ilike(f'%{user_search}%'),
+            User.username.ilike(f'%{user_search}%')
+        ))
+
+    return filter_attributes(query, model)
+
+
+def filter_attributes(query, model):
+    """`installation_type=`, `product=` (name or id) and `company_project=` filters from request.args.
+
+    On Report they are index lookups (report_installation_types,
+    report_products (product_id, report_id), reports (company_project,
+    timestamp)). Archived reports only keep JSON snapshots, so there they
+    are LIKE scans of the (cold) archive table.
+    """
+    installation_type = (request.args.get('installation_type') or '').strip()
+    product = (request.args.get('product') or '').strip()
+    company_project = (request.args.get('company_project') or '').strip()
+
+    if company_project:
+        query = query.filter(model.company_project == company_project)
+
+    if installation_type:
+        if model is Report:
+            query = query.filter(Report.id.in_(
+                select(ReportInstallationType.report_id)
+                .where(ReportInstallationType.installation_type == installation_type)
+            ))
+        else:
+            query = query.filter(model.installation_types.contains(json.dumps(installation_type, ensure_ascii=False)))
+
+    if product:
+        product_id = int(product) if product.isdigit() else catalog.product_id(product, create=False)
+        if product_id is None:
+            return query.filter(false())
+        if model is Report:
+            query = query.filter(Report.id.in_(
+                select(ReportProduct.report_id).where(ReportProduct.product_id == product_id)
+            ))
+        else:
+            # Snapshots hold the product name as it was when the report was archived
+            name = json.dumps(catalog.name(product_id), ensure_ascii=False)
+            query = query.filter(model.products_json.contains(f'"product_name": {name}'))
+
+    return query
+
+
+def _includes_archive():
+    """Whether the current request's date range reaches into the archive."""
+    date_from = request.args.get('date_from')
+    return archive.range_includes_archive(
+        datetime.fromisoformat(date_from) if date_from else None,
+        include_archived=request.args.get('include_archived') == 'true'
+    )
+
+
+@bp.route('/api/reports', methods=['GET'])
+@login_required
+@database.replica_reads
+def get_reports():
+    """Get reports - all for admin, own for regular users.
+
+    Rows are list summaries (counts, totals, thumbnail); GET /api/reports/<id>
+    has the products, images and documents.
+    """
+    return jsonify(reports_page())
+
+
+def reports_page(total=None):
+    """One page of /api/reports for the filters in request.args.
+
+    `total` skips the count query when the caller already knows how many hot
+    reports match (the unfiltered dashboard, see blueprints/bootstrap.py).
+    """
+    page = request.args.get('page', 1, type=int)
+    per_page = request.args.get('per_page', 20, type=int)
+
+    query = _filter_reports(Report.query, Report)
+
+    if _includes_archive():
+        items, total = archive.paginate_with_archive(
+            query, _filter_reports(ArchivedReport.query, ArchivedReport), page, per_page
+        )
+        return {
+            'reports': [r.to_summary_dict() for r in items],
+            'total': total,
+            'pages': (total + per_page - 1) // per_page if per_page else 0,
+            'current_page': page
+        }
+
+    # Order and paginate
+    query = query.options(joinedload(Report.author)).order_by(Report.timestamp.desc())
+    pagination = query.paginate(page=page, per_page=per_page, error_out=False, count=total is None)
+    if total is not None:
+        pagination.total = total
+
+    return {
+        'reports': [r.to_summary_dict() for r in pagination.items],
+        'total': pagination.total,
+        'pages': pagination.pages,
+        'current_page': page
+    }
+
+@bp.route('/api/reports/changes', methods=['GET'])
+@login_required
+def get_report_changes():
+    """Delta sync: reports created/edited and ids deleted since `since`.
+
+    `since` is the `next` token from the previous call (omit it or pass 0 for
+    a full download). Keep calling with the returned token while `has_more`.
+    """
+    since_raw = request.args.get('since') or '0'
+    try:
+        since = int(since_raw)
+    except ValueError:
+        return jsonify({'success': False, 'error': 'טוקן סנכרון לא תקין'}), 400
+    limit = min(max(request.args.get('limit', 200, type=int), 1), 1000)
+
+    changed, deleted, next_seq, has_more = report_changes.changes_since(
+        since,
+        user_id=None if current_user.is_admin() else current_user.id,
+        limit=limit
+    )
+    return jsonify({
+        'changes': [r.to_dict() for r in changed],
+        'deleted': deleted,
+        'next': str(next_seq),
+        'has_more': has_more
+    })
+
+
+@bp.route('/api/suggest/<field>', methods=['GET'])
+@login_required
+def suggest(field):
+    """Typeahead for the report form: most used customer_name / address / company_project values matching ?q="""
+    if field not in suggestions.FIELDS:
+        return jsonify({'success': False, 'error': 'שדה לא נתמך'}), 404
+    limit = min(max(request.args.get('limit', 8, type=int), 1), 20)
+
+    return jsonify({
+        'success': True,
+        'suggestions': suggestions.suggest(field, request.args.get('q', ''), limit)
+    })
+
+
+@bp.route('/api/reports/stats', methods=['GET'])
+@login_required
+@database.replica_reads
+def get_reports_stats():
+    """Get report statistics for dashboard"""
+    return jsonify(reports_stats())
+
+
+def report_rollup(user_id=None):
+    """Hot report counts grouped by (user_id, report_type, status); see archive.archived_report_rollup."""
+    query = db.session.query(Report.user_id, Report.report_type, Report.status, func.count())
+    if user_id is not None:
+        query = query.filter(Report.user_id == user_id)
+    return query.group_by(Report.user_id, Report.report_type, Report.status).all()
+
+
+def reports_stats(rollup=None):
+    """Dashboard tiles for the current user (everyone's reports for admins).
+
+    `rollup` is report_rollup() for the same scope, when the caller has it.
+    """
+    user_id = None if current_user.is_admin() else current_user.id
+    if rollup is None:
+        rollup = report_rollup(user_id)
+
+    # Reports this month
+    now = datetime.utcnow()
+    first_day_of_month = datetime(now.year, now.month, 1)
+    this_month_query = Report.query.filter(Report.timestamp >= first_day_of_month)
+    if user_id is not None:
+        this_month_query = this_month_query.filter(Report.user_id == user_id)
+
+    # Archived reports still count towards the totals
+    stats = {'total': 0, 'delivery': 0, 'installation': 0, 'this_month': this_month_query.count()}
+    for _, report_type, _, count in list(rollup) + archive.archived_report_rollup(user_id):
+        stats['total'] += count
+        if report_type in ('delivery', 'installation'):
+            stats[report_type] += count
+    return stats
+
+
+@bp.route('/api/reports', methods=['POST'])
+@login_required
+@tracing.traced('create_report')
+def create_report():
+    """Create a new report"""
+    try:
+        # Get form data (the first request.form access parses the multipart body)
+        tracing.stage('parse_form')
+        report_type = request.form.get('report_type')
+        address = request.form.get('address')
+        status = request.form.get('status')
+        notes = request.form.get('notes', '')
+        products_json = request.form.get('products', '[]')
+
+        # Delivery / Installation extra fields
+        customer_name = (request.form.get('customer_name') or '').strip()
+        company_project = (request.form.get('company_project') or '').strip()
+        recipient_name = (request.form.get('recipient_name') or '').strip()
+        report_datetime_raw = request.form.get('report_datetime')
+
+        # Installation team fields
+        installation_team = (request.form.get('installation_team') or '').strip()
+        additional_worker_name = (request.form.get('additional_worker_name') or '').strip()
+
+        # installation_types is expected to be a JSON array string from the client
+        installation_types_raw = request.form.get('installation_types')
+        # Backward compatibility (if a client still sends a single installation_type)
+        installation_type_single = request.form.get('installation_type')
+
+        protections_count_raw = request.form.get('protections_count')
+
+        tracing.set_attributes(**{
+            'report.type': report_type,
+            'attachments': sum(1 for _, f in request.files.items(multi=True) if f.filename),
+        })
+
+        # The form and offline queue replays carry a client key; a retry returns the stored report
+        idempotency_key = (request.form.get('idempotency_key') or '').strip()[:64] or None
+        if idempotency_key:
+            existing_id = db.session.query(Report.id).filter_by(idempotency_key=idempotency_key).scalar()
+            if existing_id:
+                return jsonify({
+                    'success': True,
+                    'report_id': existing_id,
+                    'duplicate': True,
+                    'message': 'הדוח נשמר בהצלחה'
+                })
+
+        # Validate required fields
+        tracing.stage('validate')
+        if not all([report_type, address, status]):
+            return jsonify({'success': False, 'error': 'יש למלא את כל השדות הנדרשים'}), 400
+
+        if not customer_name:
+            return jsonify({'success': False, 'error': 'יש להזין שם לקוח'}), 400
+
+        # Parse report date/time
+        report_timestamp = None
+        if report_datetime_raw:
+            try:
+                # Expecting "YYYY-MM-DDTHH:MM" from datetime-local
+                report_timestamp = datetime.fromisoformat(report_datetime_raw)
+            except ValueError:
+                return jsonify({'success': False, 'error': 'תאריך/שעה לא תקין'}), 400
+        else:
+            return jsonify({'success': False, 'error': 'יש לבחור תאריך ושעה'}), 400
+
+        # Installation extra validation
+        protections_count = None
+        installation_types_list = []
+        installation_type_display = None
+
+        if report_type == 'installation':
+            # Parse types
+            if installation_types_raw:
+                try:
+                    installation_types_list = json.loads(installation_types_raw)
+                    if not isinstance(installation_types_list, list):
+                        installation_types_list = []
+                except json.JSONDecodeError:
+                    installation_types_list = []
+
+            # Fallback to legacy single field
+            if not installation_types_list and installation_type_single:
+                installation_types_list = [installation_type_single]
+
+            # Validate
+            if not installation_types_list:
+                return jsonify({'success': False, 'error': 'יש לבחור לפחות סוג התקנה אחד'}), 400
+
+            installation_type_display = ', '.join([str(x) for x in installation_types_list if x])
+
+            try:
+                protections_count = int(protections_count_raw) if protections_count_raw is not None else None
+            except (TypeError, ValueError):
+                protections_count = None
+
+            # Installation team validation
+            if not installation_team:
+                return jsonify({'success': False, 'error': 'יש לבחור צוות התקנה'}), 400
+
+            if installation_team == 'with_worker' and not additional_worker_name:
+                return jsonify({'success': False, 'error': 'יש להזין שם עובד נוסף'}), 400
+
+        # Parse products
+        try:
+            products_data = json.loads(products_json)
+        except json.JSONDecodeError:
+            products_data = []
+
+        if not products_data:
+            return jsonify({'success': False, 'error': 'יש לבחור לפחות מוצר אחד'}), 400
+
+        # Create report
+        tracing.stage('insert_report')
+        report = Report(
+            user_id=current_user.id,
+            report_type=report_type,
+            customer_name=customer_name,
+            recipient_name=recipient_name if report_type == 'delivery' else None,
+            company_project=company_project or None,
+            installation_type=installation_type_display if report_type == 'installation' else None,
+            installation_types=(
+                json.dumps(installation_types_list, ensure_ascii=False)
+                if report_type == 'installation'
+                else None
+            ),
+            protections_count=protections_count if report_type == 'installation' else None,
+            installation_team=installation_team if report_type == 'installation' else None,
+            additional_worker_name=additional_worker_name if report_type == 'installation' and installation_team == 'with_worker' else None,
+            address=address,
+            status=status,
+            notes=notes,
+            timestamp=report_timestamp,
+            idempotency_key=idempotency_key
+        )
+        db.session.add(report)
+        db.session.flush()  # Get report ID
+
+        type_rows = ReportInstallationType.rows(report.id, installation_types_list if report_type == 'installation' else [])
+        if type_rows:
+            db.session.execute(insert(ReportInstallationType), type_rows)
+
+        # Add products
+        tracing.stage('products', count=len(products_data))
+        for product in products_data:
+            if product.get('name') and product.get('quantity'):
+                unit = product.get('unit') or 'unit'
+                if unit not in ['unit', 'meter']:
+                    unit = 'unit'
+
+                report_product = ReportProduct(
+                    report_id=report.id,
+                    product_id=catalog.product_id(product['name']),
+                    quantity=float(product['quantity']),
+                    quantity_unit=unit
+                )
+                db.session.add(report_product)
+
+                # Inventory: subtract reported quantity
+                apply_inventory_change(
+                    product_name=product['name'],
+                    quantity=-float(product['quantity']),
+                    unit=unit,
+                    change_type='report',
+                    report_id=report.id,
+                    user_id=current_user.id,
+                    notes=f"Report #{report.id}"
+                )
+
+        # Handle delivery note upload (OPTIONAL for delivery reports)
+        if report_type == 'delivery':
+            delivery_note = request.files.get('delivery_note')
+            if delivery_note and delivery_note.filename:
+                tracing.stage('delivery_note')
+                if not allowed_file(delivery_note.filename, 'document'):
+                    db.session.rollback()
+                    return jsonify({'success': False, 'error': 'סוג קובץ לא חוקי. יש להעלות PDF או תמונה'}), 400
+
+                # Check file size (10MB max)
+                delivery_note.seek(0, 2)  # Seek to end
+                file_size = delivery_note.tell()
+                delivery_note.seek(0)  # Reset to beginning
+
+                if file_size > Config.MAX_DOCUMENT_SIZE:
+                    db.session.rollback()
+                    return jsonify({'success': False, 'error': 'קובץ תעודת המשלוח גדול מדי (מקסימום 10MB)'}), 400
+
+                doc_path = save_file(delivery_note, report.id, 'delivery_note')
+                if doc_path:
+                    report_doc = ReportDocument(
+                        report_id=report.id,
+                        document_path=doc_path,
+                        original_filename=secure_filename(delivery_note.filename)
+                    )
+                    db.session.add(report_doc)
+
+        # Handle image uploads
+        images = request.files.getlist('images')
+        if images:
+            tracing.stage('images', count=len(images))
+        for image in images:
+            if image and image.filename and allowed_file(image.filename, 'image'):
+                if image.content_length and image.content_length > Config.MAX_IMAGE_SIZE:
+                    continue  # Skip oversized files
+
+                image_path = save_file(image, report.id, 'image')
+                if image_path:
+                    image_type = 'goods' if report_type == 'delivery' else 'project'
+                    report_image = ReportImage(
+                        report_id=report.id,
+                        image_path=image_path,
+                        image_type=image_type
+                    )
+                    db.session.add(report_image)
+
+        tracing.stage('commit')
+        report_summary.refresh([report.id])
+        db.session.commit()
+
+        return jsonify({
+            'success': True,
+            'report_id': report.id,
+            'message': 'הדוח נשמר בהצלחה'
+        })
+
+    except IntegrityError:
+        # Concurrent replay of the same idempotency key won the race
+        db.session.rollback()
+        existing_id = db.session.query(Report.id).filter_by(idempotency_key=idempotency_key).scalar() if idempotency_key else None
+        if existing_id:
+            return jsonify({'success': True, 'report_id': existing_id, 'duplicate': True, 'message': 'הדוח נשמר בהצלחה'})
+        return jsonify({'success': False, 'error': 'שגיאה בשמירת הדוח'}), 500
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'error': f'שגיאה בשמירת הדוח: {str(e)}'}), 500
+
+
+@bp.route('/api/reports/<int:report_id>', methods=['GET'])
+@login_required
+@database.replica_reads
+def get_report(report_id):
+    """Get single report (falls back to the read-only archive)"""
+    report = Report.query.get(report_id) or ArchivedReport.query.get_or_404(report_id)
+
+    if not current_user.is_admin() and report.user_id != current_user.id:
+        return jsonify({'success': False, 'error': 'אין הרשאה'}), 403
+
+    return jsonify(report.to_dict())
+
+
+@bp.route('/api/reports/<int:report_id>', methods=['PUT'])
+@login_required
+def update_report(report_id):
+    """Update a report and sync inventory"""
+    report = Report.query.get_or_404(report_id)
+
+    if not current_user.is_admin() and report.user_id != current_user.id:
+        return jsonify({'success': False, 'error': 'אין הרשאה'}), 403
+
+    try:
+        report_type = request.form.get('report_type')
+        address = request.form.get('address')
+        status = request.form.get('status')
+        notes = request.form.get('notes', '')
+        products_json = request.form.get('products', '[]')
+
+        customer_name = (request.form.get('customer_name') or '').strip()
+        company_project = (request.form.get('company_project') or '').strip()
+        recipient_name = (request.form.get('recipient_name') or '').strip()
+        report_datetime_raw = request.form.get('report_datetime')
+
+        installation_team = (request.form.get('installation_team') or '').strip()
+        additional_worker_name = (request.form.get('additional_worker_name') or '').strip()
+
+        installation_types_raw = request.form.get('installation_types')
+        installation_type_single = request.form.get('installation_type')
+
+        if not all([report_type, address, status]):
+            return jsonify({'success': False, 'error': 'יש למלא את כל השדות הנדרשים'}), 400
+
+        if not customer_name:
+            return jsonify({'success': False, 'error': 'יש להזין שם לקוח'}), 400
+
+        # Parse report date/time
+        report_timestamp = None
+        if report_datetime_raw:
+            try:
+                report_timestamp = datetime.fromisoformat(report_datetime_raw)
+            except ValueError:
+                return jsonify({'success': False, 'error': 'תאריך/שעה לא תקין'}), 400
+        else:
+            return jsonify({'success': False, 'error': 'יש לבחור תאריך ושעה'}), 400
+
+        # Installation types
+        installation_types_list = []
+        installation_type_display = None
+        if report_type == 'installation':
+            if installation_types_raw:
+                try:
+                    installation_types_list = json.loads(installation_types_raw)
+                    if not isinstance(installation_types_list, list):
+                        installation_types_list = []
+                except json.JSONDecodeError:
+                    installation_types_list = []
+
+            if not installation_types_list and installation_type_single:
+                installation_types_list = [installation_type_single]
+
+            if not installation_types_list:
+                return jsonify({'success': False, 'error': 'יש לבחור לפחות סוג התקנה אחד'}), 400
+
+            installation_type_display = ', '.join([str(x) for x in installation_types_list if x])
+
+            # Installation team validation
+            if not installation_team:
+                return jsonify({'success': False, 'error': 'יש לבחור צוות התקנה'}), 400
+
+            if installation_team == 'with_worker' and not additional_worker_name:
+                return jsonify({'success': False, 'error': 'יש להזין שם עובד נוסף'}), 400
+
+        # Parse products
+        try:
+            products_data = json.loads(products_json)
+        except json.JSONDecodeError:
+            products_data = []
+
+        if not products_data:
+            return jsonify({'success': False, 'error': 'יש לבחור לפחות מוצר אחד'}), 400
+
+        # Revert inventory from old products
+        for old_product in report.products:
+            apply_inventory_change(
+                product_name=old_product.product_name,
+                quantity=float(old_product.quantity),
+                unit=old_product.quantity_unit or 'unit',
+                change_type='report_edit',
+                report_id=report.id,
+                user_id=current_user.id,
+                notes=f"Revert Report #{report.id}"
+            )
+
+        # Clear old products
+        ReportProduct.query.filter_by(report_id=report.id).delete()
+
+        ReportInstallationType.query.filter_by(report_id=report.id).delete()
+        type_rows = ReportInstallationType.rows(report.id, installation_types_list if report_type == 'installation' else [])
+        if type_rows:
+            db.session.execute(insert(ReportInstallationType), type_rows)
+
+        # Update report fields
+        report.report_type = report_type
+        report.customer_name = customer_name
+        report.recipient_name = recipient_name if report_type == 'delivery' else None
+        report.company_project = company_project or None
+        report.address = address
+        report.status = status
+        report.notes = notes
+        report.timestamp = report_timestamp
+        report.installation_types = (
+            json.dumps(installation_types_list, ensure_ascii=False)
+            if report_type == 'installation'
+            else None
+        )
+        report.installation_type = installation_type_display if report_type == 'installation' else None
+        report.installation_team = installation_team if report_type == 'installation' else None
+        report.additional_worker_name = additional_worker_name if report_type == 'installation' and installation_team == 'with_worker' else None
+
+        # Add new products + apply inventory
+        for product in products_data:
+            if product.get('name') and product.get('quantity'):
+                unit = product.get('unit') or 'unit'
+                if unit not in ['unit', 'meter']:
+                    unit = 'unit'
+
+                report_product = ReportProduct(
+                    report_id=report.id,
+                    product_id=catalog.product_id(product['name']),
+                    quantity=float(product['quantity']),
+                    quantity_unit=unit
+                )
+                db.session.add(report_product)
+
+                apply_inventory_change(
+                    product_name=product['name'],
+                    quantity=-float(product['quantity']),
+                    unit=unit,
+                    change_type='report_edit',
+                    report_id=report.id,
+                    user_id=current_user.id,
+                    notes=f"Update Report #{report.id}"
+                )
+
+        report_summary.refresh([report.id])
+        db.session.commit()
+        return jsonify({'success': True, 'report_id': report.id})
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'error': f'שגיאה בעדכון הדוח: {str(e)}'}), 500
+
+
+@bp.route('/api/reports/<int:report_id>', methods=['DELETE'])
+@login_required
+def delete_report(report_id):
+    """Delete a report"""
+    report = Report.query.get_or_404(report_id)
+
+    # Check permission
+    if not current_user.is_admin() and report.user_id != current_user.id:
+        return jsonify({'success': False, 'error': 'אין לך הרשאה למחוק דוח זה'}), 403
+
+    try:
+        # Revert inventory changes for this report
+        for product in report.products:
+            apply_inventory_change(
+                product_name=product.product_name,
+                quantity=float(product.quantity),
+                unit=product.quantity_unit or 'unit',
+                change_type='report_delete',
+                report_id=report.id,
+                user_id=current_user.id,
+                notes=f"Delete Report #{report.id}"
+            )
+
+        # Clear inventory transaction references to this report so FK constraint won't block delete
+        InventoryTransaction.query.filter_by(report_id=report.id).delete()
+
+        # Delete associated files
+        report_dir = os.path.join(Config.UPLOAD_FOLDER, str(report_id))
+        if os.path.exists(report_dir):
+            import shutil
+            shutil.rmtree(report_dir)
+
+        db.session.delete(report)
+        db.session.commit()
+
+        return jsonify({'success': True, 'message': 'הדוח נמחק בהצלחה'})
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+
+def _offline_idempotency_key(report_data):
+    """The report's idempotency key, or None (keys of the wrong type are rejected by _offline_report_row)."""
+    key = report_data.get('idempotency_key') if isinstance(report_data, dict) else None
+    return key if isinstance(key, str) and key else None
+
+
+def _offline_report_row(report_data, user_id):
+    """Validate one offline report payload and build its reports/report_products rows.
+
+    Raises ValueError with a user-facing message when the payload is unusable.
+    """
+    offline_type = report_data.get('report_type')
+    address = report_data.get('address')
+    status = report_data.get('status')
+    if not all([offline_type, address, status]):
+        raise ValueError('יש למלא את כל השדות הנדרשים')
+
+    idempotency_key = report_data.get('idempotency_key') or None
+    if idempotency_key is not None and (not isinstance(idempotency_key, str) or len(idempotency_key) > 64):
+        raise ValueError('מזהה סנכרון לא תקין')
+
+    offline_protections_raw = report_data.get('protections_count')
+    try:
+        offline_protections_count = int(offline_protections_raw) if offline_protections_raw is not None else None
+    except (TypeError, ValueError):
+        offline_protections_count = None
+
+    offline_installation_types = report_data.get('installation_types')
+    if isinstance(offline_installation_types, str):
+        try:
+            offline_installation_types = json.loads(offline_installation_types)
+        except json.JSONDecodeError:
+            offline_installation_types = []
+
+    if not isinstance(offline_installation_types, list):
+        offline_installation_types = []
+
+    installation_type_display = ', '.join([str(x) for x in offline_installation_types if x])
+
+    report_timestamp = None
+    for field in ('report_datetime', 'timestamp'):
+        raw = report_data.get(field)
+        if raw and report_timestamp is None:
+            try:
+                report_timestamp = datetime.fromisoformat(raw.replace('Z', '+00:00')).replace(tzinfo=None)
+            except (AttributeError, ValueError):
+                report_timestamp = None
+
+    offline_products = report_data.get('products') or []
+    if not isinstance(offline_products, list) or not all(isinstance(p, dict) for p in offline_products):
+        raise ValueError('רשימת מוצרים לא תקינה')
+
+    products = []
+    for product in offline_products:
+        if product.get('name') and product.get('quantity'):
+            unit = product.get('unit') or 'unit'
+            if unit not in ['unit', 'meter']:
+                unit = 'unit'
+            try:
+                quantity = float(product['quantity'])
+            except (TypeError, ValueError):
+                raise ValueError(f"כמות לא תקינה עבור {product['name']}")
+            products.append({'product_id': catalog.product_id(product['name']), 'quantity': quantity, 'quantity_unit': unit})
+
+    installation_team = report_data.get('installation_team') or None
+    report_row = {
+        'user_id': user_id,
+        'report_type': offline_type,
+        'customer_name': report_data.get('customer_name'),
+        'recipient_name': report_data.get('recipient_name') if offline_type == 'delivery' else None,
+        'company_project': report_data.get('company_project') or None,
+        'installation_type': installation_type_display if offline_type == 'installation' else None,
+        'installation_types': (
+            json.dumps(offline_installation_types, ensure_ascii=False)
+            if offline_type == 'installation'
+            else None
+        ),
+        'protections_count': offline_protections_count if offline_type == 'installation' else None,
+        'installation_team': installation_team if offline_type == 'installation' else None,
+        'additional_worker_name': (
+            report_data.get('additional_worker_name') or None
+            if offline_type == 'installation' and installation_team == 'with_worker'
+            else None
+        ),
+        'address': address,
+        'status': status,
+        'notes': report_data.get('notes', ''),
+        'timestamp': report_timestamp or datetime.utcnow(),
+        'synced': True,
+        'idempotency_key': idempotency_key,
+        **report_summary.product_totals(products),
+    }
+    return report_row, products
+
+
+def _bulk_insert_reports(entries):
+    """Insert (index, report_row, products) entries.
+
+    The reports and their product lines are each one executemany, and the new
+    ids are read back in one SELECT by idempotency key (an ordered RETURNING
+    would be one INSERT per report on SQLite). Reports sent without a key get
+    a generated one. Stock is then reduced by every product line, as
+    create_report does, one inventory update per line.
+
+    Returns {index: report_id}. Must run inside a savepoint: a unique-key
+    collision aborts the whole batch, inventory changes included.
+    """
+    rows = [
+        dict(row, idempotency_key=row['idempotency_key'] or f'sync-{uuid.uuid4().hex}')
+        for _, row, _ in entries
+    ]
+    db.session.execute(insert(Report), report_changes.stamp_rows(rows))
+    keys = [row['idempotency_key'] for row in rows]
+    ids = dict(db.session.query(Report.idempotency_key, Report.id).filter(Report.idempotency_key.in_(keys)).all())
+    inserted = [ids[key] for key in keys]
+
+    product_rows = []
+    for (_, row, products), report_id in zip(entries, inserted):
+        product_rows.extend(dict(p, report_id=report_id) for p in products)
+        for p in products:
+            # Inventory: subtract reported quantity
+            apply_inventory_change(
+                product_name=catalog.name(p['product_id']),
+                quantity=-p['quantity'],
+                unit=p['quantity_unit'],
+                change_type='report',
+                report_id=report_id,
+                user_id=row['user_id'],
+                notes=f"Report #{report_id}"
+            )
+    if product_rows:
+        db.session.execute(insert(ReportProduct), product_rows)
+
+    type_rows = []
+    for (_, row, _), report_id in zip(entries, inserted):
+        if row['installation_types']:
+            type_rows.extend(ReportInstallationType.rows(report_id, json.loads(row['installation_types'])))
+    if type_rows:
+        db.session.execute(insert(ReportInstallationType), type_rows)
+
+    return {index: report_id for (index, _, _), report_id in zip(entries, inserted)}
+
+
+@bp.route('/api/sync', methods=['POST'])
+@login_required
+def sync_offline_reports():
+    """Sync offline reports.
+
+    Reports may carry a client-generated `idempotency_key`: a key that was
+    already synced is answered with status 'duplicate' instead of creating a
+    second report. Valid reports are bulk-inserted in one savepoint; if that
+    fails (e.g. a concurrent retry of the same key) each report is retried in
+    its own savepoint, so one bad report never takes the others down with it.
+    The response holds one result per submitted report, in order.
+    """
+    data = request.get_json() or {}
+    offline_reports = data.get('reports', [])
+    if not isinstance(offline_reports, list):
+        return jsonify({'success': False, 'error': 'נתונים לא תקינים'}), 400
+
+    results = [
+        {'index': index, 'idempotency_key': _offline_idempotency_key(r)}
+        for index, r in enumerate(offline_reports)
+    ]
+
+    keys = [r['idempotency_key'] for r in results if r['idempotency_key']]
+    existing = {}
+    if keys:
+        existing = dict(
+            db.session.query(Report.idempotency_key, Report.id).filter(Report.idempotency_key.in_(keys)).all()
+        )
+
+    entries = []
+    seen_keys = set()
+    for result, report_data in zip(results, offline_reports):
+        key = result['idempotency_key']
+        if key and (key in existing or key in seen_keys):
+            result.update(status='duplicate', report_id=existing.get(key))
+            continue
+        try:
+            if not isinstance(report_data, dict):
+                raise ValueError('נתונים לא תקינים')
+            report_row, products = _offline_report_row(report_data, current_user.id)
+        except ValueError as e:
+            result.update(status='error', error=str(e))
+            continue
+        if key:
+            seen_keys.add(key)
+        entries.append((result['index'], report_row, products))
+
+    created = {}
+    if entries:
+        try:
+            with db.session.begin_nested():
+                created = _bulk_insert_reports(entries)
+        except IntegrityError:
+            # Slow path: one savepoint per report
+            for entry in entries:
+                try:
+                    with db.session.begin_nested():
+                        created.update(_bulk_insert_reports([entry]))
+                except IntegrityError:
+                    key = entry[1]['idempotency_key']
+                    existing_id = db.session.query(Report.id).filter_by(idempotency_key=key).scalar() if key else None
+                    if existing_id:
+                        results[entry[0]].update(status='duplicate', report_id=existing_id)
+                    else:
+                        results[entry[0]].update(status='error', error='שגיאה בשמירת הדוח')
+                except Exception as e:
+                    results[entry[0]].update(status='error', error=str(e))
+
+    # Duplicates within the same batch point at the report created for their key
+    created_by_key = {
+        entry[1]['idempotency_key']: created[entry[0]]
+        for entry in entries if entry[0] in created and entry[1]['idempotency_key']
+    }
+    for result in results:
+        if result['index'] in created:
+            result.update(status='created', report_id=created[result['index']])
+        elif result.get('status') == 'duplicate' and result.get('report_id') is None:
+            result['report_id'] = created_by_key.get(result['idempotency_key'])
+            if result['report_id'] is None:
+                result.update(status='error', error='שגיאה בשמירת הדוח')
+
+    db.session.commit()
+
+    return jsonify({
+        'success': True,
+        'synced_count': len(created),
+        'results': results,
+        'errors': [r['error'] for r in results if r.get('status') == 'error']
+    })
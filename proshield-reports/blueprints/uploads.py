@@ -0,0 +1,109 @@
+"""Uploaded files and PWA files served from disk (Pillow is imported on first use)."""
+
+from io import BytesIO
+import os
+import uuid
+
+from flask import Blueprint, send_from_directory
+from flask_login import login_required
+
+from config import Config
+import metrics
+import tracing
+
+bp = Blueprint('uploads', __name__)
+
+
+def allowed_file(filename, file_type='image'):
+    if file_type == 'image':
+        allowed = Config.ALLOWED_IMAGE_EXTENSIONS
+    else:
+        allowed = Config.ALLOWED_DOCUMENT_EXTENSIONS
+    return '.' in filename and filename.rsplit('.', 1)[1].lower() in allowed
+
+def compress_image(image_data, max_size=Config.MAX_IMAGE_DIMENSION, quality=Config.JPEG_QUALITY):
+    """Compress and resize image"""
+    from PIL import Image
+
+    with metrics.timer('image_compress_seconds'):
+        img = Image.open(BytesIO(image_data))
+
+        # Convert to RGB if necessary
+        if img.mode in ('RGBA', 'P'):
+            img = img.convert('RGB')
+
+        # Resize if too large
+        if img.width > max_size or img.height > max_size:
+            img.thumbnail((max_size, max_size), Image.Resampling.LANCZOS)
+
+        # Save to bytes
+        output = BytesIO()
+        img.save(output, format='JPEG', quality=quality, optimize=True)
+    output.seek(0)
+    return output
+
+def save_file(file, report_id, file_type='image'):
+    """Save uploaded file with compression for images"""
+    if not file:
+        return None
+
+    # Create directory structure
+    report_dir = os.path.join(Config.UPLOAD_FOLDER, str(report_id))
+    if file_type == 'image':
+        save_dir = os.path.join(report_dir, 'images')
+    elif file_type == 'delivery_note':
+        save_dir = os.path.join(report_dir, 'delivery_note')
+    else:
+        save_dir = os.path.join(report_dir, 'documents')
+
+    os.makedirs(save_dir, exist_ok=True)
+
+    # Generate unique filename
+    ext = file.filename.rsplit('.', 1)[1].lower() if '.' in file.filename else 'jpg'
+    if file_type == 'image':
+        ext = 'jpg'  # Always save images as JPEG after compression
+    filename = f"{uuid.uuid4().hex}.{ext}"
+    filepath = os.path.join(save_dir, filename)
+
+    if file_type == 'image':
+        # Compress and save image
+        data = file.read()
+        metrics.inc('upload_bytes_total', len(data), kind=file_type)
+        with tracing.span('compress_image', bytes=len(data)):
+            compressed = compress_image(data)
+        with tracing.span('write_file'):
+            with open(filepath, 'wb') as f:
+                f.write(compressed.read())
+        metrics.inc('image_stored_bytes_total', os.path.getsize(filepath))
+    else:
+        with tracing.span('write_file'):
+            file.save(filepath)
+        metrics.inc('upload_bytes_total', os.path.getsize(filepath), kind=file_type)
+
+    # Return relative path for storage
+    if file_type == 'image':
+        subdir = 'images'
+    elif file_type == 'delivery_note':
+        subdir = 'delivery_note'
+    else:
+        subdir = 'documents'
+    return os.path.join(str(report_id), subdir, filename)
+
+
+@bp.route('/uploads/reports/<path:filename>')
+@login_required
+def uploaded_file(filename):
+    """Serve uploaded files"""
+    return send_from_directory(Config.UPLOAD_FOLDER, filename)
+
+# PWA routes
+@bp.route('/manifest.json')
+def manifest():
+    return send_from_directory('static', 'manifest.json')
+
+@bp.route('/sw.js')
+def service_worker():
+    response = send_from_directory('static/js', 'sw.js')
+    response.headers['Service-Worker-Allowed'] = '/'
+    response.headers['Content-Type'] = 'application/javascript'
+    return response
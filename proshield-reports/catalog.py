@@ -0,0 +1,124 @@
+"""Product catalog: the `products` table and a per-worker id <-> name cache.
+
+Report lines, inventory items and ledger rows reference products by integer
+id, and the name lives in a single `products` row, so a rename is one UPDATE
+(`rename`). The catalog is a few dozen rows: each worker keeps all of it in
+memory and reloads it every PRODUCT_CACHE_TTL seconds (a rename made by
+another worker shows up within that time), or straight away when a lookup
+misses.
+
+Names that are not in the catalog (old API clients, typos in synced payloads)
+are added as inactive products by `product_id(name)`, the way inventory items
+used to be created on first use.
+"""
+
+import time
+
+from sqlalchemy import event, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from config import Config
+from models import db, Product
+
+
+class _Snapshot:
+    __slots__ = ('expires', 'names', 'ids', 'active')
+
+    def __init__(self, expires=0.0, names=None, ids=None, active=()):
+        self.expires = expires
+        self.names = names or {}  # id -> name
+        self.ids = ids or {}      # name -> id
+        self.active = active      # names offered in forms, in display order
+
+
+# Replaced as a whole, so request threads never see a half-built cache
+_snapshot = _Snapshot()
+
+
+def _load():
+    global _snapshot
+    rows = db.session.query(Product.id, Product.name, Product.sort_order, Product.is_active).all()
+    active = sorted((r for r in rows if r.is_active), key=lambda r: (r.sort_order or 0, r.id))
+    _snapshot = _Snapshot(
+        expires=time.monotonic() + Config.PRODUCT_CACHE_TTL,
+        names={r.id: r.name for r in rows},
+        ids={r.name: r.id for r in rows},
+        active=tuple(r.name for r in active),
+    )
+    return _snapshot
+
+
+def _current():
+    snapshot = _snapshot
+    return snapshot if snapshot.expires > time.monotonic() else _load()
+
+
+def invalidate():
+    global _snapshot
+    _snapshot = _Snapshot()
+
+
+def name(product_id):
+    """Product name for an id (None for None)."""
+    if product_id is None:
+        return None
+    found = _current().names.get(product_id)
+    if found is None:
+        found = _load().names.get(product_id)
+    return found
+
+
+def product_id(product_name, create=True):
+    """Id of a product name; unknown names are added as inactive products unless create=False."""
+    product_name = str(product_name)
+    found = _current().ids.get(product_name)
+    if found is None:
+        found = _load().ids.get(product_name)
+    if found is None and create:
+        found = _create(product_name)
+    return found
+
+
+def active_names():
+    """Names of the products offered in forms and on the inventory page, in display order."""
+    return list(_current().active)
+
+
+def _create(product_name):
+    try:
+        with db.session.begin_nested():
+            product = Product(name=product_name, sort_order=len(_snapshot.names) + 1, is_active=False)
+            db.session.add(product)
+        created = product.id
+    except IntegrityError:
+        # Another request added it first
+        created = db.session.query(Product.id).filter_by(name=product_name).scalar()
+    # Not cached until committed: a rollback would free the id for another name
+    db.session.info['catalog_changed'] = True
+    invalidate()
+    return created
+
+
+def rename(product_id, new_name):
+    """Rename a product everywhere it is used (no commit).
+
+    Raises IntegrityError when another product already has the name.
+    """
+    db.session.execute(update(Product).where(Product.id == product_id).values(name=new_name))
+    db.session.info['catalog_changed'] = True
+    invalidate()
+
+
+def set_active(product_id, is_active):
+    """Offer a product in forms and on the inventory page, or stop offering it (no commit)."""
+    db.session.execute(update(Product).where(Product.id == product_id).values(is_active=is_active))
+    db.session.info['catalog_changed'] = True
+    invalidate()
+
+
+@event.listens_for(Session, 'after_commit')
+@event.listens_for(Session, 'after_rollback')
+def _after_transaction(session):
+    if session.info.pop('catalog_changed', False):
+        invalidate()
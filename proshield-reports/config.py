@@ -12,6 +12,29 @@ def _is_render() -> bool:
     return os.environ.get('RENDER', '').lower() == 'true' or bool(os.environ.get('RENDER_SERVICE_ID'))
 
 
+def _engine_options(url):
+    """Pool options for one engine, from environment variables.
+
+    pre_ping + recycle drop connections the server or a proxy closed while
+    idle; the statement timeout stops a runaway query from holding a
+    connection forever (PostgreSQL only).
+    """
+    options = {
+        'pool_pre_ping': os.environ.get('DB_POOL_PRE_PING', 'true').lower() == 'true',
+        'pool_recycle': int(os.environ.get('DB_POOL_RECYCLE', '1800')),
+    }
+    if url.startswith('postgres'):
+        options.update({
+            'pool_size': int(os.environ.get('DB_POOL_SIZE', '5')),
+            'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', '10')),
+            'pool_timeout': int(os.environ.get('DB_POOL_TIMEOUT', '30')),
+        })
+        statement_timeout = int(os.environ.get('DB_STATEMENT_TIMEOUT_MS', '60000'))
+        if statement_timeout > 0:
+            options['connect_args'] = {'options': f'-c statement_timeout={statement_timeout}'}
+    return options
+
+
 class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'proshield-secret-key-2025-change-in-production'
 
@@ -29,6 +52,28 @@ class Config:
 
     SQLALCHEMY_TRACK_MODIFICATIONS = False
 
+    # Connection pool (per worker process); see _engine_options above
+    SQLALCHEMY_ENGINE_OPTIONS = _engine_options(SQLALCHEMY_DATABASE_URI)
+
+    # Optional read replica for heavy GET endpoints (listings, stats, exports).
+    # A user's own writes pin their requests to the primary for
+    # REPLICA_STICKY_SECONDS; a failing replica is skipped for REPLICA_RETRY_SECONDS.
+    _replica_url = os.environ.get('DATABASE_REPLICA_URL')
+    SQLALCHEMY_BINDS = {'replica': {'url': _replica_url, **_engine_options(_replica_url)}} if _replica_url else {}
+    REPLICA_STICKY_SECONDS = int(os.environ.get('REPLICA_STICKY_SECONDS', '15'))
+    REPLICA_RETRY_SECONDS = int(os.environ.get('REPLICA_RETRY_SECONDS', '30'))
+
+    # SQLite connection profile, applied to every new connection (see database.py).
+    # Ignored for PostgreSQL. SQLITE_JOURNAL_MODE=DELETE restores the old rollback journal.
+    SQLITE_PRAGMAS = {
+        'journal_mode': os.environ.get('SQLITE_JOURNAL_MODE', 'WAL'),
+        'synchronous': os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL'),
+        'busy_timeout': int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', '5000')),
+        'mmap_size': int(os.environ.get('SQLITE_MMAP_SIZE', str(256 * 1024 * 1024))),
+        'cache_size': int(os.environ.get('SQLITE_CACHE_SIZE', '-20000')),  # negative = KiB
+        'temp_store': os.environ.get('SQLITE_TEMP_STORE', 'MEMORY'),
+    }
+
     # Upload settings
     # Prefer an explicit env var (useful for Render persistent disk mount)
     _upload_override = os.environ.get('UPLOAD_FOLDER')
@@ -44,9 +89,58 @@ class Config:
     ALLOWED_IMAGE_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'webp'}
     ALLOWED_DOCUMENT_EXTENSIONS = {'pdf', 'png', 'jpg', 'jpeg'}
 
+    # /metrics (Prometheus text): open to admins, to `Authorization: Bearer
+    # METRICS_TOKEN` and to the comma-separated METRICS_ALLOW_IPS. With several
+    # workers set METRICS_DIR so every scrape sums all of them (see metrics.py).
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+    METRICS_ALLOW_IPS = [ip.strip() for ip in os.environ.get('METRICS_ALLOW_IPS', '').split(',') if ip.strip()]
+    METRICS_DIR = os.environ.get('METRICS_DIR')
+    METRICS_FLUSH_SECONDS = int(os.environ.get('METRICS_FLUSH_SECONDS', '5'))
+
+    # Slow-query log: statements slower than SLOW_QUERY_MS (0 disables) are
+    # written with their route, parameter types and query plan (see slow_queries.py)
+    SLOW_QUERY_MS = float(os.environ.get('SLOW_QUERY_MS', '250'))
+    SLOW_QUERY_LOG = os.environ.get('SLOW_QUERY_LOG') or os.path.join(
+        '/tmp' if _is_render() else os.path.join(basedir, 'instance'), 'slow_queries.log'
+    )
+    SLOW_QUERY_LOG_MAX_BYTES = int(os.environ.get('SLOW_QUERY_LOG_MAX_BYTES', str(5 * 1024 * 1024)))
+    SLOW_QUERY_LOG_BACKUPS = int(os.environ.get('SLOW_QUERY_LOG_BACKUPS', '3'))
+    SLOW_QUERY_EXPLAIN = os.environ.get('SLOW_QUERY_EXPLAIN', 'true').lower() == 'true'
+
+    # Admin request profiling (`?_profile=1`, see profiling.py). Empty PROFILE_DIR disables it.
+    PROFILE_DIR = os.environ.get('PROFILE_DIR', os.path.join(
+        '/tmp' if _is_render() else os.path.join(basedir, 'instance'), 'profiles'
+    ))
+    PROFILE_KEEP = int(os.environ.get('PROFILE_KEEP', '50'))
+    PROFILE_INTERVAL_MS = float(os.environ.get('PROFILE_INTERVAL_MS', '5'))
+
+    # Span traces of report submission as OTLP/JSON lines (see tracing.py). Empty TRACE_LOG disables them.
+    TRACE_LOG = os.environ.get('TRACE_LOG', os.path.join(
+        '/tmp' if _is_render() else os.path.join(basedir, 'instance'), 'traces.jsonl'
+    ))
+    TRACE_LOG_MAX_BYTES = int(os.environ.get('TRACE_LOG_MAX_BYTES', str(10 * 1024 * 1024)))
+    TRACE_LOG_BACKUPS = int(os.environ.get('TRACE_LOG_BACKUPS', '3'))
+
     # Session settings
     PERMANENT_SESSION_LIFETIME = timedelta(days=7)
+    # bcrypt work factor for new hashes; older hashes are upgraded at login.
+    # At most BCRYPT_MAX_CONCURRENCY hashes run at once per worker; further logins wait their turn.
+    BCRYPT_ROUNDS = int(os.environ.get('BCRYPT_ROUNDS', '12'))
+    BCRYPT_MAX_CONCURRENCY = int(os.environ.get('BCRYPT_MAX_CONCURRENCY', str(os.cpu_count() or 2)))
+    # Seconds a worker reuses the logged-in user's row without a query (0 disables)
+    USER_CACHE_TTL = int(os.environ.get('USER_CACHE_TTL', '30'))
+    # Seconds a worker reuses its copy of the product catalog (renames in other workers show up after this)
+    PRODUCT_CACHE_TTL = int(os.environ.get('PRODUCT_CACHE_TTL', '60'))
+    # Seconds before a worker's typeahead index picks up reports written by other workers
+    SUGGEST_REFRESH_SECONDS = int(os.environ.get('SUGGEST_REFRESH_SECONDS', '30'))
+    # Seconds between full rebuilds of the typeahead index (drops values of edited/deleted reports)
+    SUGGEST_REBUILD_SECONDS = int(os.environ.get('SUGGEST_REBUILD_SECONDS', '3600'))
 
     # Image compression
     MAX_IMAGE_DIMENSION = 1920  # Max width/height after compression
     JPEG_QUALITY = 85
+
+    # Archival: reports / inventory transactions older than this many days are
+    # moved to the *_archive tables by `python archive.py`. 0 disables archival.
+    ARCHIVE_AFTER_DAYS = int(os.environ.get('ARCHIVE_AFTER_DAYS', '730'))
+    ARCHIVE_BATCH_SIZE = int(os.environ.get('ARCHIVE_BATCH_SIZE', '500'))
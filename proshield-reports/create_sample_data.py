@@ -12,7 +12,9 @@ import random
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 from app import app, db
-from models import User, Report, ReportProduct, PRODUCTS
+from models import User, Report, ReportProduct
+import catalog
+import report_summary
 
 def create_sample_users():
     """Create sample users"""
@@ -84,16 +86,17 @@ def create_sample_reports():
 
         # Add 2-5 random products
         num_products = random.randint(2, 5)
-        selected_products = random.sample(PRODUCTS, num_products)
+        selected_products = random.sample(catalog.active_names(), num_products)
 
         for product_name in selected_products:
             quantity = round(random.uniform(1, 50), 1)
             product = ReportProduct(
                 report_id=report.id,
-                product_name=product_name,
+                product_id=catalog.product_id(product_name),
                 quantity=quantity
             )
             db.session.add(product)
+        report_summary.refresh([report.id])
 
         reports_created += 1
 
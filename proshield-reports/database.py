@@ -0,0 +1,209 @@
+"""Engine tuning hooks.
+
+SQLite runs with its defaults (rollback journal, synchronous=FULL, no busy
+handler beyond the driver's) unless told otherwise, which makes concurrent
+report submissions from several workers serialize on the journal and fail
+with "database is locked". `init_app` applies Config.SQLITE_PRAGMAS to every
+new SQLite connection:
+
+    journal_mode=WAL      readers no longer block the writer (and vice versa)
+    synchronous=NORMAL    fsync at checkpoints only; safe with WAL
+    busy_timeout          wait for the write lock instead of failing at once
+    mmap_size             read pages through the OS page cache
+    cache_size            per-connection page cache (negative = KiB)
+    temp_store=MEMORY     sorts / temp indexes off disk
+
+journal_mode=WAL is stored in the database file; the others are per
+connection. Nothing is changed for PostgreSQL.
+
+Pool sizing / pre-ping / recycle / statement timeout come from
+Config.SQLALCHEMY_ENGINE_OPTIONS. When the app is imported before forking
+(gunicorn --preload), the children must not reuse the parent's pooled
+sockets: `dispose_engines()` runs in every forked child and drops them
+without closing the parent's connections. `pool_stats()` reports the
+current worker's pool for sizing it against real load.
+
+Read replica: with DATABASE_REPLICA_URL set, views decorated with
+`replica_reads` run their queries against the 'replica' bind (see
+models.RoutingSession). A user who just wrote something reads from the
+primary for REPLICA_STICKY_SECONDS, and a replica that raises a database
+error is skipped for REPLICA_RETRY_SECONDS while the request is retried on
+the primary. Locally, point DATABASE_REPLICA_URL at a second SQLite file and
+refresh it with `python database.py sync-replica`.
+"""
+
+import os
+import re
+import time
+from functools import wraps
+
+from flask import current_app, g, request, session
+from flask_login import current_user
+from sqlalchemy import event
+from sqlalchemy.exc import OperationalError
+
+from models import db
+
+# busy_timeout first so switching the journal mode can wait for other connections
+_PRAGMA_ORDER = ('busy_timeout', 'journal_mode', 'synchronous', 'mmap_size', 'cache_size', 'temp_store')
+
+_VALUE = re.compile(r'^-?[A-Za-z0-9_]+$')
+
+
+def apply_sqlite_pragmas(dbapi_connection, pragmas):
+    """Run `PRAGMA name=value` for each configured pragma on a raw sqlite3 connection."""
+    names = sorted(pragmas, key=lambda n: _PRAGMA_ORDER.index(n) if n in _PRAGMA_ORDER else len(_PRAGMA_ORDER))
+    cursor = dbapi_connection.cursor()
+    try:
+        for name in names:
+            value = pragmas[name]
+            if value is None or value == '':
+                continue
+            if not _VALUE.match(str(value)):
+                raise ValueError(f'Invalid value for PRAGMA {name}: {value!r}')
+            cursor.execute(f'PRAGMA {name}={value}')
+    finally:
+        cursor.close()
+
+
+_engines = []
+
+_pool_counters = {'connects': 0, 'checkouts': 0, 'invalidations': 0, 'peak_checked_out': 0}
+
+
+def _track_pool(engine):
+    @event.listens_for(engine, 'connect')
+    def _on_connect(dbapi_connection, connection_record):
+        _pool_counters['connects'] += 1
+
+    @event.listens_for(engine, 'checkout')
+    def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+        _pool_counters['checkouts'] += 1
+        if hasattr(engine.pool, 'checkedout'):
+            _pool_counters['peak_checked_out'] = max(_pool_counters['peak_checked_out'], engine.pool.checkedout())
+
+    @event.listens_for(engine, 'invalidate')
+    def _on_invalidate(dbapi_connection, connection_record, exception):
+        _pool_counters['invalidations'] += 1
+
+
+def dispose_engines():
+    """Forget pooled connections inherited from the parent process (call after fork)."""
+    for engine in _engines:
+        engine.dispose(close=False)
+    for name in _pool_counters:
+        _pool_counters[name] = 0
+
+
+def pool_stats():
+    """Pool occupancy and lifetime counters for this worker process."""
+    pool = db.engine.pool
+    stats = {'pid': os.getpid(), 'pool': type(pool).__name__}
+    for name in ('size', 'checkedin', 'checkedout', 'overflow'):
+        if hasattr(pool, name):
+            stats[name] = getattr(pool, name)()
+    if hasattr(pool, '_max_overflow'):
+        stats['max_overflow'] = pool._max_overflow
+    stats.update(_pool_counters)
+    return stats
+
+
+_replica_down_until = 0.0
+
+
+def _use_replica():
+    if 'replica' not in db.engines or time.monotonic() < _replica_down_until:
+        return False
+    return session.get('rw_until', 0) < time.time()
+
+
+def replica_reads(view):
+    """Run a read-only view against the replica, falling back to the primary."""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        global _replica_down_until
+        if not _use_replica():
+            return view(*args, **kwargs)
+        g.db_replica = True
+        try:
+            return view(*args, **kwargs)
+        except OperationalError as e:
+            print(f"Replica read failed, using primary: {e}")
+            db.session.rollback()
+            _replica_down_until = time.monotonic() + current_app.config['REPLICA_RETRY_SECONDS']
+            g.db_replica = False
+            return view(*args, **kwargs)
+        finally:
+            g.db_replica = False
+    return wrapper
+
+
+def _stick_to_primary(response):
+    """Read-your-writes: after a successful write, read from the primary for a while."""
+    if (
+        request.method in ('POST', 'PUT', 'PATCH', 'DELETE')
+        and response.status_code < 400
+        and current_user.is_authenticated
+    ):
+        session['rw_until'] = time.time() + current_app.config['REPLICA_STICKY_SECONDS']
+    return response
+
+
+def sync_sqlite_replica(app):
+    """Copy the primary SQLite database onto the replica file (local testing)."""
+    import sqlite3
+
+    with app.app_context():
+        primary, replica = db.engine, db.engines.get('replica')
+    if replica is None or primary.dialect.name != 'sqlite' or replica.dialect.name != 'sqlite':
+        raise RuntimeError('sync-replica needs SQLite primary and DATABASE_REPLICA_URL')
+    replica.dispose()
+    source = sqlite3.connect(primary.url.database)
+    target = sqlite3.connect(replica.url.database)
+    try:
+        source.backup(target)
+    finally:
+        source.close()
+        target.close()
+
+
+def init_app(app):
+    """Register the connection hooks for the app's engines."""
+    with app.app_context():
+        primary = db.engine
+        engines = list(db.engines.values())
+    _track_pool(primary)
+
+    pragmas = app.config.get('SQLITE_PRAGMAS') or {}
+    for engine in engines:
+        _engines.append(engine)
+        if engine.dialect.name == 'sqlite' and pragmas:
+            @event.listens_for(engine, 'connect')
+            def _set_sqlite_pragmas(dbapi_connection, connection_record):
+                apply_sqlite_pragmas(dbapi_connection, pragmas)
+
+    if 'replica' in app.config.get('SQLALCHEMY_BINDS', {}):
+        app.after_request(_stick_to_primary)
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=dispose_engines)
+
+
+def main():
+    import argparse
+    import sys
+
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    from app import app
+
+    parser = argparse.ArgumentParser(description='Database maintenance helpers')
+    parser.add_argument('command', choices=['sync-replica'])
+    parser.parse_args()
+
+    sync_sqlite_replica(app)
+    print("[OK] Replica refreshed from the primary database")
+
+
+if __name__ == '__main__':
+    main()
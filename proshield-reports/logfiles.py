@@ -0,0 +1,33 @@
+"""Rotating JSON-lines log files (slow-query log, trace log).
+
+A module writes one JSON document per line to its own logger; `attach` sends
+that logger to a RotatingFileHandler, and `existing` lists the file and its
+rotated backups, oldest first, for reading the log back.
+"""
+
+import logging
+import os
+from logging.handlers import RotatingFileHandler
+
+
+def attach(logger, path, max_bytes, backups, level):
+    """Write `logger`'s messages, unformatted, to `path` (rotated at `max_bytes`, `backups` old files kept).
+
+    Does nothing when the logger already has a handler, so a second
+    create_app() in the same process does not write every line twice.
+    """
+    if logger.handlers:
+        return
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    handler = RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backups, encoding='utf-8')
+    handler.setFormatter(logging.Formatter('%(message)s'))
+    logger.addHandler(handler)
+    logger.setLevel(level)
+
+
+def existing(path, backups):
+    """`path` and its rotated backups (path.N ... path.1) that exist, oldest first."""
+    if not path:
+        return []
+    files = [f'{path}.{n}' for n in range(backups, 0, -1)] + [path]
+    return [f for f in files if os.path.exists(f)]
@@ -0,0 +1,264 @@
+"""Request / SQL / upload / export instrumentation, served as Prometheus text.
+
+Hooks registered by `init_app`:
+
+    http_requests_total{endpoint,method,status}
+    http_request_duration_seconds{endpoint,method}     histogram
+    http_request_db_queries{endpoint}                  histogram, statements per request
+    http_request_db_seconds{endpoint}                  histogram, SQL time per request
+    db_query_duration_seconds{bind}                    histogram, every statement
+    db_query_errors_total{bind}                        statements that raised
+
+and the code paths that do heavy work outside SQL record
+
+    image_compress_seconds / upload_bytes_total{kind} / image_stored_bytes_total
+    export_seconds{kind} / export_bytes_total{kind}
+
+A high `http_request_db_queries` for one endpoint is the N+1 signal (e.g.
+Report.to_dict loading products/images/documents per row).
+
+Values live in the worker process. With several gunicorn workers set
+METRICS_DIR: each worker writes its snapshot there (at most every
+METRICS_FLUSH_SECONDS and at exit) and /metrics sums all snapshots, so a
+scrape sees the whole server whichever worker answers. Files of exited
+workers are kept so counters never go backwards; gunicorn.conf.py empties
+the directory when the master starts.
+"""
+
+import atexit
+import glob
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import g, has_request_context, request
+from sqlalchemy import event
+
+_TIME_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+_COUNT_BUCKETS = (1, 2, 3, 5, 10, 20, 50, 100, 200, 500)
+
+# name -> (type, help, buckets)
+_DEFINITIONS = {
+    'http_requests_total': ('counter', 'Requests served', None),
+    'http_request_duration_seconds': ('histogram', 'Request latency', _TIME_BUCKETS),
+    'http_request_db_queries': ('histogram', 'SQL statements executed per request', _COUNT_BUCKETS),
+    'http_request_db_seconds': ('histogram', 'Time spent in SQL per request', _TIME_BUCKETS),
+    'db_query_duration_seconds': ('histogram', 'SQL statement latency', _TIME_BUCKETS),
+    'db_query_errors_total': ('counter', 'SQL statements that raised', None),
+    'image_compress_seconds': ('histogram', 'Pillow resize + JPEG encode time per image', _TIME_BUCKETS),
+    'upload_bytes_total': ('counter', 'Uploaded bytes received', None),
+    'image_stored_bytes_total': ('counter', 'Bytes written for compressed images', None),
+    'export_seconds': ('histogram', 'Excel export build time', _TIME_BUCKETS),
+    'export_bytes_total': ('counter', 'Excel bytes produced', None),
+}
+
+_lock = threading.Lock()
+_values = {}  # (name, labels tuple) -> float for counters, [bucket counts..., sum, count] for histograms
+_pid = os.getpid()
+_last_flush = 0.0
+_config = {'dir': None, 'flush_seconds': 5}
+
+
+def _key(name, labels):
+    return name, tuple(sorted((labels or {}).items()))
+
+
+def inc(name, value=1, **labels):
+    key = _key(name, labels)
+    with _lock:
+        _check_fork()
+        _values[key] = _values.get(key, 0) + value
+
+
+def observe(name, value, **labels):
+    buckets = _DEFINITIONS[name][2]
+    key = _key(name, labels)
+    with _lock:
+        _check_fork()
+        series = _values.get(key)
+        if series is None:
+            series = _values[key] = [0] * (len(buckets) + 2)
+        for i, bound in enumerate(buckets):
+            if value <= bound:
+                series[i] += 1
+        series[-2] += value
+        series[-1] += 1
+
+
+@contextmanager
+def timer(name, **labels):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - started, **labels)
+
+
+def _check_fork():
+    # Children forked from a preloaded master start from zero
+    global _pid
+    if _pid != os.getpid():
+        _values.clear()
+        _pid = os.getpid()
+
+
+# ---------------------------------------------------------------------------
+# Multi-worker snapshots
+# ---------------------------------------------------------------------------
+
+def _snapshot():
+    with _lock:
+        _check_fork()
+        return [[name, list(labels), value] for (name, labels), value in _values.items()]
+
+
+def flush(force=False):
+    global _last_flush
+    directory = _config['dir']
+    if not directory:
+        return
+    now = time.monotonic()
+    if not force and now - _last_flush < _config['flush_seconds']:
+        return
+    _last_flush = now
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f'{os.getpid()}.json')
+    with open(path + '.tmp', 'w') as f:
+        json.dump(_snapshot(), f)
+    os.replace(path + '.tmp', path)
+
+
+def _merged():
+    if not _config['dir']:
+        return {(name, tuple(map(tuple, labels))): value for name, labels, value in _snapshot()}
+    flush(force=True)
+    merged = {}
+    for path in glob.glob(os.path.join(_config['dir'], '*.json')):
+        try:
+            with open(path) as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            continue
+        for name, labels, value in entries:
+            key = (name, tuple(map(tuple, labels)))
+            if isinstance(value, list):
+                current = merged.setdefault(key, [0] * len(value))
+                merged[key] = [a + b for a, b in zip(current, value)]
+            else:
+                merged[key] = merged.get(key, 0) + value
+    return merged
+
+
+# ---------------------------------------------------------------------------
+# Exposition
+# ---------------------------------------------------------------------------
+
+def _format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ''
+    escaped = [
+        f'{k}="' + str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') + '"'
+        for k, v in pairs
+    ]
+    return '{' + ','.join(escaped) + '}'
+
+
+def _format_value(value):
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def render():
+    """All metrics in Prometheus text exposition format 0.0.4."""
+    values = _merged()
+    lines = []
+    for name, (kind, help_text, buckets) in _DEFINITIONS.items():
+        series = sorted((labels, value) for (n, labels), value in values.items() if n == name)
+        if not series:
+            continue
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+        for labels, value in series:
+            if kind == 'counter':
+                lines.append(f'{name}{_format_labels(labels)} {_format_value(value)}')
+                continue
+            for bound, count in zip(buckets, value):
+                lines.append(f'{name}_bucket{_format_labels(labels, [("le", f"{bound:g}")])} {count}')
+            lines.append(f'{name}_bucket{_format_labels(labels, [("le", "+Inf")])} {value[-1]}')
+            lines.append(f'{name}_sum{_format_labels(labels)} {value[-2]:.6f}')
+            lines.append(f'{name}_count{_format_labels(labels)} {value[-1]}')
+    return '\n'.join(lines) + '\n'
+
+
+# ---------------------------------------------------------------------------
+# Hooks
+# ---------------------------------------------------------------------------
+
+def _endpoint():
+    return request.endpoint or 'unmatched'
+
+
+def _before_request():
+    g.metrics_started = time.perf_counter()
+    g.sql_count = 0
+    g.sql_seconds = 0.0
+
+
+def _after_request(response):
+    started = g.pop('metrics_started', None)
+    if started is None:
+        return response
+    endpoint = _endpoint()
+    inc('http_requests_total', endpoint=endpoint, method=request.method, status=response.status_code)
+    observe('http_request_duration_seconds', time.perf_counter() - started, endpoint=endpoint, method=request.method)
+    observe('http_request_db_queries', g.get('sql_count', 0), endpoint=endpoint)
+    observe('http_request_db_seconds', g.get('sql_seconds', 0.0), endpoint=endpoint)
+    flush()
+    return response
+
+
+def _count_request_sql(elapsed):
+    if has_request_context() and 'sql_count' in g:
+        g.sql_count += 1
+        g.sql_seconds += elapsed
+
+
+def _instrument_engine(engine, bind):
+    # Start times are stacked per connection with the execution context they
+    # belong to, so a failed statement only drops its own entry
+    @event.listens_for(engine, 'before_cursor_execute')
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('metrics_query_start', []).append((context, time.perf_counter()))
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info['metrics_query_start'].pop()[1]
+        observe('db_query_duration_seconds', elapsed, bind=bind)
+        _count_request_sql(elapsed)
+
+    @event.listens_for(engine, 'handle_error')
+    def _handle_error(exception_context):
+        inc('db_query_errors_total', bind=bind)
+        conn = exception_context.connection
+        starts = conn.info.get('metrics_query_start') if conn is not None else None
+        # Errors raised before the cursor ran, or after it finished, have no entry
+        if starts and starts[-1][0] is exception_context.execution_context:
+            _count_request_sql(time.perf_counter() - starts.pop()[1])
+
+
+def init_app(app):
+    from models import db
+
+    _config['dir'] = app.config.get('METRICS_DIR')
+    _config['flush_seconds'] = app.config.get('METRICS_FLUSH_SECONDS', 5)
+
+    with app.app_context():
+        for bind, engine in db.engines.items():
+            _instrument_engine(engine, bind or 'primary')
+
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    if _config['dir']:
+        atexit.register(flush, True)
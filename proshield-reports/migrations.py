@@ -0,0 +1,423 @@
+#!/usr/bin/env python3
+"""
+Proshield Reports - Versioned schema migrations
+
+The applied version lives in the single-row `schema_version` table. Each entry
+in MIGRATIONS runs once, in its own transaction, and bumps that row in the
+same transaction. Workers booting against an up-to-date database only read
+the version number (see `needs_upgrade`).
+
+Concurrent upgrades (several gunicorn workers starting at once) serialize on
+a lock taken at the start of every step: a transaction-level advisory lock on
+PostgreSQL, the database write lock on SQLite. Whoever gets the lock second
+re-reads the version and skips steps that are already done.
+
+Steps must stay idempotent: the baseline step has to cope with databases
+created by any older release, and a fresh database gets its tables from
+`create_all()` in step 1 before the later steps run.
+
+Adding a migration: append (next_version, description, function) to
+MIGRATIONS. Never edit or reorder steps that have shipped.
+
+The one allowed change to an existing step is a guard that skips it on a
+schema it was not written for, when a later model change would otherwise
+break it on fresh databases. A guarded step must behave exactly as it shipped
+on every database that still has the old schema. Steps 2 and 5 got such
+guards together with step 8, before that release shipped: they skip tables
+that no longer have product_name (step 8 seeds the catalog and its inventory
+instead). Step 5 now uses SQL against the table instead of the
+InventoryItem model, which no longer maps product_name.
+
+Usage:
+    python migrations.py           # apply pending migrations
+    python migrations.py --status  # print current / latest version
+"""
+
+import time
+from datetime import datetime
+
+from sqlalchemy import inspect, text
+from sqlalchemy.schema import CreateTable
+from sqlalchemy.exc import IntegrityError, OperationalError, ProgrammingError
+
+from models import (
+    db, User, Product, Report, ReportProduct, ReportInstallationType, InventoryItem, InventoryTransaction,
+    ArchivedReport, ArchivedInventoryTransaction, SchemaVersion, PRODUCTS
+)
+
+# Arbitrary application-wide key for pg_advisory_xact_lock
+_PG_LOCK_KEY = 7_305_120_031
+
+# How long a worker waits for another process that is migrating (SQLite
+# reports "database is locked" after its busy timeout; we keep retrying)
+LOCK_TIMEOUT_SECONDS = 300
+
+
+def _dialect():
+    return db.engine.dialect.name
+
+
+def _columns(table):
+    return {c['name'] for c in inspect(db.session.connection()).get_columns(table)}
+
+
+def _add_column(table, column, ddl_type):
+    if column not in _columns(table):
+        db.session.execute(text(f'ALTER TABLE {table} ADD COLUMN {column} {ddl_type}'))
+
+
+# ---------------------------------------------------------------------------
+# Steps
+# ---------------------------------------------------------------------------
+
+def _baseline():
+    """Tables from the models plus the columns older releases added one by one."""
+    db.metadata.create_all(bind=db.session.connection())
+
+    for column, ddl_type in [
+        ('customer_name', 'VARCHAR(200)'),
+        ('company_project', 'VARCHAR(200)'),
+        ('recipient_name', 'VARCHAR(200)'),
+        ('installation_team', 'VARCHAR(20)'),
+        ('additional_worker_name', 'VARCHAR(200)'),
+        ('installation_type', 'VARCHAR(500)'),
+        ('installation_types', 'TEXT'),
+        ('protections_count', 'INTEGER'),
+    ]:
+        _add_column('reports', column, ddl_type)
+    _add_column('report_products', 'quantity_unit', 'VARCHAR(20)')
+
+
+def _rename_pp_tape():
+    """PP Tape -> לוח PP מ"מ 4 in existing data."""
+    for table in ('inventory_items', 'report_products', 'inventory_transactions'):
+        if 'product_name' not in _columns(table):
+            continue  # created by a later schema: products are referenced by id
+        db.session.execute(
+            text(f"UPDATE {table} SET product_name = :new WHERE product_name = 'PP Tape'"),
+            {'new': 'לוח PP מ"מ 4'}
+        )
+
+
+def _idempotency_key():
+    _add_column('reports', 'idempotency_key', 'VARCHAR(64)')
+    db.session.execute(text(
+        'CREATE UNIQUE INDEX IF NOT EXISTS ix_reports_idempotency_key ON reports (idempotency_key)'
+    ))
+
+
+def _change_tracking():
+    import report_changes
+
+    _add_column('reports', 'updated_at', 'TIMESTAMP')
+    _add_column('reports', 'change_seq', 'BIGINT')
+    db.session.execute(text('CREATE INDEX IF NOT EXISTS ix_reports_change_seq ON reports (change_seq)'))
+    db.session.flush()
+    report_changes.seed_change_counter(commit=False)
+
+
+def _seed_inventory():
+    if 'product_name' not in _columns('inventory_items'):
+        return  # created by a later schema: step 8 seeds the catalog and its inventory
+    existing = {name for (name,) in db.session.execute(text('SELECT product_name FROM inventory_items'))}
+    for product in PRODUCTS:
+        if product not in existing:
+            db.session.execute(
+                text('INSERT INTO inventory_items (product_name, quantity_unit, quantity_meter, updated_at) '
+                     'VALUES (:name, 0, 0, :now)'),
+                {'name': product, 'now': datetime.utcnow()}
+            )
+
+
+def _default_admin():
+    if not User.query.filter_by(username='rotem').first():
+        admin = User(username='rotem', role='admin', full_name='רותם')
+        admin.set_password('proshield2025')
+        db.session.add(admin)
+        print("Default admin user created: rotem / proshield2025")
+
+
+def _report_summary():
+    import report_summary
+
+    for column, ddl_type in [
+        ('product_count', 'INTEGER DEFAULT 0'),
+        ('image_count', 'INTEGER DEFAULT 0'),
+        ('document_count', 'INTEGER DEFAULT 0'),
+        ('total_units', 'FLOAT DEFAULT 0'),
+        ('total_meters', 'FLOAT DEFAULT 0'),
+        ('thumbnail_path', 'VARCHAR(500)'),
+    ]:
+        _add_column('reports', column, ddl_type)
+    # The summary (and every lazy child load) looks children up by report_id
+    for table in ('report_products', 'report_images', 'report_documents'):
+        db.session.execute(text(f'CREATE INDEX IF NOT EXISTS ix_{table}_report_id ON {table} (report_id)'))
+    report_summary.backfill(commit=False, log=lambda *_: None)
+
+
+def _rebuild_sqlite_table(model, select_columns=None):
+    """Recreate `model`'s table from the model, copying rows with `select_columns`.
+
+    SQLite cannot drop a column that is part of a UNIQUE constraint or turn on
+    AUTOINCREMENT, so the table is created under a temporary name, refilled,
+    and renamed over the old one. Renaming the new table (rather than moving
+    the old one aside) leaves foreign keys in other tables pointing at it.
+    """
+    select_columns = select_columns or {}
+    table = model.__tablename__
+    new = f'{table}_new'
+    ddl = str(CreateTable(model.__table__).compile(dialect=db.engine.dialect))
+    db.session.execute(text(ddl.replace(f'CREATE TABLE {table} (', f'CREATE TABLE {new} (', 1)))
+    columns = [c.name for c in model.__table__.columns]
+    db.session.execute(text(
+        f'INSERT INTO {new} ({", ".join(columns)}) '
+        f'SELECT {", ".join(select_columns.get(c, c) for c in columns)} FROM {table}'
+    ))
+    db.session.execute(text(f'DROP TABLE {table}'))  # drops its indexes too
+    db.session.execute(text(f'ALTER TABLE {new} RENAME TO {table}'))
+    for index in model.__table__.indexes:
+        index.create(bind=db.session.connection())
+
+
+def _product_catalog():
+    """`products` table; product_name columns become product_id foreign keys."""
+    import catalog
+
+    Product.__table__.create(bind=db.session.connection(), checkfirst=True)
+
+    # The catalog in display order, then names that only appear in old rows (inactive)
+    models = (ReportProduct, InventoryItem, InventoryTransaction, ArchivedInventoryTransaction)
+    legacy = [m.__tablename__ for m in models if 'product_name' in _columns(m.__tablename__)]
+    names = list(PRODUCTS)
+    for table in legacy:
+        names += sorted(
+            name for (name,) in db.session.execute(text(f'SELECT DISTINCT product_name FROM {table}'))
+            if name not in names
+        )
+    existing = set(db.session.execute(text('SELECT name FROM products')).scalars())
+    db.session.add_all(
+        Product(name=name, sort_order=order, is_active=name in PRODUCTS)
+        for order, name in enumerate(names, 1) if name not in existing
+    )
+    db.session.flush()
+
+    product_id = '(SELECT id FROM products WHERE products.name = product_name)'
+    for model in models:
+        table = model.__tablename__
+        if table not in legacy:
+            continue
+        if _dialect() == 'sqlite':
+            _rebuild_sqlite_table(model, {'product_id': product_id})
+            continue
+        _add_column(table, 'product_id', 'INTEGER REFERENCES products (id)')
+        db.session.execute(text(f'UPDATE {table} SET product_id = {product_id}'))
+        db.session.execute(text(f'ALTER TABLE {table} DROP COLUMN product_name'))
+        db.session.execute(text(f'ALTER TABLE {table} ALTER COLUMN product_id SET NOT NULL'))
+        for index in model.__table__.indexes:
+            index.create(bind=db.session.connection(), checkfirst=True)
+
+    # Inventory rows for every catalog product (fresh databases skipped step 5)
+    stocked = set(db.session.execute(text('SELECT product_id FROM inventory_items')).scalars())
+    db.session.add_all(
+        InventoryItem(product_id=pid, quantity_unit=0, quantity_meter=0)
+        for pid in db.session.execute(text('SELECT id FROM products WHERE is_active')).scalars()
+        if pid not in stocked
+    )
+    catalog.invalidate()
+
+
+def _report_filter_indexes():
+    """report_installation_types junction table and indexes for the report filters."""
+    import json
+
+    ReportInstallationType.__table__.create(bind=db.session.connection(), checkfirst=True)
+    for statement in (
+        # Superseded by (product_id, report_id)
+        'DROP INDEX IF EXISTS ix_report_products_product_id',
+        'CREATE INDEX IF NOT EXISTS ix_report_products_product_id_report_id ON report_products (product_id, report_id)',
+        'CREATE INDEX IF NOT EXISTS ix_reports_timestamp ON reports (timestamp)',
+        'CREATE INDEX IF NOT EXISTS ix_reports_company_project_timestamp ON reports (company_project, timestamp)',
+    ):
+        db.session.execute(text(statement))
+
+    db.session.execute(text('DELETE FROM report_installation_types'))
+    reports = db.session.execute(text(
+        "SELECT id, installation_types, installation_type FROM reports WHERE report_type = 'installation'"
+    ))
+    batch = []
+    for report_id, types_json, single in reports:
+        try:
+            types = json.loads(types_json) if types_json else []
+        except ValueError:
+            types = []
+        if not isinstance(types, list) or (not types and single):
+            types = [single]  # releases before the JSON column
+        batch.extend(ReportInstallationType.rows(report_id, types))
+        if len(batch) >= 5000:
+            db.session.execute(ReportInstallationType.__table__.insert(), batch)
+            batch = []
+    if batch:
+        db.session.execute(ReportInstallationType.__table__.insert(), batch)
+
+
+def _archive_safe_ids():
+    """reports / inventory_transactions never reuse an id that may be in their archive table.
+
+    Without AUTOINCREMENT SQLite hands out max(id) + 1, so archiving (or
+    deleting) the newest rows brings back ids that reports_archive /
+    inventory_transactions_archive already hold. PostgreSQL sequences never
+    go back.
+    """
+    if _dialect() != 'sqlite':
+        return
+    for model, archive_model in ((Report, ArchivedReport), (InventoryTransaction, ArchivedInventoryTransaction)):
+        table = model.__tablename__
+        ddl = db.session.execute(
+            text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = :table"), {'table': table}
+        ).scalar()
+        if 'AUTOINCREMENT' not in ddl.upper():
+            _rebuild_sqlite_table(model)
+
+        # Continue after every id ever used, archived ones included
+        top = db.session.execute(text(
+            f'SELECT max(id) FROM (SELECT id FROM {table} UNION ALL SELECT id FROM {archive_model.__tablename__})'
+        )).scalar() or 0
+        seq = db.session.execute(
+            text('SELECT seq FROM sqlite_sequence WHERE name = :table'), {'table': table}
+        ).scalar() or 0
+        db.session.execute(text('DELETE FROM sqlite_sequence WHERE name = :table'), {'table': table})
+        db.session.execute(
+            text('INSERT INTO sqlite_sequence (name, seq) VALUES (:table, :seq)'), {'table': table, 'seq': max(top, seq)}
+        )
+
+
+MIGRATIONS = [
+    (1, 'baseline schema', _baseline),
+    (2, "rename 'PP Tape' product", _rename_pp_tape),
+    (3, 'reports.idempotency_key', _idempotency_key),
+    (4, 'reports.updated_at / change_seq', _change_tracking),
+    (5, 'seed inventory items', _seed_inventory),
+    (6, 'default admin user', _default_admin),
+    (7, 'reports summary columns + child report_id indexes', _report_summary),
+    (8, 'product catalog: product_name -> product_id', _product_catalog),
+    (9, 'report_installation_types + report filter indexes', _report_filter_indexes),
+    (10, 'AUTOINCREMENT ids for reports / inventory_transactions (SQLite)', _archive_safe_ids),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+# ---------------------------------------------------------------------------
+# Runner
+# ---------------------------------------------------------------------------
+
+def current_version():
+    """Applied schema version; 0 for a database that predates this table."""
+    try:
+        version = db.session.execute(text('SELECT version FROM schema_version WHERE id = 1')).scalar()
+    except (OperationalError, ProgrammingError):
+        db.session.rollback()
+        return 0
+    db.session.rollback()
+    return version or 0
+
+
+def needs_upgrade():
+    return current_version() < LATEST_VERSION
+
+
+def _ensure_version_table():
+    try:
+        SchemaVersion.__table__.create(bind=db.engine, checkfirst=True)
+    except (OperationalError, ProgrammingError, IntegrityError):
+        # Another process created it between the check and the CREATE
+        pass
+    if db.session.get(SchemaVersion, 1) is None:
+        try:
+            db.session.add(SchemaVersion(id=1, version=0))
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+    db.session.rollback()
+
+
+def _lock():
+    if _dialect() == 'postgresql':
+        db.session.execute(text('SELECT pg_advisory_xact_lock(:key)'), {'key': _PG_LOCK_KEY})
+    else:
+        # Writing first makes SQLite take the database write lock for the
+        # whole transaction, so the version read below cannot go stale.
+        db.session.execute(text('UPDATE schema_version SET version = version WHERE id = 1'))
+
+
+def _apply(version, description, step):
+    """Run one step under the lock; False if another process already applied it."""
+    deadline = time.monotonic() + LOCK_TIMEOUT_SECONDS
+    while True:
+        try:
+            _lock()
+            break
+        except OperationalError:
+            db.session.rollback()
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.5)
+
+    try:
+        applied = db.session.execute(text('SELECT version FROM schema_version WHERE id = 1')).scalar() or 0
+        if applied >= version:
+            db.session.rollback()
+            return False
+        step()
+        db.session.execute(
+            text('UPDATE schema_version SET version = :version, description = :description, '
+                 'applied_at = :applied_at WHERE id = 1'),
+            {'version': version, 'description': description, 'applied_at': datetime.utcnow()}
+        )
+        db.session.commit()
+        return True
+    except Exception:
+        db.session.rollback()
+        raise
+
+
+def upgrade():
+    """Apply pending migrations in order; returns the versions applied here."""
+    _ensure_version_table()
+    start = current_version()
+    applied = []
+    for version, description, step in MIGRATIONS:
+        if version <= start:
+            continue
+        if _apply(version, description, step):
+            print(f"[migrations] {version}: {description}")
+            applied.append(version)
+    return applied
+
+
+def main():
+    import argparse
+    import os
+    import sys
+
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    from app import app
+
+    parser = argparse.ArgumentParser(description='Apply schema migrations')
+    parser.add_argument('--status', action='store_true', help='Only print the schema version')
+    args = parser.parse_args()
+
+    with app.app_context():
+        if args.status:
+            print(f"Schema version {current_version()} (latest {LATEST_VERSION})")
+            return
+        applied = upgrade()
+
+    if applied:
+        print(f"[OK] Applied {len(applied)} migration(s); schema is at version {LATEST_VERSION}")
+    else:
+        print(f"[OK] Schema already at version {LATEST_VERSION}")
+
+
+if __name__ == '__main__':
+    main()
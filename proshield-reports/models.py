@@ -1,9 +1,37 @@
+from flask import g, has_request_context
 from flask_sqlalchemy import SQLAlchemy
+from flask_sqlalchemy.session import Session
 from flask_login import UserMixin
+from sqlalchemy.sql.dml import UpdateBase
 from datetime import datetime
-import bcrypt
+from types import SimpleNamespace
+import json
 
-db = SQLAlchemy()
+import passwords
+
+
+class RoutingSession(Session):
+    """Sends reads to the 'replica' bind while a request is marked read-only.
+
+    `database.replica_reads` sets the flag; flushes and INSERT / UPDATE /
+    DELETE statements always go to the primary.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if (
+            bind is None
+            and not self._flushing
+            and not isinstance(clause, UpdateBase)
+            and has_request_context()
+            and g.get('db_replica')
+        ):
+            replica = self._db.engines.get('replica')
+            if replica is not None:
+                return replica
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 
 class User(UserMixin, db.Model):
     __tablename__ = 'users'
@@ -20,10 +48,13 @@ class User(UserMixin, db.Model):
     reports = db.relationship('Report', backref='author', lazy='dynamic')
 
     def set_password(self, password):
-        self.password_hash = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+        self.password_hash = passwords.hash_password(password)
 
     def check_password(self, password):
-        return bcrypt.checkpw(password.encode('utf-8'), self.password_hash.encode('utf-8'))
+        return passwords.check_password(password, self.password_hash)
+
+    def password_needs_rehash(self):
+        return passwords.needs_rehash(self.password_hash)
 
     def is_admin(self):
         return self.role == 'admin'
@@ -48,24 +79,45 @@ class Report(db.Model):
 
     address = db.Column(db.String(500), nullable=False)
     status = db.Column(db.String(20), nullable=False)  # 'completed' or 'return_required'
-    timestamp = db.Column(db.DateTime, default=datetime.utcnow)
+    timestamp = db.Column(db.DateTime, default=datetime.utcnow, index=True)
     notes = db.Column(db.Text)
 
     # Installation extra fields (relevant when report_type == 'installation')
     # installation_type is kept for backward compatibility / display
     installation_type = db.Column(db.String(500))
-    installation_types = db.Column(db.Text)  # JSON array string
+    installation_types = db.Column(db.Text)  # JSON array string (indexed copy: ReportInstallationType)
     protections_count = db.Column(db.Integer)
     installation_team = db.Column(db.String(20))  # 'solo' or 'with_worker'
     additional_worker_name = db.Column(db.String(200))
 
     synced = db.Column(db.Boolean, default=True)  # For offline support
+    # Client-generated key for offline submissions; makes /api/sync retries idempotent
+    idempotency_key = db.Column(db.String(64), unique=True, index=True)
+
+    # Delta sync: bumped from the `reports` change counter on every create/edit
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+    change_seq = db.Column(db.BigInteger, index=True)
+
+    # List-row summary of the child rows, kept current by report_summary.py
+    product_count = db.Column(db.Integer, default=0)
+    image_count = db.Column(db.Integer, default=0)
+    document_count = db.Column(db.Integer, default=0)
+    total_units = db.Column(db.Float, default=0)
+    total_meters = db.Column(db.Float, default=0)
+    thumbnail_path = db.Column(db.String(500))
 
     # Relationships
     products = db.relationship('ReportProduct', backref='report', lazy='dynamic', cascade='all, delete-orphan')
     images = db.relationship('ReportImage', backref='report', lazy='dynamic', cascade='all, delete-orphan')
     documents = db.relationship('ReportDocument', backref='report', lazy='dynamic', cascade='all, delete-orphan')
     inventory_transactions = db.relationship('InventoryTransaction', backref='report', lazy='dynamic', cascade='all, delete-orphan')
+    installation_type_rows = db.relationship('ReportInstallationType', lazy='dynamic', cascade='all, delete-orphan')
+
+    __table_args__ = (
+        db.Index('ix_reports_company_project_timestamp', 'company_project', 'timestamp'),
+        # Ids move to reports_archive with the row; SQLite must never hand them out again
+        {'sqlite_autoincrement': True},
+    )
 
     def to_dict(self):
         return {
@@ -84,28 +136,91 @@ class Report(db.Model):
             'address': self.address,
             'status': self.status,
             'timestamp': self.timestamp.isoformat() if self.timestamp else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None,
             'notes': self.notes,
             'products': [p.to_dict() for p in self.products],
             'images': [i.to_dict() for i in self.images],
             'documents': [d.to_dict() for d in self.documents]
         }
 
+    def to_summary_dict(self):
+        """List row: the report's own columns only, no child rows."""
+        return {
+            'id': self.id,
+            'user_id': self.user_id,
+            'user_name': self.author.full_name if self.author else '',
+            'report_type': self.report_type,
+            'customer_name': self.customer_name,
+            'company_project': self.company_project,
+            'installation_type': self.installation_type,
+            'address': self.address,
+            'status': self.status,
+            'timestamp': self.timestamp.isoformat() if self.timestamp else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None,
+            'product_count': self.product_count or 0,
+            'image_count': self.image_count or 0,
+            'document_count': self.document_count or 0,
+            'total_units': self.total_units or 0,
+            'total_meters': self.total_meters or 0,
+            'thumbnail_path': self.thumbnail_path,
+        }
+
     def __repr__(self):
         return f'<Report {self.id} - {self.report_type}>'
 
 
-class ReportProduct(db.Model):
+class Product(db.Model):
+    """Catalog entry. Other tables reference products by id (see catalog.py)."""
+    __tablename__ = 'products'
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(200), unique=True, nullable=False)
+    sort_order = db.Column(db.Integer, default=0)
+    # Inactive products (names that only came from old data or API clients)
+    # are kept for existing rows but not offered in forms or the inventory page
+    is_active = db.Column(db.Boolean, default=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'name': self.name,
+            'sort_order': self.sort_order,
+            'is_active': self.is_active
+        }
+
+    def __repr__(self):
+        return f'<Product {self.name}>'
+
+
+class ProductRef:
+    """`product_name` for rows that reference the catalog by `product_id`."""
+
+    @property
+    def product_name(self):
+        import catalog  # catalog imports this module
+
+        return catalog.name(self.product_id)
+
+
+class ReportProduct(ProductRef, db.Model):
     __tablename__ = 'report_products'
 
     id = db.Column(db.Integer, primary_key=True)
-    report_id = db.Column(db.Integer, db.ForeignKey('reports.id'), nullable=False)
-    product_name = db.Column(db.String(200), nullable=False)
+    report_id = db.Column(db.Integer, db.ForeignKey('reports.id'), nullable=False, index=True)
+    product_id = db.Column(db.Integer, db.ForeignKey('products.id'), nullable=False)
     quantity = db.Column(db.Float, nullable=False)
     quantity_unit = db.Column(db.String(20), default='unit')  # 'unit' or 'meter'
 
+    # "Reports that used product X" reads report ids straight from the index
+    __table_args__ = (
+        db.Index('ix_report_products_product_id_report_id', 'product_id', 'report_id'),
+    )
+
     def to_dict(self):
         return {
             'id': self.id,
+            'product_id': self.product_id,
             'product_name': self.product_name,
             'quantity': self.quantity,
             'quantity_unit': self.quantity_unit
@@ -115,11 +230,37 @@ class ReportProduct(db.Model):
         return f'<ReportProduct {self.product_name} x {self.quantity}>'
 
 
+class ReportInstallationType(db.Model):
+    """One row per installation type of a report.
+
+    An indexed copy of the `reports.installation_types` JSON, written next to
+    it, so "installations of type X" is an index lookup instead of parsing
+    JSON in every row.
+    """
+    __tablename__ = 'report_installation_types'
+
+    report_id = db.Column(db.Integer, db.ForeignKey('reports.id'), primary_key=True)
+    installation_type = db.Column(db.String(100), primary_key=True)
+
+    __table_args__ = (
+        db.Index('ix_report_installation_types_type_report_id', 'installation_type', 'report_id'),
+    )
+
+    @staticmethod
+    def rows(report_id, installation_types):
+        """Insert rows for a report's installation types (distinct, non-empty)."""
+        types = dict.fromkeys(str(t).strip()[:100] for t in installation_types or [] if t is not None)
+        return [{'report_id': report_id, 'installation_type': t} for t in types if t]
+
+    def __repr__(self):
+        return f'<ReportInstallationType {self.report_id} {self.installation_type}>'
+
+
 class ReportImage(db.Model):
     __tablename__ = 'report_images'
 
     id = db.Column(db.Integer, primary_key=True)
-    report_id = db.Column(db.Integer, db.ForeignKey('reports.id'), nullable=False)
+    report_id = db.Column(db.Integer, db.ForeignKey('reports.id'), nullable=False, index=True)
     image_path = db.Column(db.String(500), nullable=False)
     image_type = db.Column(db.String(50))  # 'goods' or 'project'
     uploaded_at = db.Column(db.DateTime, default=datetime.utcnow)
@@ -139,7 +280,7 @@ class ReportDocument(db.Model):
     __tablename__ = 'report_documents'
 
     id = db.Column(db.Integer, primary_key=True)
-    report_id = db.Column(db.Integer, db.ForeignKey('reports.id'), nullable=False)
+    report_id = db.Column(db.Integer, db.ForeignKey('reports.id'), nullable=False, index=True)
     document_path = db.Column(db.String(500), nullable=False)
     original_filename = db.Column(db.String(255))
     uploaded_at = db.Column(db.DateTime, default=datetime.utcnow)
@@ -174,11 +315,11 @@ class CompanyProject(db.Model):
         return f'<CompanyProject {self.name}>'
 
 
-class InventoryItem(db.Model):
+class InventoryItem(ProductRef, db.Model):
     __tablename__ = 'inventory_items'
 
     id = db.Column(db.Integer, primary_key=True)
-    product_name = db.Column(db.String(200), unique=True, nullable=False)
+    product_id = db.Column(db.Integer, db.ForeignKey('products.id'), unique=True, nullable=False, index=True)
     quantity_unit = db.Column(db.Float, default=0)   # יחידה
     quantity_meter = db.Column(db.Float, default=0)  # מטר
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -186,6 +327,7 @@ class InventoryItem(db.Model):
     def to_dict(self):
         return {
             'id': self.id,
+            'product_id': self.product_id,
             'product_name': self.product_name,
             'quantity_unit': self.quantity_unit,
             'quantity_meter': self.quantity_meter,
@@ -196,11 +338,11 @@ class InventoryItem(db.Model):
         return f'<InventoryItem {self.product_name}>'
 
 
-class InventoryTransaction(db.Model):
+class InventoryTransaction(ProductRef, db.Model):
     __tablename__ = 'inventory_transactions'
 
     id = db.Column(db.Integer, primary_key=True)
-    product_name = db.Column(db.String(200), nullable=False)
+    product_id = db.Column(db.Integer, db.ForeignKey('products.id'), nullable=False, index=True)
     change_type = db.Column(db.String(50), nullable=False)  # 'report' or 'adjustment'
     quantity = db.Column(db.Float, nullable=False)
     unit = db.Column(db.String(20), nullable=False)  # 'unit' or 'meter'
@@ -209,9 +351,13 @@ class InventoryTransaction(db.Model):
     notes = db.Column(db.String(500))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    # Ids move to inventory_transactions_archive with the row (see Report)
+    __table_args__ = {'sqlite_autoincrement': True}
+
     def to_dict(self):
         return {
             'id': self.id,
+            'product_id': self.product_id,
             'product_name': self.product_name,
             'change_type': self.change_type,
             'quantity': self.quantity,
@@ -226,7 +372,170 @@ class InventoryTransaction(db.Model):
         return f'<InventoryTransaction {self.product_name} {self.quantity} {self.unit}>'
 
 
-# Product list constant
+class ReportTombstone(db.Model):
+    """Marks a deleted report so delta-sync clients can drop their copy."""
+    __tablename__ = 'report_tombstones'
+
+    report_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    user_id = db.Column(db.Integer, index=True)
+    change_seq = db.Column(db.BigInteger, nullable=False, index=True)
+    deleted_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<ReportTombstone {self.report_id} @{self.change_seq}>'
+
+
+class ChangeCounter(db.Model):
+    """Monotonic counters handing out change sequence numbers (one row per stream)."""
+    __tablename__ = 'change_counters'
+
+    name = db.Column(db.String(50), primary_key=True)
+    value = db.Column(db.BigInteger, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<ChangeCounter {self.name}={self.value}>'
+
+
+class SchemaVersion(db.Model):
+    """Single row recording the last applied schema migration (see migrations.py)."""
+    __tablename__ = 'schema_version'
+
+    id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    description = db.Column(db.String(200))
+    applied_at = db.Column(db.DateTime)
+
+    def __repr__(self):
+        return f'<SchemaVersion {self.version}>'
+
+
+class ArchivedReport(db.Model):
+    """Read-only snapshot of a report moved out of the hot `reports` table.
+
+    Child rows (products, images, documents) are stored inline as JSON in the
+    same shape `Report.to_dict()` returns, so reading an archived report never
+    touches more than one row.
+    """
+    __tablename__ = 'reports_archive'
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)  # original report id
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
+    report_type = db.Column(db.String(20), nullable=False)
+    customer_name = db.Column(db.String(200))
+    recipient_name = db.Column(db.String(200))
+    company_project = db.Column(db.String(200))
+    address = db.Column(db.String(500), nullable=False)
+    status = db.Column(db.String(20), nullable=False)
+    timestamp = db.Column(db.DateTime, index=True)
+    notes = db.Column(db.Text)
+    installation_type = db.Column(db.String(500))
+    installation_types = db.Column(db.Text)
+    protections_count = db.Column(db.Integer)
+    installation_team = db.Column(db.String(20))
+    additional_worker_name = db.Column(db.String(200))
+
+    products_json = db.Column(db.Text)
+    images_json = db.Column(db.Text)
+    documents_json = db.Column(db.Text)
+    archived_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    author = db.relationship('User')
+
+    @staticmethod
+    def _load(raw):
+        return json.loads(raw) if raw else []
+
+    @property
+    def products(self):
+        """Product lines as attribute objects (used by the Excel export and the report page)."""
+        return [SimpleNamespace(**p) for p in self._load(self.products_json)]
+
+    @property
+    def images(self):
+        return [SimpleNamespace(**i) for i in self._load(self.images_json)]
+
+    @property
+    def documents(self):
+        return [SimpleNamespace(**d) for d in self._load(self.documents_json)]
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'user_id': self.user_id,
+            'user_name': self.author.full_name if self.author else '',
+            'report_type': self.report_type,
+            'customer_name': self.customer_name,
+            'recipient_name': self.recipient_name,
+            'company_project': self.company_project,
+            'installation_type': self.installation_type,
+            'installation_types': self.installation_types,
+            'protections_count': self.protections_count,
+            'installation_team': self.installation_team,
+            'additional_worker_name': self.additional_worker_name,
+            'address': self.address,
+            'status': self.status,
+            'timestamp': self.timestamp.isoformat() if self.timestamp else None,
+            'notes': self.notes,
+            'products': self._load(self.products_json),
+            'images': self._load(self.images_json),
+            'documents': self._load(self.documents_json),
+            'archived': True
+        }
+
+    def to_summary_dict(self):
+        """Same shape as Report.to_summary_dict(), computed from the snapshot."""
+        products = self._load(self.products_json)
+        images = self._load(self.images_json)
+        return {
+            'id': self.id,
+            'user_id': self.user_id,
+            'user_name': self.author.full_name if self.author else '',
+            'report_type': self.report_type,
+            'customer_name': self.customer_name,
+            'company_project': self.company_project,
+            'installation_type': self.installation_type,
+            'address': self.address,
+            'status': self.status,
+            'timestamp': self.timestamp.isoformat() if self.timestamp else None,
+            'updated_at': None,
+            'product_count': len(products),
+            'image_count': len(images),
+            'document_count': len(self._load(self.documents_json)),
+            'total_units': sum(p['quantity'] for p in products if (p.get('quantity_unit') or 'unit') != 'meter'),
+            'total_meters': sum(p['quantity'] for p in products if p.get('quantity_unit') == 'meter'),
+            'thumbnail_path': images[0]['image_path'] if images else None,
+            'archived': True
+        }
+
+    def __repr__(self):
+        return f'<ArchivedReport {self.id} - {self.report_type}>'
+
+
+class ArchivedInventoryTransaction(ProductRef, db.Model):
+    """Inventory ledger row moved out of the hot `inventory_transactions` table.
+
+    Stock balances live on `InventoryItem`, so archiving ledger rows never
+    changes them.
+    """
+    __tablename__ = 'inventory_transactions_archive'
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)  # original transaction id
+    product_id = db.Column(db.Integer, db.ForeignKey('products.id'), nullable=False)
+    change_type = db.Column(db.String(50), nullable=False)
+    quantity = db.Column(db.Float, nullable=False)
+    unit = db.Column(db.String(20), nullable=False)
+    report_id = db.Column(db.Integer)  # report may itself be archived
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'))
+    notes = db.Column(db.String(500))
+    created_at = db.Column(db.DateTime, index=True)
+    archived_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<ArchivedInventoryTransaction {self.product_name} {self.quantity} {self.unit}>'
+
+
+# Initial product catalog, in display order. Seeds the `products` table
+# (migration 8); the table is the source of truth after that.
 PRODUCTS = [
     "Floorliner - Vapor Shield",
     "Floorliner - Original Shield",
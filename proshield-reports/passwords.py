@@ -0,0 +1,44 @@
+"""Password hashing with a cap on concurrent hashes.
+
+A hash runs on the calling request thread, which waits for it to finish.
+bcrypt releases the GIL while hashing, so under gthread workers the worker's
+other threads keep serving in the meantime. A semaphore caps how many hashes
+run at once per worker (BCRYPT_MAX_CONCURRENCY), so a shift-start rush of
+logins queues up instead of taking every core away from other requests.
+
+The work factor comes from Config.BCRYPT_ROUNDS. Hashes made with a
+different cost still verify; `needs_rehash` tells the login view to store a
+fresh hash while it has the plain password.
+"""
+
+from threading import BoundedSemaphore
+
+import bcrypt
+
+from config import Config
+
+_slots = BoundedSemaphore(Config.BCRYPT_MAX_CONCURRENCY)
+
+
+def hash_password(password, rounds=None):
+    rounds = rounds or Config.BCRYPT_ROUNDS
+    salt = bcrypt.gensalt(rounds=rounds)
+    with _slots:
+        return bcrypt.hashpw(password.encode('utf-8'), salt).decode('utf-8')
+
+
+def check_password(password, password_hash):
+    with _slots:
+        return bcrypt.checkpw(password.encode('utf-8'), password_hash.encode('utf-8'))
+
+
+def hash_rounds(password_hash):
+    """Cost factor stored in a bcrypt hash ('$2b$12$...' -> 12); None if unparseable."""
+    try:
+        return int(password_hash.split('$')[2])
+    except (AttributeError, IndexError, ValueError):
+        return None
+
+
+def needs_rehash(password_hash):
+    return hash_rounds(password_hash) != Config.BCRYPT_ROUNDS
@@ -0,0 +1,175 @@
+"""On-demand profiling of single requests.
+
+An admin adds `_profile=1` to any URL (`/api/export?...&_profile=1`,
+`/report/17?_profile=1`). While that request runs, a background thread samples
+its stack every PROFILE_INTERVAL_MS. This is wall-clock sampling, so time
+spent waiting on SQL or disk shows up as well as Python work.
+
+The samples are saved under PROFILE_DIR as `<name>.collapsed`, in the
+collapsed-stack format that flamegraph.pl, speedscope and Grafana read, next
+to `<name>.json` with the URL, user, status and duration. Only the newest
+PROFILE_KEEP profiles are kept. The response carries `X-Profile: <name>`, and
+the admin page (tab "פרופילים") lists and downloads them.
+"""
+
+import json
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+from flask import g, request
+from flask_login import current_user
+
+_config = {'dir': None, 'keep': 50, 'interval': 0.005}
+
+_PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+_NAME = re.compile(r'^[\w.-]+$')
+
+
+def _frame_label(code):
+    path = code.co_filename
+    if path.startswith(_PROJECT_DIR):
+        path = os.path.relpath(path, _PROJECT_DIR)
+    elif 'site-packages' + os.sep in path:
+        path = path.split('site-packages' + os.sep, 1)[1]
+    else:
+        path = os.path.basename(path)
+    # ';' separates frames in the collapsed format
+    return f'{code.co_name} ({path}:{code.co_firstlineno})'.replace(';', ':')
+
+
+class Sampler(threading.Thread):
+    """Samples the stack of one thread until stopped."""
+
+    def __init__(self, thread_id, interval):
+        super().__init__(name='profiler', daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop_event = threading.Event()
+        self.started = time.perf_counter()
+        self.duration = None
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(_frame_label(frame.f_code))
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def stop(self):
+        self.duration = time.perf_counter() - self.started
+        self._stop_event.set()
+        self.join()
+
+
+def _wanted():
+    return (
+        request.args.get('_profile') == '1'
+        and current_user.is_authenticated
+        and current_user.is_admin()
+    )
+
+
+def _before_request():
+    if not _config['dir'] or not _wanted():
+        return
+    endpoint = (request.endpoint or 'unmatched').replace('.', '-')
+    g.profile_name = f'{datetime.now():%Y%m%d-%H%M%S-%f}-{endpoint}'
+    g.profile_sampler = Sampler(threading.get_ident(), _config['interval'])
+    g.profile_sampler.start()
+
+
+def _after_request(response):
+    if 'profile_sampler' in g:
+        g.profile_status = response.status_code
+        response.headers['X-Profile'] = g.profile_name
+    return response
+
+
+def _teardown_request(exc):
+    sampler = g.pop('profile_sampler', None)
+    if sampler is None:
+        return
+    sampler.stop()
+    save(g.profile_name, sampler, {
+        'method': request.method,
+        'url': request.full_path.rstrip('?'),
+        'endpoint': request.endpoint,
+        'user': current_user.username if current_user.is_authenticated else None,
+        'status': g.get('profile_status', 500),
+        'error': repr(exc) if exc else None,
+    })
+
+
+def save(name, sampler, meta):
+    directory = _config['dir']
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, name + '.collapsed'), 'w', encoding='utf-8') as f:
+        for stack, count in sampler.stacks.most_common():
+            f.write(f'{stack} {count}\n')
+    meta = {
+        **meta,
+        'name': name,
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'duration_ms': round(sampler.duration * 1000, 1),
+        'samples': sum(sampler.stacks.values()),
+        'interval_ms': round(sampler.interval * 1000, 1),
+    }
+    with open(os.path.join(directory, name + '.json'), 'w', encoding='utf-8') as f:
+        json.dump(meta, f, ensure_ascii=False)
+    _prune()
+
+
+def _prune():
+    for meta in list_profiles()[_config['keep']:]:
+        for ext in ('.json', '.collapsed'):
+            try:
+                os.remove(os.path.join(_config['dir'], meta['name'] + ext))
+            except FileNotFoundError:
+                pass
+
+
+def list_profiles():
+    """Metadata of the stored profiles, newest first."""
+    directory = _config['dir']
+    if not directory or not os.path.isdir(directory):
+        return []
+    profiles = []
+    for filename in os.listdir(directory):
+        if not filename.endswith('.json'):
+            continue
+        try:
+            with open(os.path.join(directory, filename), encoding='utf-8') as f:
+                profiles.append(json.load(f))
+        except (OSError, ValueError):
+            continue
+    profiles.sort(key=lambda p: p.get('name', ''), reverse=True)  # names start with a timestamp
+    return profiles
+
+
+def profile_path(name):
+    """Path of a stored profile's collapsed stacks, or None."""
+    if not _config['dir'] or not _NAME.match(name):
+        return None
+    path = os.path.join(_config['dir'], name + '.collapsed')
+    return path if os.path.exists(path) else None
+
+
+def init_app(app):
+    _config['dir'] = app.config.get('PROFILE_DIR')
+    _config['keep'] = app.config.get('PROFILE_KEEP', 50)
+    _config['interval'] = app.config.get('PROFILE_INTERVAL_MS', 5) / 1000
+    if not _config['dir']:
+        return
+
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    app.teardown_request(_teardown_request)
@@ -0,0 +1,190 @@
+"""Change tracking for delta sync (/api/reports/changes).
+
+Every report write gets a unique, increasing `change_seq` from the 'reports'
+row of `change_counters`; deletions leave a ReportTombstone carrying a seq
+from the same counter. A client that remembers the highest seq it has seen
+can ask for everything after it.
+
+Sequence numbers are reserved in `before_commit`, not at the first flush, so
+the counter row is only locked for the final flush + commit (never across
+image compression or other slow work in the request). Reserving under the
+row lock also means seqs become visible in commit order.
+
+Core bulk inserts bypass ORM events; callers stamp those rows themselves with
+`stamp_rows`.
+
+The session events are registered by `init_app(app)`.
+"""
+
+from datetime import datetime
+
+from sqlalchemy import event, func, inspect, update
+from sqlalchemy.orm import Session
+
+from models import (
+    db, Report, ReportProduct, ReportImage, ReportDocument, ReportTombstone, ChangeCounter
+)
+
+COUNTER_NAME = 'reports'
+
+_CHILD_MODELS = (ReportProduct, ReportImage, ReportDocument)
+
+
+def reserve_change_seqs(session, count):
+    """Reserve `count` consecutive seqs; returns the first one."""
+    # Read after commit by caches of report data (suggestions.py)
+    session.info['reports_changed'] = True
+    last = session.execute(
+        update(ChangeCounter)
+        .where(ChangeCounter.name == COUNTER_NAME)
+        .values(value=ChangeCounter.value + count)
+        .returning(ChangeCounter.value)
+    ).scalar()
+    if last is None:
+        # Counter row not seeded yet (database not migrated yet)
+        start = (session.query(func.max(Report.change_seq)).scalar() or 0) + 1
+        session.add(ChangeCounter(name=COUNTER_NAME, value=start + count - 1))
+        session.flush()
+        return start
+    return last - count + 1
+
+
+def stamp_rows(rows):
+    """Give report rows destined for a Core bulk insert their change_seq / updated_at."""
+    if not rows:
+        return rows
+    first = reserve_change_seqs(db.session, len(rows))
+    now = datetime.utcnow()
+    for offset, row in enumerate(rows):
+        row['change_seq'] = first + offset
+        row['updated_at'] = now
+    return rows
+
+
+def _pending(session):
+    return session.info.setdefault('report_changes', {'touched': {}, 'deleted': {}})
+
+
+def _collect(session):
+    with session.no_autoflush:
+        _collect_into(session, _pending(session))
+
+
+def _collect_into(session, pending):
+    for obj in list(session.new) + list(session.dirty):
+        if isinstance(obj, Report):
+            if obj in session.new or session.is_modified(obj):
+                pending['touched'][id(obj)] = obj
+        elif isinstance(obj, _CHILD_MODELS) and obj.report_id is not None:
+            parent = session.get(Report, obj.report_id)
+            if parent is not None:
+                pending['touched'][id(parent)] = parent
+    for obj in session.deleted:
+        if isinstance(obj, Report):
+            pending['deleted'][id(obj)] = obj
+        elif isinstance(obj, _CHILD_MODELS) and obj.report_id is not None:
+            parent = session.get(Report, obj.report_id)
+            if parent is not None and parent not in session.deleted:
+                pending['touched'][id(parent)] = parent
+
+
+def _before_flush(session, flush_context, instances):
+    if session.info.get('stamping_changes'):
+        return
+    _collect(session)
+
+
+def _before_commit(session):
+    if 'report_changes' not in session.info and not (session.new or session.dirty or session.deleted):
+        return
+    _collect(session)
+    pending = session.info.pop('report_changes')
+
+    # Objects from rolled-back savepoints are no longer persistent / deleted
+    touched = [
+        obj for key, obj in pending['touched'].items()
+        if key not in pending['deleted'] and (inspect(obj).persistent or inspect(obj).pending)
+    ]
+    deleted = [obj for obj in pending['deleted'].values() if inspect(obj).deleted or obj in session.deleted]
+    if not touched and not deleted:
+        return
+
+    session.info['stamping_changes'] = True
+    try:
+        session.flush()  # assign ids to new reports first
+        seq = reserve_change_seqs(session, len(touched) + len(deleted))
+        now = datetime.utcnow()
+        for report in touched:
+            report.change_seq = seq
+            report.updated_at = now
+            seq += 1
+        for report in deleted:
+            session.merge(ReportTombstone(report_id=report.id, user_id=report.user_id, change_seq=seq, deleted_at=now))
+            seq += 1
+        session.flush()
+    finally:
+        session.info.pop('stamping_changes', None)
+
+
+def _after_rollback(session):
+    session.info.pop('report_changes', None)
+
+
+_EVENTS = (
+    ('before_flush', _before_flush),
+    ('before_commit', _before_commit),
+    ('after_rollback', _after_rollback),
+)
+
+
+def init_app(app):
+    """Stamp change_seq on report writes in every session (once per process)."""
+    for name, listener in _EVENTS:
+        if not event.contains(Session, name, listener):
+            event.listen(Session, name, listener)
+
+
+def seed_change_counter(commit=True):
+    """Backfill change_seq for existing reports and create the counter row.
+
+    Only runs while the counter row is missing, i.e. once per database.
+    """
+    if db.session.get(ChangeCounter, COUNTER_NAME) is not None:
+        return
+    db.session.execute(
+        update(Report)
+        .where(Report.change_seq.is_(None))
+        .values(change_seq=Report.id, updated_at=func.coalesce(Report.updated_at, Report.timestamp))
+    )
+    top = db.session.query(func.max(Report.change_seq)).scalar() or 0
+    db.session.add(ChangeCounter(name=COUNTER_NAME, value=top))
+    if commit:
+        db.session.commit()
+
+
+def changes_since(since, user_id=None, limit=200):
+    """Reports changed and ids deleted after `since`, oldest change first.
+
+    Returns (changed_reports, deleted_ids, next_seq, has_more). `user_id`
+    restricts both lists to one author (regular users only see their own).
+    """
+    reports = Report.query.filter(Report.change_seq > since)
+    tombstones = ReportTombstone.query.filter(ReportTombstone.change_seq > since)
+    if user_id is not None:
+        reports = reports.filter(Report.user_id == user_id)
+        tombstones = tombstones.filter(ReportTombstone.user_id == user_id)
+
+    merged = sorted(
+        [(r.change_seq, r) for r in reports.order_by(Report.change_seq).limit(limit + 1)]
+        + [(t.change_seq, t) for t in tombstones.order_by(ReportTombstone.change_seq).limit(limit + 1)],
+        key=lambda pair: pair[0]
+    )
+    has_more = len(merged) > limit
+    merged = merged[:limit]
+
+    changed = [obj for _, obj in merged if isinstance(obj, Report)]
+    # A reused id (SQLite recycles rowids) is alive again if it also changed later
+    alive = {r.id for r in changed}
+    deleted = [obj.report_id for _, obj in merged if isinstance(obj, ReportTombstone) and obj.report_id not in alive]
+    next_seq = merged[-1][0] if merged else since
+    return changed, deleted, next_seq, has_more
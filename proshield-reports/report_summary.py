@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Proshield Reports - Denormalized list-row summary of reports
+
+`reports` carries product_count, image_count, document_count, total_units,
+total_meters and thumbnail_path (the first image), so report lists are served
+from the reports table alone instead of loading every child row.
+
+The columns are written in the same transaction as the child rows:
+create_report / update_report call `refresh([report.id])` before committing,
+/api/sync fills them from the payload with `product_totals()` (synced reports
+have no files), and deleting a report removes the row with its summary.
+
+Backfill (also run once by migration step 7):
+    python report_summary.py
+    python report_summary.py --batch 2000
+"""
+
+from sqlalchemy import func, select, update
+
+from models import db, Report, ReportProduct, ReportImage, ReportDocument
+
+_reports = Report.__table__
+_products = ReportProduct.__table__
+_images = ReportImage.__table__
+_documents = ReportDocument.__table__
+
+
+def product_totals(products):
+    """Summary columns for report_products rows given as dicts (quantity, quantity_unit)."""
+    units = sum(p['quantity'] for p in products if (p.get('quantity_unit') or 'unit') != 'meter')
+    meters = sum(p['quantity'] for p in products if p.get('quantity_unit') == 'meter')
+    return {'product_count': len(products), 'total_units': units, 'total_meters': meters}
+
+
+def _count(table):
+    return select(func.count()).where(table.c.report_id == _reports.c.id).scalar_subquery()
+
+
+def _quantity(meters):
+    unit = func.coalesce(_products.c.quantity_unit, 'unit')
+    return (
+        select(func.coalesce(func.sum(_products.c.quantity), 0))
+        .where(_products.c.report_id == _reports.c.id, (unit == 'meter') if meters else (unit != 'meter'))
+        .scalar_subquery()
+    )
+
+
+def _summary_values():
+    return {
+        'product_count': _count(_products),
+        'image_count': _count(_images),
+        'document_count': _count(_documents),
+        'total_units': _quantity(meters=False),
+        'total_meters': _quantity(meters=True),
+        'thumbnail_path': (
+            select(_images.c.image_path)
+            .where(_images.c.report_id == _reports.c.id)
+            .order_by(_images.c.id)
+            .limit(1)
+            .scalar_subquery()
+        ),
+    }
+
+
+def refresh(report_ids):
+    """Recompute the summary of the given reports from their child rows (no commit)."""
+    if not report_ids:
+        return
+    db.session.flush()
+    db.session.execute(update(_reports).where(_reports.c.id.in_(report_ids)).values(_summary_values()))
+
+
+def backfill(batch_size=5000, commit=True, log=print):
+    """Recompute the summary of every report, in id ranges of `batch_size`."""
+    low, high = db.session.query(func.min(Report.id), func.max(Report.id)).one()
+    if low is None:
+        return 0
+    for start in range(low, high + 1, batch_size):
+        db.session.execute(
+            update(_reports)
+            .where(_reports.c.id >= start, _reports.c.id < start + batch_size)
+            .values(_summary_values())
+        )
+        if commit:
+            db.session.commit()
+        log(f'[*] Reports {start}-{min(start + batch_size - 1, high)}')
+    return high - low + 1
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Recompute the denormalized report summary columns')
+    parser.add_argument('--batch', type=int, default=5000, help='Reports per transaction')
+    args = parser.parse_args()
+
+    from app import app
+    with app.app_context():
+        backfill(args.batch)
+    print('[OK] Report summaries are up to date')
+
+
+if __name__ == '__main__':
+    main()
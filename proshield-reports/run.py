@@ -33,6 +33,13 @@ def main():
             print(f"[!] Warning: Could not generate icons: {e}")
             print("[!] You may need to run: python generate_icons.py")
 
+    # Fingerprint static assets for the service worker precache
+    try:
+        from assets import main as build_assets
+        build_assets()
+    except Exception as e:
+        print(f"[!] Warning: Could not fingerprint static assets: {e}")
+
     # Create upload directories
     upload_dir = os.path.join(os.path.dirname(__file__), 'uploads', 'reports')
     os.makedirs(upload_dir, exist_ok=True)
@@ -0,0 +1,239 @@
+"""Slow-query log with captured query plans.
+
+Every SQL statement slower than SLOW_QUERY_MS is appended as one JSON line to
+SLOW_QUERY_LOG (rotated at SLOW_QUERY_LOG_MAX_BYTES, SLOW_QUERY_LOG_BACKUPS
+old files kept) with:
+
+    - the route that ran it (endpoint + method), or "cli" outside a request
+    - the statement and its normalized form (literals and parameters -> ?,
+      IN lists collapsed), which is what offenders are grouped by
+    - the shape of the bound parameters (types only, never values)
+    - for SELECTs, the plan: EXPLAIN QUERY PLAN on SQLite, EXPLAIN on PostgreSQL,
+      run on the same connection right after the statement
+
+The admin page (tab "שאילתות איטיות") and `python slow_queries.py` list the
+worst statements by total time. All workers append to the same file; with
+several gunicorn workers an entry can be lost at the moment the file rotates.
+"""
+
+import json
+import logging
+import re
+import time
+from collections import Counter
+from datetime import datetime, timezone
+
+from flask import has_request_context, request
+from sqlalchemy import event
+
+import logfiles
+
+logger = logging.getLogger('proshield.slow_queries')
+logger.propagate = False
+
+_config = {'threshold_ms': 0, 'path': None, 'backups': 0, 'explain': True}
+
+_MAX_STATEMENT_CHARS = 4000
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'(?<![\w.])-?\d+(?:\.\d+)?\b')
+_PLACEHOLDER = re.compile(r'%\(\w+\)s|%s|(?<!:):\w+|\?')
+_IN_LIST = re.compile(r'\(\s*\?(?:\s*,\s*\?)+\s*\)')
+_VALUES_ROWS = re.compile(r'(\(\?\.\.\.\))(?:\s*,\s*\(\?\.\.\.\))+')
+_WHITESPACE = re.compile(r'\s+')
+
+
+def normalize(statement):
+    """Statement with literals and parameters replaced by ? (grouping key)."""
+    text = _STRING_LITERAL.sub('?', statement)
+    text = _NUMBER.sub('?', text)
+    text = _PLACEHOLDER.sub('?', text)
+    text = _IN_LIST.sub('(?...)', text)
+    text = _VALUES_ROWS.sub(r'\1, ...', text)
+    return _WHITESPACE.sub(' ', text).strip()
+
+
+def _type_name(value):
+    return 'NULL' if value is None else type(value).__name__
+
+
+def parameter_shape(parameters, executemany=False):
+    """Types of the bound parameters, e.g. {'id': 'int'} or ['str', 'int']."""
+    if executemany:
+        rows = list(parameters or [])
+        return {'rows': len(rows), 'row': parameter_shape(rows[0]) if rows else None}
+    if isinstance(parameters, dict):
+        return {key: _type_name(value) for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [_type_name(value) for value in parameters]
+    return _type_name(parameters)
+
+
+def _explain(conn, statement, parameters):
+    """Query plan lines for a SELECT, or None for other statements."""
+    if not statement.lstrip().upper().startswith(('SELECT', 'WITH')):
+        return None
+
+    dbapi_connection = conn.connection.dbapi_connection
+    dialect = conn.dialect.name
+    cursor = dbapi_connection.cursor()
+    try:
+        if dialect == 'sqlite':
+            cursor.execute('EXPLAIN QUERY PLAN ' + statement, parameters)
+            return [row[-1] for row in cursor.fetchall()]
+        if dialect == 'postgresql':
+            # A failed EXPLAIN must not abort the request's transaction
+            cursor.execute('SAVEPOINT slow_query_explain')
+            try:
+                cursor.execute('EXPLAIN ' + statement, parameters)
+                return [row[0] for row in cursor.fetchall()]
+            finally:
+                cursor.execute('ROLLBACK TO SAVEPOINT slow_query_explain')
+                cursor.execute('RELEASE SAVEPOINT slow_query_explain')
+        return None
+    except Exception as e:
+        return [f'EXPLAIN failed: {e}']
+    finally:
+        cursor.close()
+
+
+def _route():
+    if not has_request_context():
+        return 'cli'
+    return f'{request.method} {request.endpoint or request.path}'
+
+
+def record(conn, bind, statement, parameters, executemany, elapsed_ms):
+    entry = {
+        'ts': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'ms': round(elapsed_ms, 1),
+        'bind': bind,
+        'route': _route(),
+        'normalized': normalize(statement),
+        'statement': statement[:_MAX_STATEMENT_CHARS],
+        'params': parameter_shape(parameters, executemany),
+        'plan': None if executemany or not _config['explain'] else _explain(conn, statement, parameters),
+    }
+    logger.warning(json.dumps(entry, ensure_ascii=False, default=str))
+
+
+def _instrument_engine(engine, bind):
+    # Start times are stacked per connection with the execution context they
+    # belong to (as in metrics), so a failed statement only drops its own entry
+    @event.listens_for(engine, 'before_cursor_execute')
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('slow_query_start', []).append((context, time.perf_counter()))
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed_ms = (time.perf_counter() - conn.info['slow_query_start'].pop()[1]) * 1000
+        if elapsed_ms >= _config['threshold_ms']:
+            record(conn, bind, statement, parameters, executemany, elapsed_ms)
+
+    @event.listens_for(engine, 'handle_error')
+    def _handle_error(exception_context):
+        conn = exception_context.connection
+        starts = conn.info.get('slow_query_start') if conn is not None else None
+        # Errors raised before the cursor ran, or after it finished, have no entry
+        if starts and starts[-1][0] is exception_context.execution_context:
+            starts.pop()
+
+
+# ---------------------------------------------------------------------------
+# Reading the log back
+# ---------------------------------------------------------------------------
+
+def entries():
+    """Logged slow queries, oldest first."""
+    for path in logfiles.existing(_config['path'], _config['backups']):
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue
+
+
+def worst_offenders(limit=20):
+    """Slow statements grouped by normalized text, by total time descending."""
+    groups = {}
+    for entry in entries():
+        group = groups.get(entry['normalized'])
+        if group is None:
+            group = groups[entry['normalized']] = {
+                'normalized': entry['normalized'],
+                'count': 0,
+                'total_ms': 0.0,
+                'max_ms': 0.0,
+                'routes': Counter(),
+            }
+        group['count'] += 1
+        group['total_ms'] += entry['ms']
+        group['routes'][entry['route']] += 1
+        if entry['ms'] >= group['max_ms']:
+            group['max_ms'] = entry['ms']
+            group['slowest'] = {k: entry[k] for k in ('ts', 'statement', 'params', 'plan', 'bind')}
+        group['last_seen'] = entry['ts']
+
+    ranked = sorted(groups.values(), key=lambda g: g['total_ms'], reverse=True)[:limit]
+    for group in ranked:
+        group['total_ms'] = round(group['total_ms'], 1)
+        group['avg_ms'] = round(group['total_ms'] / group['count'], 1)
+        group['routes'] = [{'route': route, 'count': count} for route, count in group['routes'].most_common(5)]
+    return ranked
+
+
+def init_app(app):
+    from models import db
+
+    _config['threshold_ms'] = app.config.get('SLOW_QUERY_MS', 0)
+    _config['path'] = app.config.get('SLOW_QUERY_LOG')
+    _config['backups'] = app.config.get('SLOW_QUERY_LOG_BACKUPS', 3)
+    _config['explain'] = app.config.get('SLOW_QUERY_EXPLAIN', True)
+    if not _config['threshold_ms'] or not _config['path']:
+        return
+
+    logfiles.attach(
+        logger, _config['path'],
+        max_bytes=app.config.get('SLOW_QUERY_LOG_MAX_BYTES', 5 * 1024 * 1024),
+        backups=_config['backups'],
+        level=logging.WARNING,
+    )
+
+    with app.app_context():
+        for bind, engine in db.engines.items():
+            _instrument_engine(engine, bind or 'primary')
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Worst slow queries by total time')
+    parser.add_argument('--limit', type=int, default=10)
+    parser.add_argument('--json', action='store_true', help='Print results as JSON')
+    args = parser.parse_args()
+
+    from app import app
+    import slow_queries  # the module app.py configured, not __main__
+
+    with app.app_context():
+        offenders = slow_queries.worst_offenders(args.limit)
+
+    if args.json:
+        print(json.dumps(offenders, indent=2, ensure_ascii=False))
+        return
+    if not offenders:
+        print(f"No slow queries logged in {app.config['SLOW_QUERY_LOG']}")
+        return
+    for group in offenders:
+        routes = ', '.join(f"{r['route']} x{r['count']}" for r in group['routes'])
+        print(f"{group['total_ms']:>10} ms total  {group['count']:>5}x  avg {group['avg_ms']} ms  max {group['max_ms']} ms")
+        print(f"    {group['normalized'][:200]}")
+        print(f"    routes: {routes}")
+        for line in group['slowest']['plan'] or []:
+            print(f"    plan: {line}")
+        print()
+
+
+if __name__ == '__main__':
+    main()
@@ -41,47 +41,55 @@ window.showLoading = showLoading;
 // ==========================================
 // Offline Storage
 // ==========================================
+// Thin async facade over OfflineQueue (static/js/offline-queue.js, IndexedDB)
 const OfflineStorage = {
-    REPORTS_KEY: 'offlineReports',
-
-    saveReport(report) {
-        const reports = this.getReports();
-        report.offlineId = Date.now();
-        reports.push(report);
-        localStorage.setItem(this.REPORTS_KEY, JSON.stringify(reports));
-        return report.offlineId;
+    async saveReport(fields, images = [], deliveryNote = null) {
+        const key = await OfflineQueue.add(fields, images, deliveryNote);
+        registerBackgroundSync();
+        return key;
     },
 
     getReports() {
-        return JSON.parse(localStorage.getItem(this.REPORTS_KEY) || '[]');
+        return OfflineQueue.getAll();
     },
 
-    removeReport(offlineId) {
-        const reports = this.getReports().filter(r => r.offlineId !== offlineId);
-        localStorage.setItem(this.REPORTS_KEY, JSON.stringify(reports));
+    removeReport(key) {
+        return OfflineQueue.remove(key);
     },
 
     clearAll() {
-        localStorage.removeItem(this.REPORTS_KEY);
+        return OfflineQueue.clear();
     },
 
     count() {
-        return this.getReports().length;
+        return OfflineQueue.count();
+    },
+
+    sync() {
+        return OfflineQueue.replay();
     }
 };
 
+// Ask the service worker to replay the queue once connectivity returns
+function registerBackgroundSync() {
+    if (!('serviceWorker' in navigator)) return;
+    navigator.serviceWorker.ready
+        .then(reg => reg.sync && reg.sync.register('sync-reports'))
+        .catch(err => console.log('Background sync unavailable:', err));
+}
+
 window.OfflineStorage = OfflineStorage;
 
 // ==========================================
 // Network Status
 // ==========================================
-function updateOnlineStatus() {
+async function updateOnlineStatus() {
     const indicator = document.getElementById('offlineIndicator');
     if (indicator) {
         indicator.classList.toggle('active', !navigator.onLine);
     }
 
-    if (navigator.onLine && OfflineStorage.count() > 0) {
+    if (navigator.onLine && await OfflineStorage.count() > 0) {
         showToast('התקשורת חזרה - ניתן לסנכרן דוחות', 'info');
     }
 }
@@ -296,12 +304,19 @@ window.debounce = debounce;
 // ==========================================
 // Initialize on DOM Ready
 // ==========================================
-document.addEventListener('DOMContentLoaded', () => {
+document.addEventListener('DOMContentLoaded', async () => {
+    // Reports queued by older versions lived in localStorage
+    try {
+        await OfflineQueue.migrateLegacy();
+    } catch (error) {
+        console.error('Offline queue migration failed:', error);
+    }
+
     // Update online status indicator
     updateOnlineStatus();
 
     // Check for offline reports
-    const offlineCount = OfflineStorage.count();
+    const offlineCount = await OfflineStorage.count();
     if (offlineCount > 0) {
         console.log(`${offlineCount} offline reports pending sync`);
     }
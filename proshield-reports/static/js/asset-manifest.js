@@ -0,0 +1,29 @@
+// Generated by assets.py - do not edit
+self.ASSET_MANIFEST = {
+  "assets": {
+    "css/style.css": "93f067f8dc92",
+    "images/icon-128.png": "b74739e18b79",
+    "images/icon-144.png": "1e461fec713a",
+    "images/icon-152.png": "83e70bef7fcd",
+    "images/icon-192.png": "24e2d5388806",
+    "images/icon-384.png": "1440067b67b7",
+    "images/icon-512.png": "aa76d63ba441",
+    "images/icon-72.png": "0188826d6a87",
+    "images/icon-96.png": "b66f2b068ffb",
+    "images/proshield-icon.png": "28bec8b29625",
+    "images/proshield-logo-compact.svg": "5ab21926f871",
+    "images/proshield-logo.png": "04c26d0279a5",
+    "images/proshield-logo.svg": "2b4640cd5880",
+    "js/app.js": "cecc0494af71",
+    "js/offline-queue.js": "5edb20b5633c",
+    "manifest.json": "777303cced0f"
+  },
+  "precache": [
+    "css/style.css",
+    "js/app.js",
+    "js/offline-queue.js",
+    "images/icon-192.png",
+    "images/icon-512.png",
+    "images/proshield-icon.png"
+  ]
+};
@@ -0,0 +1,244 @@
+/**
+ * Proshield Reports - Offline Report Queue
+ * IndexedDB-backed queue shared by the pages (app.js) and the service worker (sw.js)
+ *
+ * One record per queued report, keyed by its idempotency key:
+ *   {
+ *     idempotency_key: '…',
+ *     queued_at: 1700000000000,
+ *     fields: { report_type, address, status, products: [...], ... },
+ *     images: [{ blob, name }],
+ *     delivery_note: { blob, name } | null,
+ *     last_error: null
+ *   }
+ *
+ * Attachments are stored as Blobs (no base64), appends are a single put(),
+ * and records are replayed as the same multipart POST /api/reports the
+ * online form sends. Records without attachments go through /api/sync in
+ * one batch.
+ */
+
+(function (scope) {
+    const DB_NAME = 'proshield-offline';
+    const DB_VERSION = 1;
+    const STORE = 'reports';
+    const LEGACY_KEY = 'offlineReports';
+
+    let dbPromise = null;
+
+    function generateKey() {
+        if (scope.crypto && scope.crypto.randomUUID) {
+            return scope.crypto.randomUUID();
+        }
+        return `${Date.now().toString(16)}-${Math.random().toString(16).slice(2)}-${Math.random().toString(16).slice(2)}`;
+    }
+
+    function promisify(request) {
+        return new Promise((resolve, reject) => {
+            request.onsuccess = () => resolve(request.result);
+            request.onerror = () => reject(request.error);
+        });
+    }
+
+    function openDb() {
+        if (!dbPromise) {
+            dbPromise = new Promise((resolve, reject) => {
+                const request = scope.indexedDB.open(DB_NAME, DB_VERSION);
+                request.onupgradeneeded = () => {
+                    const db = request.result;
+                    if (!db.objectStoreNames.contains(STORE)) {
+                        const store = db.createObjectStore(STORE, { keyPath: 'idempotency_key' });
+                        store.createIndex('queued_at', 'queued_at');
+                    }
+                };
+                request.onsuccess = () => resolve(request.result);
+                request.onerror = () => {
+                    dbPromise = null;
+                    reject(request.error);
+                };
+            });
+        }
+        return dbPromise;
+    }
+
+    async function withStore(mode, fn) {
+        const db = await openDb();
+        const tx = db.transaction(STORE, mode);
+        const done = new Promise((resolve, reject) => {
+            tx.oncomplete = resolve;
+            tx.onerror = () => reject(tx.error);
+            tx.onabort = () => reject(tx.error);
+        });
+        const result = await fn(tx.objectStore(STORE));
+        await done;
+        return result;
+    }
+
+    function toAttachment(file) {
+        if (!file) return null;
+        return { blob: file, name: file.name || 'attachment' };
+    }
+
+    const OfflineQueue = {
+        /** A fresh idempotency key, for a submission that may end up queued. */
+        newKey: generateKey,
+
+        /**
+         * Queue a report. `fields` are the form values (arrays stay arrays),
+         * `images` / `deliveryNote` are File or Blob objects.
+         */
+        async add(fields, images = [], deliveryNote = null) {
+            const record = {
+                idempotency_key: fields.idempotency_key || generateKey(),
+                queued_at: Date.now(),
+                fields: Object.assign({}, fields),
+                images: images.map(toAttachment).filter(Boolean),
+                delivery_note: toAttachment(deliveryNote),
+                last_error: null
+            };
+            record.fields.idempotency_key = record.idempotency_key;
+            await withStore('readwrite', store => promisify(store.put(record)));
+            return record.idempotency_key;
+        },
+
+        async getAll() {
+            return withStore('readonly', store => promisify(store.index('queued_at').getAll()));
+        },
+
+        async count() {
+            return withStore('readonly', store => promisify(store.count()));
+        },
+
+        async remove(key) {
+            return withStore('readwrite', store => promisify(store.delete(key)));
+        },
+
+        async removeMany(keys) {
+            if (!keys.length) return;
+            return withStore('readwrite', store => Promise.all(keys.map(key => promisify(store.delete(key)))));
+        },
+
+        async markError(key, message) {
+            return withStore('readwrite', async store => {
+                const record = await promisify(store.get(key));
+                if (record) {
+                    record.last_error = message;
+                    await promisify(store.put(record));
+                }
+            });
+        },
+
+        async clear() {
+            return withStore('readwrite', store => promisify(store.clear()));
+        },
+
+        /** Move reports queued by older versions (localStorage JSON array) into IndexedDB. */
+        async migrateLegacy() {
+            if (typeof scope.localStorage === 'undefined') return 0;
+            const raw = scope.localStorage.getItem(LEGACY_KEY);
+            if (!raw) return 0;
+
+            let legacy = [];
+            try {
+                legacy = JSON.parse(raw) || [];
+            } catch (e) {
+                legacy = [];
+            }
+            for (const report of legacy) {
+                delete report.offlineId;
+                await this.add(report);
+            }
+            scope.localStorage.removeItem(LEGACY_KEY);
+            return legacy.length;
+        },
+
+        /** Build the multipart body /api/reports expects. */
+        toFormData(record) {
+            const formData = new FormData();
+            Object.entries(record.fields).forEach(([name, value]) => {
+                if (value === undefined || value === null) return;
+                formData.append(name, Array.isArray(value) ? JSON.stringify(value) : value);
+            });
+            record.images.forEach(image => formData.append('images', image.blob, image.name));
+            if (record.delivery_note) {
+                formData.append('delivery_note', record.delivery_note.blob, record.delivery_note.name);
+            }
+            return formData;
+        },
+
+        /**
+         * Send every queued report. Returns { synced, failed, pending }.
+         * Stops at the first network error (still offline); server-side
+         * rejections stay queued with `last_error` set.
+         */
+        async replay() {
+            const records = await this.getAll();
+            const summary = { synced: 0, failed: 0, pending: 0 };
+
+            const plain = records.filter(r => !r.images.length && !r.delivery_note);
+            const withFiles = records.filter(r => r.images.length || r.delivery_note);
+
+            if (plain.length) {
+                let data;
+                try {
+                    const response = await fetch('/api/sync', {
+                        method: 'POST',
+                        credentials: 'same-origin',
+                        headers: { 'Content-Type': 'application/json' },
+                        body: JSON.stringify({ reports: plain.map(r => r.fields) })
+                    });
+                    data = await response.json();
+                } catch (error) {
+                    summary.pending = records.length;
+                    return summary;
+                }
+
+                const done = [];
+                for (const result of data.results || []) {
+                    const record = plain[result.index];
+                    if (result.status === 'created' || result.status === 'duplicate') {
+                        done.push(record.idempotency_key);
+                    } else {
+                        summary.failed += 1;
+                        await this.markError(record.idempotency_key, result.error || 'sync failed');
+                    }
+                }
+                await this.removeMany(done);
+                summary.synced += done.length;
+            }
+
+            for (let i = 0; i < withFiles.length; i++) {
+                const record = withFiles[i];
+                let response;
+                try {
+                    response = await fetch('/api/reports', {
+                        method: 'POST',
+                        credentials: 'same-origin',
+                        body: this.toFormData(record)
+                    });
+                } catch (error) {
+                    summary.pending += withFiles.length - i;
+                    break;
+                }
+
+                let data = {};
+                try {
+                    data = await response.json();
+                } catch (e) {
+                    data = {};
+                }
+                if (response.ok && data.success) {
+                    await this.remove(record.idempotency_key);
+                    summary.synced += 1;
+                } else {
+                    summary.failed += 1;
+                    await this.markError(record.idempotency_key, data.error || `HTTP ${response.status}`);
+                }
+            }
+
+            return summary;
+        }
+    };
+
+    scope.OfflineQueue = OfflineQueue;
+})(typeof self !== 'undefined' ? self : window);
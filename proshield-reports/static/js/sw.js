@@ -3,64 +3,81 @@
  * PWA Offline Support & Caching
  */
 
-const CACHE_NAME = 'proshield-reports-v8';
-const STATIC_CACHE = 'proshield-static-v8';
-const DYNAMIC_CACHE = 'proshield-dynamic-v8';
+importScripts('/static/js/offline-queue.js', '/static/js/asset-manifest.js');
 
-const ASSET_VERSION = '20260203-07';
+// Fingerprinted assets (see assets.py). Entries are keyed by their hashed URL
+// and the cache survives deploys, so an update only fetches changed files.
+const PRECACHE = 'proshield-precache';
+const PAGES_CACHE = 'proshield-pages-v1';
+const API_CACHE = 'proshield-api-v1';
+const UPLOADS_CACHE = 'proshield-uploads-v1';
+const DYNAMIC_CACHE = 'proshield-dynamic-v9';
+const KNOWN_CACHES = [PRECACHE, PAGES_CACHE, API_CACHE, UPLOADS_CACHE, DYNAMIC_CACHE];
 
-// Static assets to cache
-const STATIC_ASSETS = [
+// Uploaded images never change (uuid file names); keep the most recent ones
+const UPLOADS_MAX_ENTRIES = 200;
+
+// App-shell pages (network-first, cached for offline use)
+const SHELL_PAGES = [
     '/',
     '/login',
     '/dashboard',
     '/report/new',
-    '/settings',
+    '/settings'
+];
 
-    // Versioned assets (force update)
-    `/static/css/style.css?v=${ASSET_VERSION}`,
-    `/static/js/app.js?v=${ASSET_VERSION}`,
-    `/manifest.json?v=${ASSET_VERSION}`,
+// Lookup APIs that rarely change: answer from cache, refresh in the background
+const STALE_WHILE_REVALIDATE_APIS = [
+    '/api/company-projects'
+];
 
-    // Fallback non-versioned (some browsers request these)
-    '/static/css/style.css',
-    '/static/js/app.js',
-    '/manifest.json',
+const MANIFEST = self.ASSET_MANIFEST || { assets: {}, precache: [] };
 
-    '/static/images/icon-192.png',
-    '/static/images/icon-512.png'
-];
+function hashedUrl(path) {
+    const digest = MANIFEST.assets[path];
+    return digest ? `/static/${path}?v=${digest}` : `/static/${path}`;
+}
 
-// Install event - cache static assets
+// Install event - precache changed assets and the app shell
 self.addEventListener('install', (event) => {
     console.log('[SW] Installing...');
-    event.waitUntil(
-        caches.open(STATIC_CACHE)
-            .then((cache) => {
-                console.log('[SW] Caching static assets');
-                return cache.addAll(STATIC_ASSETS);
-            })
-            .then(() => self.skipWaiting())
-    );
+    event.waitUntil((async () => {
+        const precache = await caches.open(PRECACHE);
+        const urls = MANIFEST.precache.map(hashedUrl);
+        const missing = [];
+        for (const url of urls) {
+            if (!(await precache.match(url))) {
+                missing.push(url);
+            }
+        }
+        console.log(`[SW] Precaching ${missing.length} of ${urls.length} assets`);
+        await precache.addAll(missing);
+
+        // Pages need a session; don't fail the install if they redirect
+        const pages = await caches.open(PAGES_CACHE);
+        await Promise.all(SHELL_PAGES.map(page => pages.add(page).catch(() => null)));
+
+        await self.skipWaiting();
+    })());
 });
 
-// Activate event - clean up old caches
+// Activate event - drop old caches and assets no longer in the manifest
 self.addEventListener('activate', (event) => {
     console.log('[SW] Activating...');
-    event.waitUntil(
-        caches.keys()
-            .then((keys) => {
-                return Promise.all(
-                    keys.filter((key) => {
-                        return key !== STATIC_CACHE && key !== DYNAMIC_CACHE;
-                    }).map((key) => {
-                        console.log('[SW] Removing old cache:', key);
-                        return caches.delete(key);
-                    })
-                );
-            })
-            .then(() => self.clients.claim())
-    );
+    event.waitUntil((async () => {
+        const keys = await caches.keys();
+        await Promise.all(keys.filter(key => !KNOWN_CACHES.includes(key)).map((key) => {
+            console.log('[SW] Removing old cache:', key);
+            return caches.delete(key);
+        }));
+
+        const current = new Set(MANIFEST.precache.map(path => new URL(hashedUrl(path), self.location.origin).href));
+        const precache = await caches.open(PRECACHE);
+        const entries = await precache.keys();
+        await Promise.all(entries.filter(req => !current.has(req.url)).map(req => precache.delete(req)));
+
+        await self.clients.claim();
+    })());
 });
 
 // Allow page to trigger immediate activation
@@ -70,38 +87,78 @@ self.addEventListener('message', (event) => {
     }
 });
 
-// Fetch event - serve from cache, fallback to network
+function isStaleWhileRevalidateApi(pathname) {
+    return STALE_WHILE_REVALIDATE_APIS.some(prefix => pathname === prefix || pathname.startsWith(`${prefix}/`));
+}
+
+// Fetch event - route to a per-path strategy
 self.addEventListener('fetch', (event) => {
     const { request } = event;
     const url = new URL(request.url);
 
-    // Skip non-GET requests
+    if (url.origin !== self.location.origin) {
+        return;
+    }
+
+    // Writes to a lookup API invalidate its cached reads
     if (request.method !== 'GET') {
+        if (isStaleWhileRevalidateApi(url.pathname)) {
+            event.respondWith(fetch(request).then(async (response) => {
+                await purgeCache(API_CACHE, url.pathname.split('/').slice(0, 3).join('/'));
+                return response;
+            }));
+        }
+        return;
+    }
+
+    // Cached API data belongs to the user who is logging out
+    if (url.pathname === '/logout') {
+        event.waitUntil(Promise.all([caches.delete(API_CACHE), caches.delete(PAGES_CACHE)]));
+        return;
+    }
+
+    if (isStaleWhileRevalidateApi(url.pathname)) {
+        event.respondWith(staleWhileRevalidate(event, API_CACHE));
         return;
     }
 
-    // Skip API calls (let them go to network)
     if (url.pathname.startsWith('/api/')) {
-        event.respondWith(networkFirst(request));
+        event.respondWith(networkFirst(request, API_CACHE));
         return;
     }
 
-    // Skip file uploads
     if (url.pathname.startsWith('/uploads/')) {
-        event.respondWith(networkFirst(request));
+        event.respondWith(cacheFirstLru(event, UPLOADS_CACHE, UPLOADS_MAX_ENTRIES));
+        return;
+    }
+
+    if (url.pathname.startsWith('/static/')) {
+        event.respondWith(precached(request, url));
         return;
     }
 
     // For HTML pages - network first, fallback to cache
     if (request.headers.get('Accept')?.includes('text/html')) {
-        event.respondWith(networkFirst(request));
+        event.respondWith(networkFirst(request, PAGES_CACHE));
         return;
     }
 
-    // For static assets - cache first
+    // Anything else - cache first
     event.respondWith(cacheFirst(request));
 });
 
+// Fingerprinted static asset: answer from the precache under its current hash
+async function precached(request, url) {
+    const path = url.pathname.replace(/^\/static\//, '');
+    if (MANIFEST.assets[path] && (!url.searchParams.has('v') || url.searchParams.get('v') === MANIFEST.assets[path])) {
+        const cached = await caches.match(hashedUrl(path), { cacheName: PRECACHE });
+        if (cached) {
+            return cached;
+        }
+    }
+    return cacheFirst(request);
+}
+
 // Cache-first strategy
 async function cacheFirst(request) {
     const cached = await caches.match(request);
@@ -123,12 +180,67 @@ async function cacheFirst(request) {
     }
 }
 
+// Cache-first with a bounded, least-recently-used cache
+async function cacheFirstLru(event, cacheName, maxEntries) {
+    const { request } = event;
+    const cache = await caches.open(cacheName);
+    const cached = await cache.match(request);
+    if (cached) {
+        // Re-insert so Cache.keys() order tracks recency
+        event.waitUntil(cache.delete(request).then(() => cache.put(request, cached.clone())));
+        return cached;
+    }
+
+    const response = await fetch(request);
+    // A redirect means the session expired (login page), not an image
+    if (response.ok && !response.redirected) {
+        event.waitUntil(cache.put(request, response.clone()).then(() => trimCache(cache, maxEntries)));
+    }
+    return response;
+}
+
+async function trimCache(cache, maxEntries) {
+    const keys = await cache.keys();
+    const excess = keys.length - maxEntries;
+    if (excess > 0) {
+        await Promise.all(keys.slice(0, excess).map(key => cache.delete(key)));
+    }
+}
+
+// Stale-while-revalidate: cached copy immediately, network refresh in the background
+async function staleWhileRevalidate(event, cacheName) {
+    const { request } = event;
+    const cache = await caches.open(cacheName);
+    const cached = await cache.match(request);
+
+    const refresh = fetch(request).then((response) => {
+        if (response.ok && !response.redirected) {
+            return cache.put(request, response.clone()).then(() => response);
+        }
+        return response;
+    });
+
+    if (cached) {
+        event.waitUntil(refresh.catch(() => null));
+        return cached;
+    }
+    return refresh;
+}
+
+async function purgeCache(cacheName, pathPrefix) {
+    const cache = await caches.open(cacheName);
+    const keys = await cache.keys();
+    await Promise.all(
+        keys.filter(req => new URL(req.url).pathname.startsWith(pathPrefix)).map(req => cache.delete(req))
+    );
+}
+
 // Network-first strategy
-async function networkFirst(request) {
+async function networkFirst(request, cacheName = DYNAMIC_CACHE) {
     try {
         const response = await fetch(request);
         if (response.ok) {
-            const cache = await caches.open(DYNAMIC_CACHE);
+            const cache = await caches.open(cacheName);
             cache.put(request, response.clone());
         }
         return response;
@@ -155,14 +267,22 @@ self.addEventListener('sync', (event) => {
 });
 
 async function syncOfflineReports() {
-    // This will be handled by the main app
-    // Just notify all clients to sync
+    // Replay the IndexedDB queue (multipart /api/reports, batched /api/sync)
+    const result = await self.OfflineQueue.replay();
+    console.log('[SW] Offline queue replayed:', result);
+
     const clients = await self.clients.matchAll();
     clients.forEach((client) => {
         client.postMessage({
-            type: 'SYNC_REPORTS'
+            type: 'SYNC_REPORTS_DONE',
+            result
         });
     });
+
+    // Still offline: reject so the browser retries the sync later
+    if (result.pending > 0) {
+        throw new Error('Offline queue not fully synced');
+    }
 }
 
 // Push notifications (for future use)
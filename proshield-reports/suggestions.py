@@ -0,0 +1,222 @@
+"""Typeahead suggestions for customer names, addresses and company/projects.
+
+Each worker keeps a prefix index per field in memory: a sorted list of
+(key, value) pairs with one key per word of every distinct value, so "תל"
+finds "הרצל 5, תל אביב". A lookup is two bisects over that list plus a top-k
+by how many reports use each value; it never touches the database.
+
+Values are compared normalized (case, quotes, separators and repeated spaces
+are ignored) and suggested in their most common spelling, so "רמת-גן" and
+"רמת גן" are one suggestion.
+
+The index is built from all reports, archived ones included, on first use and
+again every SUGGEST_REBUILD_SECONDS. In between it is updated incrementally
+from reports whose change_seq is newer than the last one seen: straight after
+a report write committed by this worker, and at least every
+SUGGEST_REFRESH_SECONDS for writes made by other workers. Edits and deletions
+only lower a value's count at the next rebuild.
+
+Company/project suggestions are limited to the active entries of the admin
+list (company_projects), ranked by how many reports use them.
+"""
+
+import bisect
+import heapq
+import re
+import threading
+import time
+
+from sqlalchemy import event, func
+from sqlalchemy.orm import Session
+
+from config import Config
+from models import db, Report, ArchivedReport, CompanyProject
+
+FIELDS = ('customer_name', 'address', 'company_project')
+
+_QUOTES = re.compile(r'["\'`׳״]')
+_SEPARATORS = re.compile(r'[\s,./()\-]+')
+
+
+def normalize(text):
+    """Comparison form of a value: casefolded, without quotes, single spaces between words."""
+    text = _QUOTES.sub('', text or '').casefold()
+    return ' '.join(_SEPARATORS.sub(' ', text).split())
+
+
+class _Index:
+    """Prefix index over the distinct values of one field."""
+
+    def __init__(self):
+        self.counts = {}    # normalized value -> reports using it
+        self.spelling = {}  # normalized value -> value as shown
+        self.keys = []      # sorted (word suffix, normalized value)
+
+    def add(self, value, count=1, create=True):
+        key = self._count(value, count, create)
+        if key:
+            self.counts[key] = max(count, 1)
+            for suffix in _suffixes(key):
+                bisect.insort(self.keys, (suffix, key))
+
+    def load(self, counted_values, offered=None):
+        """Fill an empty index from (value, count) rows.
+
+        `offered` limits the index to these values (shown as given); otherwise
+        each value is shown in its most used spelling.
+        """
+        for value in offered or ():
+            self._count(value, 0, create=True)
+        for value, count in sorted(counted_values, key=lambda row: -row[1]):
+            self._count(value, count, create=offered is None)
+        self.keys = sorted((suffix, key) for key in self.counts for suffix in _suffixes(key))
+
+    def _count(self, value, count, create):
+        """Add `count` uses of a value; returns its key when it is new to the index."""
+        value = (value or '').strip()
+        key = normalize(value)
+        if not key:
+            return None
+        if key in self.counts:
+            self.counts[key] += count
+            return None
+        if not create:
+            return None
+        self.counts[key] = count
+        self.spelling[key] = value
+        return key
+
+    def search(self, prefix, limit):
+        prefix = normalize(prefix)
+        if prefix:
+            start = bisect.bisect_left(self.keys, (prefix,))
+            end = bisect.bisect_left(self.keys, (prefix + '\uffff',), start)
+            # dict keeps the first (alphabetical) match, so ties are ordered
+            candidates = list(dict.fromkeys(key for _, key in self.keys[start:end]))
+        else:
+            candidates = self.counts
+        top = heapq.nlargest(limit, candidates, key=self.counts.__getitem__)
+        return [{'value': self.spelling[key], 'count': self.counts[key]} for key in top]
+
+
+def _suffixes(key):
+    yield key
+    for position, char in enumerate(key):
+        if char == ' ':
+            yield key[position + 1:]
+
+
+class _State:
+    def __init__(self):
+        self.indexes = None
+        self.projects = frozenset()  # active company/project names
+        self.last_seq = 0            # newest report change already counted
+        self.last_id = 0             # reports up to this id are counted once
+        self.rebuild_at = 0.0
+        self.refresh_at = 0.0
+        self.stale = False
+
+
+_state = _State()
+_lock = threading.Lock()
+
+
+def _grouped(column):
+    rows = []
+    for model_column in (getattr(Report, column), getattr(ArchivedReport, column)):
+        rows.extend(
+            db.session.query(model_column, func.count())
+            .filter(model_column.isnot(None), model_column != '')
+            .group_by(model_column)
+            .all()
+        )
+    return rows
+
+
+def _active_projects():
+    return frozenset(
+        name for (name,) in db.session.query(CompanyProject.name).filter(CompanyProject.is_active == True)  # noqa: E712
+    )
+
+
+def _project_index(projects):
+    index = _Index()
+    index.load(_grouped('company_project'), offered=projects)
+    return index
+
+
+def _build():
+    # Read the high-water marks first: reports written during the build are
+    # picked up again by the next refresh rather than missed
+    last_seq, last_id = db.session.query(func.max(Report.change_seq), func.max(Report.id)).one()
+    projects = _active_projects()
+    indexes = {'company_project': _project_index(projects)}
+    for field in ('customer_name', 'address'):
+        indexes[field] = _Index()
+        indexes[field].load(_grouped(field))
+
+    now = time.monotonic()
+    _state.indexes = indexes
+    _state.projects = projects
+    _state.last_seq = last_seq or 0
+    _state.last_id = last_id or 0
+    _state.rebuild_at = now + Config.SUGGEST_REBUILD_SECONDS
+    _state.refresh_at = now + Config.SUGGEST_REFRESH_SECONDS
+    _state.stale = False
+
+
+def _refresh():
+    projects = _active_projects()
+    if projects != _state.projects:
+        _state.indexes['company_project'] = _project_index(projects)
+        _state.projects = projects
+
+    rows = (
+        db.session.query(Report.id, Report.change_seq, *(getattr(Report, field) for field in FIELDS))
+        .filter(Report.change_seq > _state.last_seq)
+        .order_by(Report.change_seq)
+        .all()
+    )
+    for row in rows:
+        # An edited report already counts towards the values it had; a value
+        # it introduces starts at one
+        count = 1 if row.id > _state.last_id else 0
+        for field in FIELDS:
+            _state.indexes[field].add(getattr(row, field), count, create=field != 'company_project')
+        _state.last_seq = max(_state.last_seq, row.change_seq or 0)
+        _state.last_id = max(_state.last_id, row.id)
+
+    _state.refresh_at = time.monotonic() + Config.SUGGEST_REFRESH_SECONDS
+    _state.stale = False
+
+
+def suggest(field, prefix='', limit=8):
+    """Most used values of `field` with a word starting with `prefix`.
+
+    Returns [{'value', 'count'}], most used first.
+    """
+    if field not in FIELDS:
+        raise KeyError(field)
+    with _lock:
+        now = time.monotonic()
+        if _state.indexes is None or now >= _state.rebuild_at:
+            _build()
+        elif _state.stale or now >= _state.refresh_at:
+            _refresh()
+        return _state.indexes[field].search(prefix, limit)
+
+
+def invalidate():
+    """Pick up committed changes (reports, company/project list) at the next lookup."""
+    _state.stale = True
+
+
+@event.listens_for(Session, 'after_commit')
+def _after_commit(session):
+    if session.info.pop('reports_changed', False):
+        invalidate()
+
+
+@event.listens_for(Session, 'after_rollback')
+def _after_rollback(session):
+    session.info.pop('reports_changed', None)
@@ -0,0 +1,284 @@
+"""Stage-level span tracing of report submission.
+
+A view decorated with `@tracing.traced('create_report')` gets a root span; the
+view marks its stages with `tracing.stage('validate')`, `tracing.stage('commit')`
+... (each call ends the previous stage), and code below it can open nested
+spans with `with tracing.span('compress_image'):`. Outside a traced request
+these calls do nothing.
+
+Each finished request is appended to TRACE_LOG as one line of OTLP/JSON (an
+ExportTraceServiceRequest), so the OpenTelemetry Collector's `otlpjsonfile`
+receiver can ship it to Jaeger / Tempo / any OTLP backend as it is. Every span
+carries `request.id`: the incoming X-Request-ID header, or the trace id, sent
+back in the response's X-Request-ID.
+
+`stage_percentiles()` (admin API /api/admin/traces/stages and
+`python tracing.py`) aggregates the file into per-stage latency percentiles
+by report type and attachment count.
+"""
+
+import json
+import logging
+import os
+import re
+import secrets
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+from flask import g, has_request_context, make_response, request
+
+import logfiles
+
+logger = logging.getLogger('proshield.tracing')
+logger.propagate = False
+
+_config = {'path': None, 'backups': 0}
+
+SERVICE_NAME = 'proshield-reports'
+_REQUEST_ID = re.compile(r'^[\w.-]{1,64}$')
+
+STATUS_UNSET, STATUS_OK, STATUS_ERROR = 0, 1, 2
+
+
+class Span:
+    __slots__ = ('name', 'span_id', 'parent_id', 'start_ns', 'end_ns', 'attributes', 'status')
+
+    def __init__(self, name, parent_id, attributes):
+        self.name = name
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.attributes = dict(attributes)
+        self.status = STATUS_UNSET
+
+    def end(self):
+        if self.end_ns is None:
+            self.end_ns = time.time_ns()
+
+
+def _trace():
+    if not _config['path'] or not has_request_context():
+        return None
+    return g.get('trace')
+
+
+def stage(name, **attributes):
+    """End the current stage of the traced request and start the next one."""
+    trace = _trace()
+    if trace is None:
+        return
+    if trace['stage'] is not None:
+        trace['stage'].end()
+    trace['stage'] = Span(name, trace['root'].span_id, attributes)
+    trace['spans'].append(trace['stage'])
+
+
+@contextmanager
+def span(name, **attributes):
+    """A child span of the innermost open span (or current stage)."""
+    trace = _trace()
+    if trace is None:
+        yield None
+        return
+    parent = trace['stack'][-1] if trace['stack'] else (trace['stage'] or trace['root'])
+    child = Span(name, parent.span_id, attributes)
+    trace['spans'].append(child)
+    trace['stack'].append(child)
+    try:
+        yield child
+    except Exception:
+        child.status = STATUS_ERROR
+        raise
+    finally:
+        trace['stack'].pop()
+        child.end()
+
+
+def set_attributes(**attributes):
+    """Attributes of the request's root span (e.g. report.type, attachments)."""
+    trace = _trace()
+    if trace is not None:
+        trace['root'].attributes.update(attributes)
+
+
+def traced(name):
+    """Decorator: trace the view as a root span `name` and export it when done."""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if not _config['path']:
+                return view(*args, **kwargs)
+
+            trace_id = secrets.token_hex(16)
+            incoming = request.headers.get('X-Request-ID', '')
+            request_id = incoming if _REQUEST_ID.match(incoming) else trace_id
+            root = Span(name, None, {'http.method': request.method, 'http.route': request.url_rule.rule})
+            g.trace = {'trace_id': trace_id, 'request_id': request_id, 'root': root,
+                       'stage': None, 'stack': [], 'spans': [root]}
+            try:
+                response = make_response(view(*args, **kwargs))
+            except Exception:
+                root.status = STATUS_ERROR
+                raise
+            finally:
+                trace = g.pop('trace')
+                if trace['stage'] is not None:
+                    trace['stage'].end()
+                root.end()
+            root.attributes['http.status_code'] = response.status_code
+            root.status = STATUS_ERROR if response.status_code >= 500 else STATUS_OK
+            if root.status == STATUS_ERROR and trace['stage'] is not None:
+                trace['stage'].status = STATUS_ERROR  # the stage that failed
+            _export(trace)
+            response.headers['X-Request-ID'] = request_id
+            return response
+        return wrapper
+    return decorator
+
+
+# ---------------------------------------------------------------------------
+# OTLP/JSON export
+# ---------------------------------------------------------------------------
+
+def _value(value):
+    if isinstance(value, bool):
+        return {'boolValue': value}
+    if isinstance(value, int):
+        return {'intValue': str(value)}  # int64 is a string in proto3 JSON
+    if isinstance(value, float):
+        return {'doubleValue': value}
+    return {'stringValue': str(value)}
+
+
+def _attributes(attributes):
+    return [{'key': key, 'value': _value(value)} for key, value in attributes.items() if value is not None]
+
+
+def _export(trace):
+    spans = []
+    for s in trace['spans']:
+        s.end()
+        spans.append({
+            'traceId': trace['trace_id'],
+            'spanId': s.span_id,
+            'parentSpanId': s.parent_id or '',
+            'name': s.name,
+            'kind': 2 if s.parent_id is None else 1,  # SERVER root, INTERNAL stages
+            'startTimeUnixNano': str(s.start_ns),
+            'endTimeUnixNano': str(s.end_ns),
+            'attributes': _attributes({**s.attributes, 'request.id': trace['request_id']}),
+            'status': {'code': s.status},
+        })
+    record = {'resourceSpans': [{
+        'resource': {'attributes': _attributes({'service.name': SERVICE_NAME, 'process.pid': os.getpid()})},
+        'scopeSpans': [{'scope': {'name': 'proshield.tracing'}, 'spans': spans}],
+    }]}
+    logger.info(json.dumps(record, ensure_ascii=False, separators=(',', ':')))
+
+
+# ---------------------------------------------------------------------------
+# Aggregation
+# ---------------------------------------------------------------------------
+
+def _plain(attributes):
+    return {a['key']: next(iter(a['value'].values())) for a in attributes}
+
+
+def _attachment_bucket(count):
+    count = int(count or 0)
+    if count <= 1:
+        return str(count)
+    return '2-3' if count <= 3 else '4+'
+
+
+def _percentile(values, pct):
+    return round(values[min(len(values) - 1, int(len(values) * pct / 100))], 1)
+
+
+def stage_percentiles(root_name='create_report'):
+    """Per-stage latency (ms) percentiles of successful traced requests, by report type and attachment count.
+
+    {'installation / 2-3 attachments': {'requests': n, 'stages': {'total': {...}, 'validate': {...}}}}
+    """
+    groups = {}
+    for path in logfiles.existing(_config['path'], _config['backups']):
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    spans = json.loads(line)['resourceSpans'][0]['scopeSpans'][0]['spans']
+                except (ValueError, KeyError, IndexError):
+                    continue
+                root = spans[0]
+                if root['name'] != root_name:
+                    continue
+                attrs = _plain(root['attributes'])
+                if not str(attrs.get('http.status_code', '')).startswith('2'):
+                    continue  # rejected / failed submissions would skew the stages
+                key = f"{attrs.get('report.type', '?')} / {_attachment_bucket(attrs.get('attachments'))} attachments"
+                group = groups.setdefault(key, {'requests': 0, 'durations': {}})
+                group['requests'] += 1
+                for s in spans:
+                    stage_name = 'total' if s is root else s['name']
+                    ms = (int(s['endTimeUnixNano']) - int(s['startTimeUnixNano'])) / 1e6
+                    group['durations'].setdefault(stage_name, []).append(ms)
+
+    result = {}
+    for key, group in sorted(groups.items()):
+        stages = {}
+        for stage_name, values in group['durations'].items():
+            values.sort()
+            stages[stage_name] = {
+                'count': len(values),
+                'p50_ms': _percentile(values, 50),
+                'p95_ms': _percentile(values, 95),
+                'p99_ms': _percentile(values, 99),
+                'max_ms': round(values[-1], 1),
+            }
+        result[key] = {'requests': group['requests'], 'stages': stages}
+    return result
+
+
+def init_app(app):
+    _config['path'] = app.config.get('TRACE_LOG') or None
+    _config['backups'] = app.config.get('TRACE_LOG_BACKUPS', 3)
+    if not _config['path']:
+        return
+    logfiles.attach(
+        logger, _config['path'],
+        max_bytes=app.config.get('TRACE_LOG_MAX_BYTES', 10 * 1024 * 1024),
+        backups=_config['backups'],
+        level=logging.INFO,
+    )
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Per-stage latency percentiles of traced report submissions')
+    parser.add_argument('--json', action='store_true', help='Print results as JSON')
+    args = parser.parse_args()
+
+    from app import app
+    import tracing  # the module app.py configured, not __main__
+
+    with app.app_context():
+        result = tracing.stage_percentiles()
+
+    if args.json:
+        print(json.dumps(result, indent=2, ensure_ascii=False))
+        return
+    if not result:
+        print(f"No traces in {app.config['TRACE_LOG']}")
+        return
+    for key, group in result.items():
+        print(f"{key} ({group['requests']} requests)")
+        for stage_name, s in group['stages'].items():
+            print(f"    {stage_name:<18}{s['count']:>7}{s['p50_ms']:>10} p50{s['p95_ms']:>10} p95"
+                  f"{s['p99_ms']:>10} p99{s['max_ms']:>10} max  ms")
+        print()
+
+
+if __name__ == '__main__':
+    main()
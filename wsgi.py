@@ -5,6 +5,8 @@ We add that folder to PYTHONPATH so `from app import app` works.
 
 Render Start Command:
     gunicorn wsgi:app
+
+Worker settings come from gunicorn.conf.py next to this file.
 """
 
 import os